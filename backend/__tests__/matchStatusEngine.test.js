@@ -0,0 +1,55 @@
+jest.mock('../database_mongo', () => ({ getDatabase: jest.fn() }));
+
+const { MatchStatusEngine } = require('../services/matchStatusEngine');
+
+const START = 1000000000;
+
+// Move the fake clock forward in small steps, ticking the engine like its interval would
+const advance = (engine, ms, step = 100) => {
+  for (let elapsed = 0; elapsed < ms; elapsed += step) {
+    jest.setSystemTime(Date.now() + step);
+    engine.tick();
+  }
+};
+
+describe('MatchStatusEngine', () => {
+  let engine;
+  let events;
+
+  beforeEach(() => {
+    jest.useFakeTimers();
+    jest.setSystemTime(START);
+    engine = new MatchStatusEngine({ tickMs: 1000 });
+    engine.setWritesEnabled(false);
+    events = [];
+    engine.on('status', event => events.push({ ...event, at: Date.now() }));
+  });
+
+  afterEach(() => {
+    jest.useRealTimers();
+  });
+
+  test('flips a match tracked partway through a tick within one tick of its start', () => {
+    jest.setSystemTime(START + 600);
+    const startAt = START + 2500;
+    engine.track({ id: 'm1', sport: 'hockey', match_time: new Date(startAt).toISOString(), status: 'scheduled' });
+
+    advance(engine, 5000);
+
+    expect(events).toHaveLength(1);
+    expect(events[0]).toMatchObject({ id: 'm1', status: 'live', previous: 'scheduled' });
+    expect(events[0].at).toBeGreaterThanOrEqual(startAt);
+    expect(events[0].at - startAt).toBeLessThanOrEqual(1000);
+  });
+
+  test('does not flip a match before it starts', () => {
+    const startAt = START + 10 * 1000;
+    engine.track({ id: 'm2', sport: 'baseball', match_time: new Date(startAt).toISOString(), status: 'scheduled' });
+
+    advance(engine, 9000);
+    expect(events).toHaveLength(0);
+
+    advance(engine, 2000);
+    expect(events.map(event => event.status)).toEqual(['live']);
+  });
+});
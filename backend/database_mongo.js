@@ -1,4 +1,5 @@
 const { MongoClient } = require('mongodb');
+const { instrumentMongoClient } = require('./services/metrics');
 require('dotenv').config();
 
 // MongoDB connection URL
@@ -10,7 +11,9 @@ let client = null;
 // Connect to MongoDB
 const connectDatabase = async () => {
   try {
-    client = new MongoClient(MONGO_URL);
+    // Command monitoring feeds the mongodb_command_* metrics
+    client = new MongoClient(MONGO_URL, { monitorCommands: true });
+    instrumentMongoClient(client);
     await client.connect();
     db = client.db();
     console.log('✅ Connected to MongoDB database');
@@ -81,26 +84,66 @@ const sportAnalyses = {
   ]
 };
 
-// Initialize MongoDB collections and insert initial data
-const initDatabase = async () => {
+// Create a batch of indexes concurrently; `optional` failures are logged, not thrown
+const createIndexes = async (specs) => {
+  await Promise.all(specs.map(async ({ collection, keys, options = {}, optional }) => {
+    try {
+      await db.collection(collection).createIndex(keys, options);
+    } catch (error) {
+      if (!optional) throw error;
+      console.warn(`⚠️ ${optional}:`, error.message);
+    }
+  }));
+};
+
+// Delete all but the most recently updated row of each {sport, team_name}; returns how many were removed
+const removeDuplicateTeamLogos = async () => {
+  const duplicates = await db.collection('team_logos').aggregate([
+    { $sort: { updated_at: -1 } },
+    { $group: { _id: { sport: '$sport', team_name: '$team_name' }, ids: { $push: '$_id' }, count: { $sum: 1 } } },
+    { $match: { count: { $gt: 1 } } }
+  ], { allowDiskUse: true }).toArray();
+
+  const ids = duplicates.flatMap(group => group.ids.slice(1));
+  if (ids.length === 0) return 0;
+
+  const result = await db.collection('team_logos').deleteMany({ _id: { $in: ids } });
+  console.log(`🧹 Removed ${result.deletedCount} duplicate team logos`);
+  return result.deletedCount;
+};
+
+// Unique {sport, team_name} index: serves logo lookups and keyset pagination of
+// /api/logos/all, and makes concurrent upserts of one team collide (E11000)
+// instead of inserting a second row. Older databases have a plain index on the
+// same keys, which is replaced after removing duplicate rows.
+const ensureTeamLogoIndex = async () => {
+  const logos = db.collection('team_logos');
+  const keys = { sport: 1, team_name: 1 };
+
   try {
-    if (!db) {
-      await connectDatabase();
+    const indexes = await logos.indexes().catch(error => {
+      if (error.codeName === 'NamespaceNotFound') return [];
+      throw error;
+    });
+    const legacy = indexes.find(index => index.name === 'sport_1_team_name_1' && !index.unique);
+    if (legacy) {
+      const removed = await removeDuplicateTeamLogos();
+      await logos.dropIndex(legacy.name);
+      if (removed > 0) {
+        await rebuildLogoStats();
+      }
     }
 
-    // Create indexes for better performance
-    await db.collection('users').createIndex({ email: 1 }, { unique: true });
-    await db.collection('users').createIndex({ telegram_user_id: 1 }, { unique: true, sparse: true });
-    await db.collection('users').createIndex({ verification_token: 1 }, { sparse: true });
-    await db.collection('users').createIndex({ password_reset_token: 1 }, { sparse: true });
-    await db.collection('matches').createIndex({ match_date: 1 });
-    await db.collection('matches').createIndex({ sport: 1 });
-    await db.collection('predictions').createIndex({ sport: 1 });
-    await db.collection('predictions').createIndex({ match_date: 1 });
-    await db.collection('telegram_auth_sessions').createIndex({ auth_token: 1 }, { unique: true });
-    await db.collection('telegram_auth_sessions').createIndex({ expires_at: 1 }, { expireAfterSeconds: 0 });
-
-    // Initialize stats collection if empty
+    await logos.createIndex(keys, { unique: true, name: 'team_logo_natural_key' });
+  } catch (error) {
+    console.warn('⚠️ Could not create unique team logo index (duplicate logos in collection?):', error.message);
+    await logos.createIndex(keys).catch(() => {});
+  }
+};
+
+// Seed the stats document and expert analyses on first run, and backfill logo stats
+const seedCollections = async () => {
+  const seedStats = async () => {
     const statsCount = await db.collection('stats').countDocuments();
     if (statsCount === 0) {
       await db.collection('stats').insertOne({
@@ -112,9 +155,12 @@ const initDatabase = async () => {
         ai_prediction_accuracy: 78.9,
         updated_at: new Date()
       });
+      await bumpCacheVersion('stats');
     }
+  };
 
-    // Initialize match_analyses collection with sport-specific analyses
+  // Initialize match_analyses collection with sport-specific analyses
+  const seedAnalyses = async () => {
     const analysesCount = await db.collection('match_analyses').countDocuments();
     if (analysesCount === 0) {
       const analyses = [];
@@ -132,8 +178,74 @@ const initDatabase = async () => {
       
       if (analyses.length > 0) {
         await db.collection('match_analyses').insertMany(analyses);
+        await bumpCacheVersion('analyses');
       }
     }
+  };
+
+  // Backfill is_placeholder and the materialized logo stats on first run
+  const seedLogoStats = async () => {
+    const logoStats = await db.collection('logo_stats').findOne({ _id: 'summary' }, { projection: { _id: 1 } });
+    if (!logoStats) {
+      await rebuildLogoStats();
+    }
+  };
+
+  await Promise.all([seedStats(), seedAnalyses(), seedLogoStats()]);
+};
+
+// Initialize MongoDB collections and insert initial data.
+// Index builds and seed checks run concurrently; returns a timing breakdown in ms.
+const initDatabase = async () => {
+  const timings = {};
+  const time = async (name, task) => {
+    const startedAt = Date.now();
+    await task();
+    timings[name] = Date.now() - startedAt;
+  };
+
+  try {
+    if (!db) {
+      await time('connect', connectDatabase);
+    }
+
+    await Promise.all([
+      // Create indexes for better performance
+      time('indexes', () => createIndexes([
+        { collection: 'users', keys: { email: 1 }, options: { unique: true } },
+        { collection: 'users', keys: { telegram_user_id: 1 }, options: { unique: true, sparse: true } },
+        { collection: 'users', keys: { verification_token: 1 }, options: { sparse: true } },
+        { collection: 'users', keys: { password_reset_token: 1 }, options: { sparse: true } },
+        { collection: 'matches', keys: { match_date: 1 } },
+        { collection: 'matches', keys: { sport: 1 } },
+        { collection: 'matches', keys: { id: 1 } },
+        // Natural key used by saveMatchesToDatabase upserts
+        {
+          collection: 'matches',
+          keys: { team1: 1, team2: 1, match_time: 1 },
+          options: { unique: true, name: 'match_natural_key' },
+          optional: 'Could not create unique match index (duplicate matches in collection?)'
+        },
+        // MATCH_TTL_INDEX=true: continuous expiry of finished matches (expires_at is set on save)
+        {
+          collection: 'matches',
+          keys: { expires_at: 1 },
+          options: process.env.MATCH_TTL_INDEX === 'true' ? { expireAfterSeconds: 0 } : {},
+          optional: 'Could not create matches expires_at index (drop it to switch TTL mode)'
+        },
+        { collection: 'predictions', keys: { sport: 1 } },
+        { collection: 'predictions', keys: { match_date: 1 } },
+        { collection: 'telegram_auth_sessions', keys: { auth_token: 1 }, options: { unique: true } },
+        { collection: 'telegram_auth_sessions', keys: { expires_at: 1 }, options: { expireAfterSeconds: 0 } },
+        { collection: 'team_logos', keys: { is_placeholder: 1 } },
+        { collection: 'logo_negative_cache', keys: { source: 1, team_name: 1, sport: 1 }, options: { unique: true } },
+        { collection: 'logo_negative_cache', keys: { expires_at: 1 }, options: { expireAfterSeconds: 0 } },
+        { collection: 'telegram_outbox', keys: { status: 1, next_attempt_at: 1 } },
+        { collection: 'telegram_outbox', keys: { expires_at: 1 }, options: { expireAfterSeconds: 0 } }
+      ])),
+      time('team_logo_index', ensureTeamLogoIndex),
+      time('seed', seedCollections)
+    ]);
 
     console.log('✅ MongoDB database initialized successfully');
     console.log(`📊 Sport-specific analyses available`);
@@ -143,37 +255,33 @@ const initDatabase = async () => {
       console.log(`   ${sport}: ${analyses.length} expert analyses`);
     }
 
+    return timings;
   } catch (error) {
     console.error('❌ Error initializing MongoDB database:', error);
     throw error;
   }
 };
 
-// Get sport-specific analysis
+// Get sport-specific analysis (served from the in-memory reference data cache)
 const getSportAnalysis = async (sport) => {
   try {
     if (!db) {
       await connectDatabase();
     }
 
+    // Required lazily: referenceData depends on this module
+    const referenceData = require('./services/referenceData');
+
     // Try to get sport-specific analysis
-    const analyses = await db.collection('match_analyses')
-      .find({ sport: sport })
-      .toArray();
-    
-    if (analyses.length > 0) {
-      const randomIndex = Math.floor(Math.random() * analyses.length);
-      return analyses[randomIndex].analysis_text;
+    const analysis = await referenceData.getRandomAnalysis(sport);
+    if (analysis) {
+      return analysis;
     }
     
     // Fallback to any analysis
-    const fallbackAnalyses = await db.collection('match_analyses')
-      .find({})
-      .limit(1)
-      .toArray();
-    
-    if (fallbackAnalyses.length > 0) {
-      return fallbackAnalyses[0].analysis_text;
+    const fallbackAnalysis = await referenceData.getAnyAnalysis();
+    if (fallbackAnalysis) {
+      return fallbackAnalysis;
     }
     
     return 'Экспертный анализ доступен в VIP-канале.';
@@ -183,6 +291,92 @@ const getSportAnalysis = async (sport) => {
   }
 };
 
+// Bump the version stamp of a cached dataset so every process reloads it
+const bumpCacheVersion = async (name) => {
+  if (!db) {
+    await connectDatabase();
+  }
+
+  const doc = await db.collection('cache_versions').findOneAndUpdate(
+    { _id: name },
+    { $inc: { version: 1 }, $set: { updated_at: new Date() } },
+    { upsert: true, returnDocument: 'after' }
+  );
+  return doc ? doc.version : null;
+};
+
+// Whether a logo URL is one of the generated placeholder images
+const isPlaceholderLogo = (logoUrl) => typeof logoUrl === 'string' && logoUrl.includes('placeholder');
+
+// Apply count changes for one sport to the materialized logo stats
+const applyLogoStatsDelta = async (sport, { count = 0, real = 0, placeholder = 0 }) => {
+  if (!db) {
+    await connectDatabase();
+  }
+
+  await db.collection('logo_stats').updateOne(
+    { _id: 'summary' },
+    {
+      $inc: {
+        total_logos: count,
+        real_logos: real,
+        placeholder_logos: placeholder,
+        [`by_sport.${sport}.count`]: count,
+        [`by_sport.${sport}.real_logos`]: real,
+        [`by_sport.${sport}.placeholder_logos`]: placeholder
+      },
+      $set: { updated_at: new Date() }
+    },
+    { upsert: true }
+  );
+};
+
+// Recompute logo_stats from team_logos, backfilling is_placeholder where missing
+const rebuildLogoStats = async () => {
+  if (!db) {
+    await connectDatabase();
+  }
+
+  await db.collection('team_logos').updateMany(
+    { is_placeholder: { $exists: false } },
+    [{
+      $set: {
+        is_placeholder: { $regexMatch: { input: { $ifNull: ['$logo_url', ''] }, regex: 'placeholder' } }
+      }
+    }]
+  );
+
+  const bySport = await db.collection('team_logos').aggregate([
+    {
+      $group: {
+        _id: '$sport',
+        count: { $sum: 1 },
+        placeholder_logos: { $sum: { $cond: ['$is_placeholder', 1, 0] } }
+      }
+    }
+  ]).toArray();
+
+  const summary = {
+    total_logos: 0,
+    real_logos: 0,
+    placeholder_logos: 0,
+    by_sport: {},
+    rebuilt_at: new Date(),
+    updated_at: new Date()
+  };
+  for (const { _id: sport, count, placeholder_logos } of bySport) {
+    const real_logos = count - placeholder_logos;
+    summary.by_sport[sport] = { count, real_logos, placeholder_logos };
+    summary.total_logos += count;
+    summary.real_logos += real_logos;
+    summary.placeholder_logos += placeholder_logos;
+  }
+
+  await db.collection('logo_stats').replaceOne({ _id: 'summary' }, summary, { upsert: true });
+  console.log(`📊 Rebuilt logo stats: ${summary.total_logos} logos, ${summary.real_logos} real`);
+  return summary;
+};
+
 // Update team statistics
 const updateTeamStats = async (teamName, sport, matchResult) => {
   try {
@@ -263,6 +457,11 @@ const updateTelegramAuthSession = async (authToken, updateData) => {
       { $set: { ...updateData, updated_at: new Date() } }
     );
 
+    if (result.modifiedCount > 0) {
+      // Wake long-polling status requests for this session
+      require('./services/authSessionNotifier').notify(authToken);
+    }
+
     return result.modifiedCount > 0;
   } catch (error) {
     console.error('Error updating Telegram auth session:', error);
@@ -303,6 +502,10 @@ module.exports = {
   getDatabase,
   initDatabase,
   getSportAnalysis,
+  bumpCacheVersion,
+  isPlaceholderLogo,
+  applyLogoStatsDelta,
+  rebuildLogoStats,
   updateTeamStats,
   getTeamStats,
   closeDatabase,
@@ -1,5 +1,21 @@
 const jwt = require('jsonwebtoken');
 const { getDatabase } = require('./database_mongo');
+const { getCachedUser, setCachedUser, invalidateUser } = require('./services/userCache');
+
+// Each cluster worker has its own user cache and a password change only evicts
+// the entry on the worker that handled it, so cached users are re-checked
+// against the stored token_version
+const RECHECK_TOKEN_VERSION = process.env.CLUSTER_MODE === 'true';
+
+// Whether the stored token_version still matches (a single-field read)
+const tokenVersionMatches = async (userId, tokenVersion) => {
+  const { ObjectId } = require('mongodb');
+  const user = await getDatabase().collection('users').findOne(
+    { _id: new ObjectId(userId) },
+    { projection: { _id: 0, token_version: 1 } }
+  );
+  return Boolean(user) && (user.token_version || 0) === tokenVersion;
+};
 
 const authMiddleware = async (req, res, next) => {
   try {
@@ -10,6 +26,18 @@ const authMiddleware = async (req, res, next) => {
     }
 
     const decoded = jwt.verify(token, process.env.JWT_SECRET);
+    const tokenVersion = decoded.tokenVersion || 0;
+    
+    // Serve from the user cache when possible
+    const cachedUser = getCachedUser(decoded.userId, tokenVersion);
+    if (cachedUser) {
+      if (RECHECK_TOKEN_VERSION && !(await tokenVersionMatches(decoded.userId, tokenVersion))) {
+        invalidateUser(decoded.userId);
+        return res.status(401).json({ error: 'Token revoked.' });
+      }
+      req.user = cachedUser;
+      return next();
+    }
     
     // Get user from database
     const db = getDatabase();
@@ -24,6 +52,12 @@ const authMiddleware = async (req, res, next) => {
       return res.status(401).json({ error: 'Invalid token. User not found.' });
     }
     
+    // Tokens issued before a password change/reset are revoked
+    if ((user.token_version || 0) !== tokenVersion) {
+      return res.status(401).json({ error: 'Token revoked.' });
+    }
+    
+    setCachedUser(user);
     req.user = user;
     next();
   } catch (error) {
@@ -1,9 +1,9 @@
 const express = require('express');
 const { getDatabase } = require('../database_mongo');
-const RealMatchParser = require('../services/realMatchParser');
+const { getMatchParser } = require('../services/realMatchParser');
 
 const router = express.Router();
-const matchParser = new RealMatchParser();
+const matchParser = getMatchParser();
 
 // Sample predictions data (will be seeded into database)
 const samplePredictions = [
@@ -1,38 +1,66 @@
 const express = require('express');
+const { Readable } = require('stream');
+const { pipeline } = require('stream/promises');
 const router = express.Router();
-const { getDatabase } = require('../database_mongo');
-const RealMatchParser = require('../services/realMatchParser');
-const LogoService = require('../services/logoService');
+const { getDatabase, rebuildLogoStats } = require('../database_mongo');
+const { getMatchParser } = require('../services/realMatchParser');
+const { getLogoService } = require('../services/logoService');
+const referenceData = require('../services/referenceData');
+const matchStatusEngine = require('../services/matchStatusEngine');
+const responseCache = require('../services/responseCache');
+const matchStream = require('../services/matchStream');
+const appCache = require('../services/appCache');
+const { getLimiterStats } = require('../services/rateLimiter');
+const { getHttpClientStats } = require('../services/httpClients');
 
-// Initialize services
-const matchParser = new RealMatchParser();
-const logoService = new LogoService();
+// Process-wide service instances (shared with the scheduler)
+const matchParser = getMatchParser();
+const logoService = getLogoService();
+
+// The SSE hub diffs this parser's snapshot
+matchStream.setSnapshotSource(() => matchParser.getTodayMatchesSnapshot());
 
 // Get today's matches grouped by sport (only baseball and hockey)
+// Always answers from the last good snapshot; a stale snapshot triggers a background refresh
 router.get('/matches/today', async (req, res) => {
   try {
-    const matches = await matchParser.getTodayMatches();
+    const snapshot = await matchParser.getTodayMatchesSnapshot();
+    const ageSeconds = snapshot.ageMs !== null ? Math.floor(snapshot.ageMs / 1000) : null;
+    const generatedAt = snapshot.generatedAt ? snapshot.generatedAt.toISOString() : null;
     
-    // Filter to only include baseball and hockey matches
-    const filteredMatches = matches.filter(match => 
-      match.sport === 'baseball' || match.sport === 'hockey'
-    );
+    // Body depends only on the snapshot; age and staleness go in headers
+    const response = await responseCache.get('matches:today', `${generatedAt}:${snapshot.revision}`, () => {
+      // Filter to only include baseball and hockey matches
+      const filteredMatches = snapshot.matches.filter(match => 
+        match.sport === 'baseball' || match.sport === 'hockey'
+      );
+      
+      // Group matches by sport
+      const groupedMatches = filteredMatches.reduce((acc, match) => {
+        if (!acc[match.sport]) {
+          acc[match.sport] = [];
+        }
+        acc[match.sport].push(match);
+        return acc;
+      }, {});
+      
+      return {
+        success: true,
+        matches: groupedMatches,
+        total: filteredMatches.length,
+        timestamp: generatedAt,
+        snapshot: {
+          generated_at: generatedAt
+        }
+      };
+    });
     
-    // Group matches by sport
-    const groupedMatches = filteredMatches.reduce((acc, match) => {
-      if (!acc[match.sport]) {
-        acc[match.sport] = [];
-      }
-      acc[match.sport].push(match);
-      return acc;
-    }, {});
+    if (ageSeconds !== null) {
+      res.set('Age', String(ageSeconds));
+    }
+    res.set('X-Snapshot-Stale', String(snapshot.stale));
     
-    res.json({
-      success: true,
-      matches: groupedMatches,
-      total: filteredMatches.length,
-      timestamp: new Date().toISOString()
-    });
+    responseCache.send(req, res, response);
   } catch (error) {
     console.error('Error getting today matches:', error);
     res.status(500).json({
@@ -47,14 +75,21 @@ router.get('/matches/today', async (req, res) => {
 router.get('/matches/sport/:sport', async (req, res) => {
   try {
     const sport = req.params.sport;
-    const matches = await matchParser.getMatchesBySport(sport);
+    const snapshot = await matchParser.getTodayMatchesSnapshot();
+    const generatedAt = snapshot.generatedAt ? snapshot.generatedAt.toISOString() : null;
     
-    res.json({
-      success: true,
-      sport: sport,
-      matches: matches,
-      count: matches.length
+    const response = await responseCache.get(`matches:sport:${sport}`, `${generatedAt}:${snapshot.revision}`, () => {
+      const matches = snapshot.matches.filter(match => match.sport === sport);
+      return {
+        success: true,
+        sport: sport,
+        matches: matches,
+        count: matches.length
+      };
     });
+    
+    res.set('X-Snapshot-Stale', String(snapshot.stale));
+    responseCache.send(req, res, response);
   } catch (error) {
     console.error(`Error getting ${req.params.sport} matches:`, error);
     res.status(500).json({
@@ -65,6 +100,22 @@ router.get('/matches/sport/:sport', async (req, res) => {
   }
 });
 
+// Push channel for today's matches (Server-Sent Events).
+// Sends a 'snapshot' event, then 'update' / 'match' / 'remove' deltas;
+// reconnects with Last-Event-ID replay only the missed events.
+router.get('/matches/stream', async (req, res) => {
+  try {
+    await matchStream.subscribe(req, res);
+  } catch (error) {
+    console.error('Error opening match stream:', error);
+    if (!res.headersSent) {
+      res.status(500).json({ success: false, error: 'Failed to open match stream' });
+    } else {
+      res.end();
+    }
+  }
+});
+
 // Refresh all matches
 router.post('/matches/refresh', async (req, res) => {
   try {
@@ -103,12 +154,13 @@ router.post('/matches/refresh', async (req, res) => {
 router.post('/matches/update-daily', async (req, res) => {
   try {
     const matches = await matchParser.forceRefreshMatches();
-    await matchParser.saveMatchesToDatabase(matches);
+    const saveResult = await matchParser.saveMatchesToDatabase(matches);
     
     res.json({
       success: true,
       message: 'Daily matches updated successfully',
-      count: matches.length
+      count: matches.length,
+      saved: saveResult
     });
   } catch (error) {
     console.error('Error updating daily matches:', error);
@@ -119,6 +171,20 @@ router.post('/matches/update-daily', async (req, res) => {
   }
 });
 
+// Get match parser coalescing statistics
+router.get('/matches/parser-stats', (req, res) => {
+  res.json({
+    success: true,
+    ...matchParser.getCoalescingStats(),
+    rate_limiters: getLimiterStats(),
+    response_cache: responseCache.getStats(),
+    app_cache: appCache.getStats(),
+    status_engine: matchStatusEngine.getStats(),
+    match_stream: matchStream.getStats(),
+    http: getHttpClientStats()
+  });
+});
+
 // Get schedule info
 router.get('/matches/schedule-info', (req, res) => {
   try {
@@ -168,14 +234,23 @@ router.get('/logos/team/:teamName/:sport', async (req, res) => {
   }
 });
 
+// Get logo source health (circuit breakers, timings)
+router.get('/logos/sources', (req, res) => {
+  res.json({
+    success: true,
+    ...logoService.getSourceHealth()
+  });
+});
+
 // Update all team logos
 router.post('/logos/update-all', async (req, res) => {
   try {
-    await logoService.updateAllTeamLogos();
+    const report = await logoService.updateAllTeamLogos();
     
     res.json({
       success: true,
-      message: 'All team logos updated successfully'
+      message: 'All team logos updated successfully',
+      report
     });
   } catch (error) {
     console.error('Error updating all logos:', error);
@@ -186,19 +261,157 @@ router.post('/logos/update-all', async (req, res) => {
   }
 });
 
-// Get all team logos from database
+// Fields clients may request from /logos/all
+const LOGO_FIELDS = ['team_name', 'sport', 'logo_url', 'source', 'updated_at'];
+const LOGO_PAGE_SIZE = 500;
+const LOGO_MAX_PAGE_SIZE = 1000;
+
+// Opaque keyset cursor: the (sport, team_name) of the last returned logo
+const encodeLogoCursor = (logo) => Buffer.from(JSON.stringify([logo.sport, logo.team_name])).toString('base64url');
+
+const decodeLogoCursor = (cursor) => {
+  try {
+    const [sport, teamName] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+    if (typeof sport === 'string' && typeof teamName === 'string') {
+      return { sport, teamName };
+    }
+  } catch (error) {
+    // fall through
+  }
+  return null;
+};
+
+// Parse /logos/all query parameters; returns { error } on bad input
+const parseLogoQuery = (query) => {
+  const requested = query.fields
+    ? String(query.fields).split(',').map(field => field.trim()).filter(Boolean)
+    : LOGO_FIELDS;
+  const unknown = requested.filter(field => !LOGO_FIELDS.includes(field));
+  if (unknown.length > 0) {
+    return { error: `Unknown fields: ${unknown.join(', ')}` };
+  }
+  // Canonical order without duplicates, so equivalent requests share a cache entry
+  const fields = LOGO_FIELDS.filter(field => requested.includes(field));
+
+  const after = query.cursor ? decodeLogoCursor(String(query.cursor)) : null;
+  if (query.cursor && !after) {
+    return { error: 'Invalid cursor' };
+  }
+
+  // baseFilter selects the logos, filter additionally skips past the cursor
+  const baseFilter = query.sport ? { sport: String(query.sport) } : {};
+  const filter = after
+    ? {
+      ...baseFilter,
+      $or: [
+        { sport: { $gt: after.sport } },
+        { sport: after.sport, team_name: { $gt: after.teamName } }
+      ]
+    }
+    : baseFilter;
+
+  // Sort keys are always read so the next cursor can be built
+  const projection = { _id: 0, sport: 1, team_name: 1 };
+  fields.forEach(field => { projection[field] = 1; });
+
+  const limit = Math.max(1, Math.min(parseInt(query.limit) || LOGO_PAGE_SIZE, LOGO_MAX_PAGE_SIZE));
+
+  return { fields, baseFilter, filter, projection, limit, exactCount: query.exact_count === 'true' };
+};
+
+// Keep only the requested fields
+const pickLogoFields = (logo, fields) => {
+  const result = {};
+  fields.forEach(field => {
+    if (logo[field] !== undefined) result[field] = logo[field];
+  });
+  return result;
+};
+
+// Stream matching logos as NDJSON straight from the cursor
+const streamLogos = async (res, collection, { fields, filter, projection }) => {
+  const cursor = collection.find(filter, { projection })
+    .sort({ sport: 1, team_name: 1 })
+    .batchSize(200);
+  const lines = async function* () {
+    try {
+      for await (const logo of cursor) {
+        yield JSON.stringify(pickLogoFields(logo, fields)) + '\n';
+      }
+    } finally {
+      await cursor.close();
+    }
+  };
+
+  res.status(200);
+  res.set('Content-Type', 'application/x-ndjson; charset=utf-8');
+  res.set('Cache-Control', 'no-cache');
+
+  try {
+    // pipeline() waits for drain and stops reading the cursor if the client goes away
+    await pipeline(Readable.from(lines()), res);
+  } catch (error) {
+    if (error.code !== 'ERR_STREAM_PREMATURE_CLOSE') throw error;
+  }
+};
+
+// Get team logos from database (keyset-paginated, or streamed with format=ndjson)
 router.get('/logos/all', async (req, res) => {
+  const options = parseLogoQuery(req.query);
+  if (options.error) {
+    return res.status(400).json({
+      success: false,
+      error: options.error
+    });
+  }
+
   try {
-    const db = getDatabase();
-    const logos = await db.collection('team_logos').find({}).toArray();
+    const collection = getDatabase().collection('team_logos');
     
-    res.json({
-      success: true,
-      logos: logos,
-      count: logos.length
-    });
+    if (req.query.format === 'ndjson') {
+      return await streamLogos(res, collection, options);
+    }
+    
+    const buildPage = async () => {
+      const [page, total] = await Promise.all([
+        collection.find(options.filter, { projection: options.projection })
+          .sort({ sport: 1, team_name: 1 })
+          .limit(options.limit + 1)
+          .toArray(),
+        options.exactCount
+          ? collection.countDocuments(options.baseFilter)
+          : collection.estimatedDocumentCount()
+      ]);
+      
+      const hasMore = page.length > options.limit;
+      const logos = hasMore ? page.slice(0, options.limit) : page;
+      
+      return {
+        success: true,
+        logos: logos.map(logo => pickLogoFields(logo, options.fields)),
+        count: logos.length,
+        total: total,
+        total_is_estimate: !options.exactCount,
+        next_cursor: hasMore ? encodeLogoCursor(logos[logos.length - 1]) : null
+      };
+    };
+    
+    // Only first pages are cached; later pages are read once while a client walks the cursor
+    let response;
+    if (req.query.cursor) {
+      response = responseCache.buildResponse(await buildPage());
+    } else {
+      const cacheKey = `logos:all:${JSON.stringify([req.query.sport || null, options.fields, options.limit, options.exactCount])}`;
+      // Rebuilt when LogoService saves logos, and at least once a minute for other processes
+      response = await responseCache.get(cacheKey, null, buildPage, { maxAge: 60 * 1000 });
+    }
+    
+    responseCache.send(req, res, response);
   } catch (error) {
     console.error('Error getting all logos:', error);
+    if (res.headersSent) {
+      return res.end();
+    }
     res.status(500).json({
       success: false,
       error: 'Failed to get all logos'
@@ -209,11 +422,12 @@ router.get('/logos/all', async (req, res) => {
 // Clean up old logos
 router.post('/logos/cleanup', async (req, res) => {
   try {
-    await logoService.cleanupOldLogos();
+    const result = await logoService.cleanupOldLogos();
     
     res.json({
       success: true,
-      message: 'Old logos cleaned up successfully'
+      message: 'Old logos cleaned up successfully',
+      deleted: result.deleted
     });
   } catch (error) {
     console.error('Error cleaning up old logos:', error);
@@ -229,46 +443,28 @@ router.get('/logos/stats', async (req, res) => {
   try {
     const db = getDatabase();
     
-    // Get logo stats by sport
-    const logoStats = await db.collection('team_logos').aggregate([
-      {
-        $group: {
-          _id: '$sport',
-          count: { $sum: 1 },
-          real_logos: {
-            $sum: {
-              $cond: [
-                { $not: { $regexMatch: { input: '$logo_url', regex: 'placeholder' } } },
-                1,
-                0
-              ]
-            }
-          },
-          placeholder_logos: {
-            $sum: {
-              $cond: [
-                { $regexMatch: { input: '$logo_url', regex: 'placeholder' } },
-                1,
-                0
-              ]
-            }
-          }
-        }
-      }
-    ]).toArray();
+    // Materialized counters kept up to date by LogoService
+    let summary = await db.collection('logo_stats').findOne({ _id: 'summary' });
+    if (!summary) {
+      summary = await rebuildLogoStats();
+    }
     
-    // Get total counts
-    const totalLogos = await db.collection('team_logos').countDocuments();
-    const realLogos = await db.collection('team_logos').countDocuments({
-      logo_url: { $not: { $regex: 'placeholder' } }
-    });
+    const logoStats = Object.entries(summary.by_sport || {}).map(([sport, counts]) => ({
+      _id: sport,
+      count: counts.count,
+      real_logos: counts.real_logos,
+      placeholder_logos: counts.placeholder_logos
+    }));
+    
+    const totalLogos = summary.total_logos || 0;
+    const realLogos = summary.real_logos || 0;
     
     res.json({
       success: true,
       total_logos: totalLogos,
       real_logos: realLogos,
       placeholder_logos: totalLogos - realLogos,
-      percentage_real: Math.round((realLogos / totalLogos) * 100),
+      percentage_real: totalLogos > 0 ? Math.round((realLogos / totalLogos) * 100) : 0,
       by_sport: logoStats
     });
   } catch (error) {
@@ -283,10 +479,10 @@ router.get('/logos/stats', async (req, res) => {
 // Get statistics
 router.get('/stats', async (req, res) => {
   try {
-    const db = getDatabase();
-    let stats = await db.collection('stats').findOne({});
+    let stats = await referenceData.getStats();
     
     if (!stats) {
+      const db = getDatabase();
       // Create default stats
       stats = {
         total_predictions: 1247,
@@ -296,16 +492,20 @@ router.get('/stats', async (req, res) => {
         updated_at: new Date()
       };
       await db.collection('stats').insertOne(stats);
+      await referenceData.invalidate('stats');
     }
     
-    res.json({
+    // The reference cache returns a new object whenever stats are reloaded
+    const response = await responseCache.get('stats', stats, () => ({
       success: true,
       total_predictions: stats.total_predictions,
       success_rate: stats.success_rate,
       active_bettors: stats.active_bettors,
       monthly_wins: stats.monthly_wins,
       updated_at: stats.updated_at
-    });
+    }));
+    
+    responseCache.send(req, res, response);
   } catch (error) {
     console.error('Error getting stats:', error);
     res.status(500).json({
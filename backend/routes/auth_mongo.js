@@ -1,15 +1,32 @@
 const express = require('express');
-const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
 const validator = require('validator');
 const crypto = require('crypto');
 const { getDatabase, createTelegramAuthSession, updateTelegramAuthSession, getTelegramAuthSession } = require('../database_mongo');
 const authMiddleware = require('../middleware_mongo');
+const { invalidateUser } = require('../services/userCache');
+const passwordHasher = require('../services/passwordHasher');
+const authSessionNotifier = require('../services/authSessionNotifier');
 const { sendVerificationEmail, sendPasswordResetEmail } = require('../services/emailServiceSendGrid');
 const { generateTelegramLoginUrl, handleAuthConfirmation } = require('../services/telegramService');
 
 const router = express.Router();
 
+// Sign a JWT carrying the user's token_version (bumped on password change/reset)
+const generateToken = (user) => jwt.sign(
+  { userId: user._id, tokenVersion: user.token_version || 0 },
+  process.env.JWT_SECRET,
+  { expiresIn: process.env.JWT_EXPIRE }
+);
+
+// Answer 429 when the password hashing pool is saturated; returns true if handled
+const handleHasherBusy = (error, res) => {
+  if (error.code !== 'HASHER_BUSY') return false;
+  res.set('Retry-After', '1');
+  res.status(429).json({ error: 'Сервер перегружен, попробуйте через несколько секунд' });
+  return true;
+};
+
 // Generate secure tokens
 const generateSecureToken = () => {
   return crypto.randomBytes(32).toString('hex');
@@ -56,7 +73,7 @@ router.post('/register', async (req, res) => {
     }
 
     // Hash password
-    const hashedPassword = await bcrypt.hash(password, 12);
+    const hashedPassword = await passwordHasher.hash(password);
 
     // Generate verification token
     const verificationToken = generateSecureToken();
@@ -95,6 +112,7 @@ router.post('/register', async (req, res) => {
       email: email
     });
   } catch (error) {
+    if (handleHasherBusy(error, res)) return;
     console.error('Registration error:', error);
     res.status(500).json({ error: 'Ошибка сервера при регистрации' });
   }
@@ -136,13 +154,10 @@ router.post('/verify-email', async (req, res) => {
         }
       }
     );
+    invalidateUser(user._id);
 
     // Generate JWT token for auto-login
-    const jwtToken = jwt.sign(
-      { userId: user._id },
-      process.env.JWT_SECRET,
-      { expiresIn: process.env.JWT_EXPIRE }
-    );
+    const jwtToken = generateToken(user);
 
     res.json({
       message: 'Email успешно подтверждён!',
@@ -191,17 +206,13 @@ router.post('/login', async (req, res) => {
     }
 
     // Check password
-    const isPasswordValid = await bcrypt.compare(password, user.password);
+    const isPasswordValid = await passwordHasher.verify(password, user.password);
     if (!isPasswordValid) {
       return res.status(401).json({ error: 'Неверный email или пароль' });
     }
 
     // Generate JWT token
-    const token = jwt.sign(
-      { userId: user._id },
-      process.env.JWT_SECRET,
-      { expiresIn: process.env.JWT_EXPIRE }
-    );
+    const token = generateToken(user);
 
     res.json({
       message: 'Успешный вход',
@@ -215,6 +226,7 @@ router.post('/login', async (req, res) => {
       }
     });
   } catch (error) {
+    if (handleHasherBusy(error, res)) return;
     console.error('Login error:', error);
     res.status(500).json({ error: 'Ошибка сервера при входе' });
   }
@@ -256,6 +268,7 @@ router.post('/resend-verification', async (req, res) => {
         }
       }
     );
+    invalidateUser(user._id);
 
     // Send verification email
     const emailResult = await sendVerificationEmail(email, verificationToken, user.username);
@@ -308,6 +321,7 @@ router.post('/forgot-password', async (req, res) => {
         }
       }
     );
+    invalidateUser(user._id);
 
     // Send password reset email
     const emailResult = await sendPasswordResetEmail(email, resetToken, user.username);
@@ -353,9 +367,9 @@ router.post('/reset-password', async (req, res) => {
     }
 
     // Hash new password
-    const hashedPassword = await bcrypt.hash(password, 12);
+    const hashedPassword = await passwordHasher.hash(password);
 
-    // Update user password and remove reset token
+    // Update user password, remove reset token and revoke issued tokens
     await db.collection('users').updateOne(
       { _id: user._id },
       {
@@ -363,15 +377,18 @@ router.post('/reset-password', async (req, res) => {
           password: hashedPassword,
           updated_at: new Date()
         },
+        $inc: { token_version: 1 },
         $unset: {
           password_reset_token: '',
           password_reset_token_expires: ''
         }
       }
     );
+    invalidateUser(user._id);
 
     res.json({ message: 'Пароль успешно изменён' });
   } catch (error) {
+    if (handleHasherBusy(error, res)) return;
     console.error('Reset password error:', error);
     res.status(500).json({ error: 'Ошибка сервера при сбросе пароля' });
   }
@@ -402,12 +419,51 @@ router.post('/telegram-auth-start', async (req, res) => {
   }
 });
 
-// Check Telegram auth status
+// Long-poll limits for /telegram-auth-status?wait=<seconds>
+const TELEGRAM_AUTH_MAX_WAIT = 30 * 1000;
+const TELEGRAM_AUTH_RECHECK = 5 * 1000;
+
+// Hold the request until the session leaves 'pending', expires or waitMs passes.
+// Returns the latest session, or undefined if the client disconnected.
+const waitForTelegramSession = async (req, res, session, waitMs) => {
+  const deadline = Math.min(Date.now() + waitMs, new Date(session.expires_at).getTime());
+  const controller = new AbortController();
+  const onClose = () => controller.abort();
+  res.on('close', onClose);
+
+  try {
+    let latest = session;
+    while (Date.now() < deadline) {
+      await authSessionNotifier.wait(
+        session.auth_token,
+        Math.min(deadline - Date.now(), TELEGRAM_AUTH_RECHECK),
+        controller.signal
+      );
+      if (controller.signal.aborted) return undefined;
+
+      latest = await getTelegramAuthSession(session.auth_token);
+      if (!latest || latest.status !== 'pending') break;
+    }
+    return latest;
+  } finally {
+    res.off('close', onClose);
+  }
+};
+
+// Check Telegram auth status.
+// With ?wait=<seconds> (up to 30) a pending session is held open until the
+// webhook confirms it or the session expires, instead of answering at once.
 router.get('/telegram-auth-status/:token', async (req, res) => {
   try {
     const { token } = req.params;
+    const waitMs = Math.min((parseInt(req.query.wait) || 0) * 1000, TELEGRAM_AUTH_MAX_WAIT);
+
+    let session = await getTelegramAuthSession(token);
 
-    const session = await getTelegramAuthSession(token);
+    if (session && session.status === 'pending' && waitMs > 0 && session.expires_at > new Date()) {
+      session = await waitForTelegramSession(req, res, session, waitMs);
+      if (session === undefined) return; // client went away
+    }
 
     if (!session) {
       return res.status(404).json({ error: 'Сессия не найдена' });
@@ -444,6 +500,7 @@ router.get('/telegram-auth-status/:token', async (req, res) => {
               }
             }
           );
+          invalidateUser(user._id);
         }
       }
 
@@ -468,11 +525,7 @@ router.get('/telegram-auth-status/:token', async (req, res) => {
 
       if (user) {
         // Generate JWT token
-        const jwtToken = jwt.sign(
-          { userId: user._id },
-          process.env.JWT_SECRET,
-          { expiresIn: process.env.JWT_EXPIRE }
-        );
+        const jwtToken = generateToken(user);
 
         return res.json({
           status: 'confirmed',
@@ -540,6 +593,7 @@ router.post('/telegram-link', async (req, res) => {
     });
 
     if (user) {
+      invalidateUser(user._id);
       return res.json({
         success: true,
         user_id: user._id,
@@ -654,27 +708,35 @@ router.put('/change-password', authMiddleware, async (req, res) => {
     }
 
     // Verify current password
-    const isCurrentPasswordValid = await bcrypt.compare(currentPassword, user.password);
+    const isCurrentPasswordValid = await passwordHasher.verify(currentPassword, user.password);
     if (!isCurrentPasswordValid) {
       return res.status(400).json({ error: 'Неверный текущий пароль' });
     }
 
     // Hash new password
-    const hashedNewPassword = await bcrypt.hash(newPassword, 12);
+    const hashedNewPassword = await passwordHasher.hash(newPassword);
 
-    // Update password
-    await db.collection('users').updateOne(
+    // Update password and revoke previously issued tokens
+    const updatedUser = await db.collection('users').findOneAndUpdate(
       { _id: new ObjectId(req.user._id) },
       {
         $set: {
           password: hashedNewPassword,
           updated_at: new Date()
-        }
-      }
+        },
+        $inc: { token_version: 1 }
+      },
+      { returnDocument: 'after', projection: { token_version: 1 } }
     );
+    invalidateUser(req.user._id);
 
-    res.json({ message: 'Пароль успешно изменен' });
+    // New token so the current session stays signed in
+    res.json({
+      message: 'Пароль успешно изменен',
+      token: generateToken(updatedUser)
+    });
   } catch (error) {
+    if (handleHasherBusy(error, res)) return;
     console.error('Change password error:', error);
     res.status(500).json({ error: 'Ошибка сервера при смене пароля' });
   }
@@ -683,7 +745,8 @@ router.put('/change-password', authMiddleware, async (req, res) => {
 // Logout (client-side token removal, but we can add token blacklisting if needed)
 router.post('/logout', authMiddleware, async (req, res) => {
   try {
-    // In a more complex app, you might want to blacklist the token
+    // Drop the cached user; token revocation happens via token_version on password change
+    invalidateUser(req.user._id);
     res.json({ message: 'Успешный выход' });
   } catch (error) {
     console.error('Logout error:', error);
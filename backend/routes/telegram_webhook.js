@@ -1,15 +1,13 @@
 const express = require('express');
 const { updateTelegramAuthSession, getTelegramAuthSession } = require('../database_mongo');
-const { processWebhookUpdate } = require('../services/telegramService');
+const { processWebhookUpdate, broadcastTelegramMessage } = require('../services/telegramService');
+const telegramOutbox = require('../services/telegramOutbox');
 
 const router = express.Router();
 
-// Telegram webhook endpoint
-router.post('/webhook', async (req, res) => {
+// Process an update; errors are logged, never thrown
+const handleUpdate = async (update) => {
   try {
-    const update = req.body;
-    
-    // Process webhook update
     const result = await processWebhookUpdate(update);
     
     if (result.success && result.authToken) {
@@ -20,11 +18,48 @@ router.post('/webhook', async (req, res) => {
         telegram_user_info: result.from
       });
     }
-    
-    res.status(200).json({ ok: true });
   } catch (error) {
     console.error('Telegram webhook error:', error);
-    res.status(200).json({ ok: true }); // Always return 200 to Telegram
+  }
+};
+
+// Telegram webhook endpoint.
+// The update is stored before acknowledging (an acknowledged update is never
+// redelivered); replies go through the outbox, so this is only a few Mongo writes.
+router.post('/webhook', async (req, res) => {
+  await handleUpdate(req.body);
+  res.status(200).json({ ok: true });
+});
+
+// Queue a message to every linked Telegram user.
+// Disabled unless TELEGRAM_BROADCAST_SECRET is set and sent as X-Broadcast-Secret.
+router.post('/broadcast', async (req, res) => {
+  try {
+    const secret = process.env.TELEGRAM_BROADCAST_SECRET;
+    if (!secret || req.get('X-Broadcast-Secret') !== secret) {
+      return res.status(403).json({ success: false, error: 'Broadcast is not allowed' });
+    }
+    
+    const { text } = req.body;
+    if (!text) {
+      return res.status(400).json({ success: false, error: 'Message text is required' });
+    }
+    
+    const result = await broadcastTelegramMessage(text);
+    res.json({ success: true, broadcast_id: result.broadcastId, queued: result.queued });
+  } catch (error) {
+    console.error('Error queueing Telegram broadcast:', error);
+    res.status(500).json({ success: false, error: 'Failed to queue broadcast' });
+  }
+});
+
+// Outbox queue depth and dispatcher counters
+router.get('/outbox-stats', async (req, res) => {
+  try {
+    res.json({ success: true, outbox: await telegramOutbox.getStats() });
+  } catch (error) {
+    console.error('Error getting Telegram outbox stats:', error);
+    res.status(500).json({ success: false, error: 'Failed to get outbox stats' });
   }
 });
 
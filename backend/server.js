@@ -1,3 +1,5 @@
+const cluster = require('cluster');
+const os = require('os');
 const express = require('express');
 const cors = require('cors');
 const helmet = require('helmet');
@@ -9,6 +11,16 @@ const authRoutes = require('./routes/auth_mongo');
 const apiRoutes = require('./routes/api_mongo');
 const telegramRoutes = require('./routes/telegram_webhook');
 const Scheduler = require('./services/scheduler');
+const { getUserCacheStats } = require('./services/userCache');
+const passwordHasher = require('./services/passwordHasher');
+const schedulerLeader = require('./services/leaderElection');
+const telegramOutbox = require('./services/telegramOutbox');
+const authSessionNotifier = require('./services/authSessionNotifier');
+const { registry: metricsRegistry, httpMetricsMiddleware } = require('./services/metrics');
+const { requestLogger, getLoggerStats } = require('./services/logger');
+const { getMatchParser } = require('./services/realMatchParser');
+const { getLogoService } = require('./services/logoService');
+const referenceData = require('./services/referenceData');
 
 const app = express();
 const PORT = process.env.PORT || 8001;
@@ -22,6 +34,8 @@ const limiter = rateLimit({
 
 // Middleware
 app.set('trust proxy', 1); // Trust first proxy
+app.use(httpMetricsMiddleware); // first, so rate-limited and rejected requests are counted too
+app.use(requestLogger()); // structured line per request (status, duration), written in batches
 app.use(helmet({
   crossOriginEmbedderPolicy: false // Отключаем для локальной разработки
 }));
@@ -62,12 +76,6 @@ app.use(cors({
 app.use(express.json({ limit: '10mb' }));
 app.use(express.urlencoded({ extended: true, limit: '10mb' }));
 
-// Добавляем логирование для отладки
-app.use((req, res, next) => {
-  console.log(`${new Date().toISOString()} - ${req.method} ${req.path}`);
-  next();
-});
-
 // Routes
 app.get('/', (req, res) => {
   res.json({ 
@@ -84,10 +92,22 @@ app.get('/api/health', (req, res) => {
     timestamp: new Date().toISOString(),
     uptime: process.uptime(),
     database: 'mongodb://localhost:27017/sport_predictions',
-    cors_enabled: true
+    cors_enabled: true,
+    pid: process.pid,
+    scheduler_leader: schedulerLeader.getState(),
+    auth_user_cache: getUserCacheStats(),
+    password_hasher: passwordHasher.getStats(),
+    telegram_auth_waits: authSessionNotifier.getStats(),
+    logger: getLoggerStats()
   });
 });
 
+// Prometheus metrics for this process (routes, upstreams, caches, MongoDB, event loop)
+app.get('/api/metrics', (req, res) => {
+  res.set('Content-Type', 'text/plain; version=0.0.4; charset=utf-8');
+  res.send(metricsRegistry.render());
+});
+
 // Auth routes
 app.use('/api/auth', authRoutes);
 
@@ -120,18 +140,78 @@ app.use('*', (req, res) => {
   });
 });
 
+// Pre-load in-process caches from Mongo so the first requests after a restart
+// are served warm instead of triggering an upstream fan-out. Failures only
+// cost a cold cache. Returns per-cache timings and counts.
+const hydrateCaches = async () => {
+  const matchParser = getMatchParser();
+  const logoService = getLogoService();
+  const results = {};
+
+  const hydrate = async (name, load) => {
+    const startedAt = Date.now();
+    try {
+      const count = await load();
+      results[name] = { ms: Date.now() - startedAt, count };
+    } catch (error) {
+      results[name] = { ms: Date.now() - startedAt, error: error.message };
+      console.error(`❌ Error warming ${name} cache:`, error.message);
+    }
+  };
+
+  await Promise.all([
+    hydrate('matches', async () => {
+      await matchParser.loadSnapshotFromDatabase(matchParser.getTodayString().iso);
+      return matchParser.snapshot ? matchParser.snapshot.matches.length : 0;
+    }),
+    hydrate('logos', () => logoService.hydrateCache()),
+    hydrate('analyses', async () => {
+      const [analysesBySport] = await Promise.all([referenceData.loadAnalyses(), referenceData.loadStats()]);
+      return Array.from(analysesBySport.values()).reduce((sum, list) => sum + list.length, 0);
+    })
+  ]);
+
+  return results;
+};
+
+const formatTimings = (timings) => Object.entries(timings)
+  .map(([name, value]) => {
+    if (typeof value === 'number') return `${name} ${value}ms`;
+    const detail = value.error ? `failed: ${value.error}` : `${value.count}`;
+    return `${name} ${value.ms}ms (${detail})`;
+  })
+  .join(', ');
+
 // Initialize database and start server
 const startServer = async () => {
+  const startedAt = Date.now();
+  const timings = {};
+  
   try {
     console.log('🔄 Initializing database connection...');
-    await initDatabase();
+    Object.assign(timings, await initDatabase());
     console.log('✅ Database connected successfully');
     
+    // Leader election and cache warm-up are independent: run them together
+    const parallelStart = Date.now();
+    const [, cacheTimings] = await Promise.all([
+      // Only the elected leader runs scheduled jobs and upstream refreshes
+      schedulerLeader.start(),
+      hydrateCaches()
+    ]);
+    timings.leader_and_caches = Date.now() - parallelStart;
+    console.log(`🔥 Caches warmed: ${formatTimings(cacheTimings)}`);
+    
+    // Outbound Telegram messages are delivered by the leader's dispatcher
+    telegramOutbox.start();
+    
     // Initialize scheduler for daily match updates
     scheduler = new Scheduler();
     console.log('⏰ Scheduler инициализирован для ежедневного обновления матчей');
     
     app.listen(PORT, '0.0.0.0', () => {
+      timings.total = Date.now() - startedAt;
+      console.log(`⏱️ Startup: ${formatTimings(timings)}`);
       console.log('\n🚀 =================================');
       console.log(`🚀 Server running on http://localhost:${PORT}`);
       console.log(`📍 Environment: ${process.env.NODE_ENV || 'development'}`);
@@ -143,6 +223,7 @@ const startServer = async () => {
       // Показываем доступные endpoints
       console.log('📋 Available API endpoints:');
       console.log(`   GET  http://localhost:${PORT}/api/health`);
+      console.log(`   GET  http://localhost:${PORT}/api/metrics`);
       console.log(`   GET  http://localhost:${PORT}/api/stats`);
       console.log(`   GET  http://localhost:${PORT}/api/matches/today`);
       console.log(`   POST http://localhost:${PORT}/api/auth/register`);
@@ -156,6 +237,32 @@ const startServer = async () => {
   }
 };
 
-startServer();
+// Release the scheduler lease on shutdown so another process takes over at once
+const shutdown = async (signal) => {
+  console.log(`🛑 ${signal} received, shutting down (pid ${process.pid})`);
+  telegramOutbox.stop();
+  await schedulerLeader.stop();
+  process.exit(0);
+};
+
+// CLUSTER_MODE=true: the primary forks one HTTP worker per core (WEB_CONCURRENCY overrides)
+if (process.env.CLUSTER_MODE === 'true' && cluster.isPrimary) {
+  const workerCount = parseInt(process.env.WEB_CONCURRENCY) || os.cpus().length;
+  console.log(`🧩 Cluster mode: primary ${process.pid} starting ${workerCount} workers`);
+  
+  for (let i = 0; i < workerCount; i++) {
+    cluster.fork();
+  }
+  
+  cluster.on('exit', (worker, code, signal) => {
+    if (worker.exitedAfterDisconnect) return;
+    console.log(`⚠️ Worker ${worker.process.pid} exited (${signal || code}), starting a new one`);
+    setTimeout(() => cluster.fork(), 1000); // avoid a tight crash loop
+  });
+} else {
+  process.on('SIGTERM', () => shutdown('SIGTERM'));
+  process.on('SIGINT', () => shutdown('SIGINT'));
+  startServer();
+}
 
 module.exports = app;
\ No newline at end of file
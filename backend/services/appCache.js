@@ -0,0 +1,11 @@
+const LRUCache = require('./lruCache');
+
+// Process-wide cache for service data, bounded by entry count and estimated
+// memory. Each service uses its own namespace (e.g. 'parser', 'logos').
+const appCache = new LRUCache({
+  max: parseInt(process.env.APP_CACHE_MAX_ENTRIES) || 20000,
+  maxBytes: (parseInt(process.env.APP_CACHE_MAX_MB) || 64) * 1024 * 1024,
+  pruneInterval: 5 * 60 * 1000
+});
+
+module.exports = appCache;
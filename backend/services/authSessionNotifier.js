@@ -0,0 +1,69 @@
+// Wakes long-polling /telegram-auth-status requests when their session changes.
+// Notifications are in-process only; waiters re-read the session every
+// recheck interval to pick up confirmations written by other processes.
+class AuthSessionNotifier {
+  constructor() {
+    this.waiters = new Map(); // auth token -> Set of resolve callbacks
+    this.stats = { waits: 0, notified: 0, timed_out: 0 };
+  }
+
+  // Resolves true when notified, false on timeout or abort
+  wait(authToken, timeoutMs, signal) {
+    this.stats.waits++;
+
+    return new Promise(resolve => {
+      let timer = null;
+
+      const done = (notified) => {
+        clearTimeout(timer);
+        signal?.removeEventListener('abort', onAbort);
+
+        const set = this.waiters.get(authToken);
+        if (set) {
+          set.delete(done);
+          if (set.size === 0) this.waiters.delete(authToken);
+        }
+
+        if (notified) {
+          this.stats.notified++;
+        } else {
+          this.stats.timed_out++;
+        }
+        resolve(notified);
+      };
+      const onAbort = () => done(false);
+
+      if (signal?.aborted) {
+        done(false);
+        return;
+      }
+
+      timer = setTimeout(() => done(false), Math.max(0, timeoutMs));
+      signal?.addEventListener('abort', onAbort);
+
+      if (!this.waiters.has(authToken)) {
+        this.waiters.set(authToken, new Set());
+      }
+      this.waiters.get(authToken).add(done);
+    });
+  }
+
+  notify(authToken) {
+    const set = this.waiters.get(authToken);
+    if (!set) return;
+
+    for (const done of [...set]) {
+      done(true);
+    }
+  }
+
+  getStats() {
+    let waiting = 0;
+    for (const set of this.waiters.values()) {
+      waiting += set.size;
+    }
+    return { waiting, ...this.stats };
+  }
+}
+
+module.exports = new AuthSessionNotifier();
@@ -0,0 +1,73 @@
+// Simple circuit breaker: opens after `failureThreshold` consecutive failures,
+// rejects calls for `resetTimeout` ms, then lets a single trial call through (half-open).
+class CircuitBreaker {
+  constructor(name, options = {}) {
+    this.name = name;
+    this.failureThreshold = options.failureThreshold || 5;
+    this.resetTimeout = options.resetTimeout || 60 * 1000;
+    this.state = 'closed'; // closed, open, half_open
+    this.failures = 0;
+    this.openedAt = 0;
+    this.trialInFlight = false;
+    this.stats = { successes: 0, failures: 0, rejected: 0, opened: 0 };
+  }
+
+  // Whether a call may go through right now
+  canRequest() {
+    if (this.state === 'closed') return true;
+
+    if (this.state === 'open' && Date.now() - this.openedAt >= this.resetTimeout) {
+      this.state = 'half_open';
+      this.trialInFlight = false;
+    }
+
+    if (this.state === 'half_open' && !this.trialInFlight) {
+      this.trialInFlight = true;
+      return true;
+    }
+
+    this.stats.rejected++;
+    return false;
+  }
+
+  recordSuccess() {
+    this.stats.successes++;
+    this.failures = 0;
+    this.trialInFlight = false;
+    if (this.state !== 'closed') {
+      console.log(`✅ Circuit breaker "${this.name}" closed`);
+    }
+    this.state = 'closed';
+  }
+
+  recordFailure() {
+    this.stats.failures++;
+    this.failures++;
+    this.trialInFlight = false;
+
+    if (this.state === 'half_open' || this.failures >= this.failureThreshold) {
+      if (this.state !== 'open') {
+        this.stats.opened++;
+        console.log(`🚫 Circuit breaker "${this.name}" opened after ${this.failures} failures`);
+      }
+      this.state = 'open';
+      this.openedAt = Date.now();
+    }
+  }
+
+  // Call finished without telling us anything about the source's health
+  releaseTrial() {
+    this.trialInFlight = false;
+  }
+
+  getState() {
+    return {
+      state: this.state,
+      consecutive_failures: this.failures,
+      opened_at: this.openedAt ? new Date(this.openedAt).toISOString() : null,
+      ...this.stats
+    };
+  }
+}
+
+module.exports = CircuitBreaker;
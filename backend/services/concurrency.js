@@ -0,0 +1,38 @@
+// Create a limiter that runs at most `concurrency` tasks at once.
+// Usage: const limit = createLimiter(4); await limit(() => doWork());
+const createLimiter = (concurrency) => {
+  const max = Math.max(1, concurrency || 1);
+  const queue = [];
+  let active = 0;
+
+  const next = () => {
+    if (active >= max || queue.length === 0) return;
+
+    active++;
+    const { task, resolve, reject } = queue.shift();
+    Promise.resolve()
+      .then(task)
+      .then(resolve, reject)
+      .finally(() => {
+        active--;
+        next();
+      });
+  };
+
+  const limit = (task) => new Promise((resolve, reject) => {
+    queue.push({ task, resolve, reject });
+    next();
+  });
+
+  Object.defineProperties(limit, {
+    activeCount: { get: () => active },
+    pendingCount: { get: () => queue.length },
+    concurrency: { value: max }
+  });
+
+  return limit;
+};
+
+module.exports = {
+  createLimiter
+};
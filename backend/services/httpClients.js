@@ -0,0 +1,173 @@
+const http = require('http');
+const https = require('https');
+const dns = require('dns');
+const axios = require('axios');
+const { instrumentAxios } = require('./metrics');
+
+// Long-lived axios clients, one per upstream, sharing keep-alive agents
+// so refresh passes reuse TCP/TLS connections instead of reconnecting per call.
+
+const DEFAULT_OPTIONS = {
+  timeout: 15000,
+  maxSockets: 10,
+  maxFreeSockets: 5,
+  maxContentLength: 5 * 1024 * 1024, // 5 MB
+  maxRedirects: 3
+};
+
+// DNS cache shared by every agent
+const dnsTtl = (parseInt(process.env.HTTP_DNS_CACHE_SECONDS) || 300) * 1000;
+const dnsCache = new Map(); // hostname -> { addresses, expiresAt, pending }
+const dnsStats = { hits: 0, misses: 0, errors: 0 };
+
+// Drop-in replacement for dns.lookup used by the agents
+const cachedLookup = (hostname, options, callback) => {
+  if (typeof options === 'function') {
+    callback = options;
+    options = {};
+  } else if (typeof options === 'number') {
+    options = { family: options };
+  }
+  options = options || {};
+
+  const reply = (addresses) => {
+    const family = options.family === 4 || options.family === 6 ? options.family : 0;
+    const matching = family ? addresses.filter(entry => entry.family === family) : addresses;
+    if (matching.length === 0) {
+      const error = new Error(`getaddrinfo ENOTFOUND ${hostname}`);
+      error.code = 'ENOTFOUND';
+      return callback(error);
+    }
+    if (options.all) return callback(null, matching);
+    return callback(null, matching[0].address, matching[0].family);
+  };
+
+  const cached = dnsCache.get(hostname);
+  if (cached && cached.addresses && cached.expiresAt > Date.now()) {
+    dnsStats.hits++;
+    return process.nextTick(reply, cached.addresses);
+  }
+
+  // Concurrent lookups for the same host share one resolver call
+  if (cached && cached.pending) {
+    dnsStats.hits++;
+    cached.pending.push({ reply, callback });
+    return;
+  }
+
+  dnsStats.misses++;
+  const entry = { addresses: null, expiresAt: 0, pending: [{ reply, callback }] };
+  dnsCache.set(hostname, entry);
+
+  dns.lookup(hostname, { all: true }, (error, addresses) => {
+    const waiters = entry.pending;
+    entry.pending = null;
+
+    if (error) {
+      dnsStats.errors++;
+      dnsCache.delete(hostname);
+      waiters.forEach(waiter => waiter.callback(error));
+      return;
+    }
+
+    entry.addresses = addresses;
+    entry.expiresAt = Date.now() + dnsTtl;
+    waiters.forEach(waiter => waiter.reply(addresses));
+  });
+};
+
+const clients = new Map(); // name -> { client, agents, stats }
+
+const createAgents = (options) => {
+  const agentOptions = {
+    keepAlive: true,
+    maxSockets: options.maxSockets,
+    maxFreeSockets: options.maxFreeSockets,
+    scheduling: 'lifo', // keep the warmest sockets busy, let idle ones time out
+    lookup: cachedLookup
+  };
+  return {
+    http: new http.Agent(agentOptions),
+    https: new https.Agent(agentOptions)
+  };
+};
+
+// Get (or create) the pooled client for an upstream.
+// Options are only applied on first use; later callers share the same client.
+const getHttpClient = (name, options = {}) => {
+  if (clients.has(name)) {
+    return clients.get(name).client;
+  }
+
+  const config = { ...DEFAULT_OPTIONS, ...options };
+  const agents = createAgents(config);
+  const stats = { requests: 0, reused: 0, new_connections: 0, errors: 0 };
+
+  const client = axios.create({
+    baseURL: config.baseURL,
+    headers: config.headers,
+    timeout: config.timeout,
+    maxRedirects: config.maxRedirects,
+    maxContentLength: config.maxContentLength,
+    maxBodyLength: config.maxContentLength,
+    httpAgent: agents.http,
+    httpsAgent: agents.https
+  });
+
+  const recordConnection = (request) => {
+    if (!request) return;
+    stats.requests++;
+    if (request.reusedSocket) {
+      stats.reused++;
+    } else {
+      stats.new_connections++;
+    }
+  };
+
+  client.interceptors.response.use(
+    (response) => {
+      recordConnection(response.request);
+      return response;
+    },
+    (error) => {
+      stats.errors++;
+      if (error.response) {
+        recordConnection(error.response.request);
+      }
+      return Promise.reject(error);
+    }
+  );
+
+  instrumentAxios(name, client);
+
+  clients.set(name, { client, agents, stats });
+  return client;
+};
+
+const countSockets = (sockets) => Object.values(sockets)
+  .reduce((sum, list) => sum + list.length, 0);
+
+// Connection reuse and pool usage per client, plus DNS cache counters
+const getHttpClientStats = () => {
+  const result = {};
+  for (const [name, { agents, stats }] of clients) {
+    result[name] = {
+      ...stats,
+      reuse_ratio: stats.requests > 0 ? Math.round((stats.reused / stats.requests) * 1000) / 1000 : 0,
+      active_sockets: countSockets(agents.http.sockets) + countSockets(agents.https.sockets),
+      idle_sockets: countSockets(agents.http.freeSockets) + countSockets(agents.https.freeSockets),
+      queued_requests: countSockets(agents.http.requests) + countSockets(agents.https.requests)
+    };
+  }
+
+  return {
+    clients: result,
+    dns: { ...dnsStats, cached_hosts: dnsCache.size, ttl_seconds: dnsTtl / 1000 }
+  };
+};
+
+module.exports = {
+  getHttpClient,
+  getHttpClientStats,
+  cachedLookup
+};
@@ -0,0 +1,121 @@
+const os = require('os');
+const crypto = require('crypto');
+const EventEmitter = require('events');
+const { getDatabase } = require('../database_mongo');
+
+// Mongo lease-based leader election. The holder of the `leases` document
+// `{ _id: name }` renews it every `renewMs`; if it stops renewing, another
+// process takes over once `expires_at` passes. Emits 'elected' and 'revoked'.
+class LeaderElection extends EventEmitter {
+  constructor(name, { leaseMs = 30 * 1000, renewMs = 10 * 1000 } = {}) {
+    super();
+    this.name = name;
+    this.leaseMs = leaseMs;
+    this.renewMs = renewMs;
+    this.holderId = `${os.hostname()}:${process.pid}:${crypto.randomBytes(4).toString('hex')}`;
+    this.started = false;
+    this.leader = false;
+    this.leaseExpiresAt = 0;
+    this.timer = null;
+  }
+
+  async start() {
+    if (this.started) return;
+    this.started = true;
+
+    await this.tryAcquire();
+    this.timer = setInterval(() => this.tryAcquire(), this.renewMs);
+    this.timer.unref();
+  }
+
+  // Release the lease so another process can take over immediately
+  async stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+
+    if (this.leader) {
+      try {
+        await getDatabase().collection('leases').deleteOne({ _id: this.name, holder: this.holderId });
+      } catch (error) {
+        console.error(`❌ Error releasing ${this.name} lease:`, error.message);
+      }
+    }
+    this.setLeader(false);
+    this.started = false;
+  }
+
+  // Take the lease if it's free or expired, or renew it if we hold it
+  async tryAcquire() {
+    const now = Date.now();
+    const expiresAt = new Date(now + this.leaseMs);
+
+    try {
+      const lease = await getDatabase().collection('leases').findOneAndUpdate(
+        {
+          _id: this.name,
+          $or: [{ holder: this.holderId }, { expires_at: { $lte: new Date(now) } }]
+        },
+        { $set: { holder: this.holderId, expires_at: expiresAt, renewed_at: new Date(now) } },
+        { upsert: true, returnDocument: 'after' }
+      );
+
+      const acquired = Boolean(lease && lease.holder === this.holderId);
+      if (acquired) {
+        this.leaseExpiresAt = expiresAt.getTime();
+      }
+      this.setLeader(acquired);
+    } catch (error) {
+      // Duplicate key: the lease exists and belongs to someone else
+      if (error.code === 11000) {
+        this.setLeader(false);
+        return;
+      }
+
+      console.error(`❌ Error renewing ${this.name} lease:`, error.message);
+      // Step down once our lease may have been taken over
+      if (this.leader && Date.now() >= this.leaseExpiresAt) {
+        this.setLeader(false);
+      }
+    }
+  }
+
+  setLeader(leader) {
+    if (leader === this.leader) return;
+
+    this.leader = leader;
+    if (leader) {
+      console.log(`👑 Process ${process.pid} elected ${this.name} leader`);
+      this.emit('elected');
+    } else {
+      console.log(`🔻 Process ${process.pid} is no longer ${this.name} leader`);
+      this.emit('revoked');
+    }
+  }
+
+  // Whether this process should run leader-only work.
+  // Before start() (scripts, tests) every process acts as its own leader.
+  isLeader() {
+    return !this.started || this.leader;
+  }
+
+  getState() {
+    return {
+      name: this.name,
+      holder_id: this.holderId,
+      started: this.started,
+      leader: this.isLeader(),
+      lease_expires_at: this.leader ? new Date(this.leaseExpiresAt).toISOString() : null
+    };
+  }
+}
+
+// Process-wide election for scheduler jobs and upstream refreshes
+const schedulerLeader = new LeaderElection('scheduler', {
+  leaseMs: (parseInt(process.env.LEADER_LEASE_SECONDS) || 30) * 1000,
+  renewMs: (parseInt(process.env.LEADER_RENEW_SECONDS) || 10) * 1000
+});
+
+module.exports = schedulerLeader;
+module.exports.LeaderElection = LeaderElection;
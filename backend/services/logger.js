@@ -0,0 +1,213 @@
+const fs = require('fs');
+
+// Structured JSON logger with levels, per-module sampling and batched writes.
+//
+// Lines are buffered and written to stdout in batches off the hot path; if
+// stdout can't keep up the buffer is bounded and new lines are dropped (and
+// counted) instead of growing memory or blocking the event loop.
+//
+//   LOG_LEVEL=debug|info|warn|error          minimum level (default info)
+//   LOG_FORMAT=json|pretty                   pretty is one readable line per entry
+//   LOG_SAMPLE_<MODULE>=0..1                 sampling for a module's debug/info lines,
+//                                            e.g. LOG_SAMPLE_LOGO_CACHE=0.01
+//   LOG_BUFFER_SIZE, LOG_FLUSH_MS            buffer bound and max batching delay
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40 };
+
+const minLevel = LEVELS[process.env.LOG_LEVEL] || LEVELS.info;
+const pretty = process.env.LOG_FORMAT === 'pretty';
+const bufferSize = parseInt(process.env.LOG_BUFFER_SIZE) || 10000;
+const flushMs = parseInt(process.env.LOG_FLUSH_MS) || 100;
+const batchSize = 500;
+
+const buffer = [];
+const stats = { written: 0, dropped: 0, sampled_out: 0, batches: 0 };
+let flushTimer = null;
+let waitingForDrain = false;
+let droppedSinceFlush = 0;
+
+const serializeError = (error) => ({
+  message: error.message,
+  code: error.code,
+  stack: error.stack
+});
+
+const formatLine = (entry) => {
+  if (!pretty) {
+    return `${JSON.stringify(entry, (key, value) => (value instanceof Error ? serializeError(value) : value))}\n`;
+  }
+
+  const { time, level, module: name, msg, ...fields } = entry;
+  const extra = Object.keys(fields).length > 0
+    ? ` ${JSON.stringify(fields, (key, value) => (value instanceof Error ? value.message : value))}`
+    : '';
+  return `${time} ${level.toUpperCase()} [${name}] ${msg}${extra}\n`;
+};
+
+// Take up to `max` buffered lines, reporting any overflow after the last of them
+const takeBatch = (max) => {
+  const batch = buffer.splice(0, max);
+  if (droppedSinceFlush > 0 && buffer.length === 0) {
+    batch.push(formatLine({
+      time: new Date().toISOString(),
+      level: 'warn',
+      module: 'logger',
+      msg: 'Log buffer overflow, lines dropped',
+      dropped: droppedSinceFlush
+    }));
+    droppedSinceFlush = 0;
+  }
+  return batch;
+};
+
+// Write up to batchSize buffered lines in one stdout call
+const flush = () => {
+  flushTimer = null;
+  if (waitingForDrain || buffer.length === 0) return;
+
+  const batch = takeBatch(batchSize);
+  stats.batches++;
+  stats.written += batch.length;
+
+  const flushed = process.stdout.write(batch.join(''));
+  if (!flushed) {
+    // stdout is backed up: keep buffering (bounded) until it drains
+    waitingForDrain = true;
+    process.stdout.once('drain', () => {
+      waitingForDrain = false;
+      scheduleFlush();
+    });
+    return;
+  }
+
+  if (buffer.length > 0) {
+    scheduleFlush(true);
+  }
+};
+
+const scheduleFlush = (immediate = false) => {
+  if (flushTimer || waitingForDrain) return;
+  flushTimer = immediate || buffer.length >= batchSize
+    ? setImmediate(flush)
+    : setTimeout(flush, flushMs);
+  if (flushTimer.unref) flushTimer.unref();
+};
+
+const enqueue = (line) => {
+  if (buffer.length >= bufferSize) {
+    stats.dropped++;
+    droppedSinceFlush++;
+    return;
+  }
+  buffer.push(line);
+  scheduleFlush();
+};
+
+// Whatever is still buffered is written synchronously on exit
+process.on('exit', () => {
+  if (buffer.length > 0) {
+    try {
+      fs.writeSync(1, takeBatch(buffer.length).join(''));
+    } catch (error) {
+      // stdout already closed
+    }
+  }
+});
+
+const sampleRateFor = (name, fallback) => {
+  const value = parseFloat(process.env[`LOG_SAMPLE_${name.toUpperCase().replace(/[^A-Z0-9]/g, '_')}`]);
+  return Number.isNaN(value) ? fallback : Math.min(1, Math.max(0, value));
+};
+
+class Logger {
+  // `sample` applies to debug/info lines; warnings and errors are always kept
+  constructor(name, { sample = 1, fields = {} } = {}) {
+    this.name = name;
+    this.sampleRate = sampleRateFor(name, sample);
+    this.fields = fields;
+  }
+
+  log(level, msg, fields) {
+    if (LEVELS[level] < minLevel) return;
+    if (LEVELS[level] < LEVELS.warn && this.sampleRate < 1 && Math.random() >= this.sampleRate) {
+      stats.sampled_out++;
+      return;
+    }
+
+    const entry = {
+      time: new Date().toISOString(),
+      level,
+      module: this.name,
+      msg,
+      ...this.fields,
+      ...fields
+    };
+    if (this.sampleRate < 1 && LEVELS[level] < LEVELS.warn) {
+      entry.sample_rate = this.sampleRate;
+    }
+    enqueue(formatLine(entry));
+  }
+
+  debug(msg, fields) {
+    this.log('debug', msg, fields);
+  }
+
+  info(msg, fields) {
+    this.log('info', msg, fields);
+  }
+
+  warn(msg, fields) {
+    this.log('warn', msg, fields);
+  }
+
+  error(msg, fields) {
+    this.log('error', msg, fields);
+  }
+
+  isLevelEnabled(level) {
+    return LEVELS[level] >= minLevel;
+  }
+
+  // Logger for a sub-module (name "parent.child") with extra fixed fields
+  child(name, { sample = this.sampleRate, fields = {} } = {}) {
+    return new Logger(`${this.name}.${name}`, { sample, fields: { ...this.fields, ...fields } });
+  }
+}
+
+const createLogger = (name, options) => new Logger(name, options);
+
+const getLoggerStats = () => ({
+  buffered: buffer.length,
+  buffer_size: bufferSize,
+  waiting_for_drain: waitingForDrain,
+  ...stats
+});
+
+// Express middleware: one structured line per finished request
+const requestLogger = (logger = createLogger('http')) => (req, res, next) => {
+  const start = process.hrtime.bigint();
+
+  res.on('finish', () => {
+    const fields = {
+      method: req.method,
+      path: req.originalUrl.split('?')[0],
+      status: res.statusCode,
+      duration_ms: Math.round(Number(process.hrtime.bigint() - start) / 1e4) / 100,
+      bytes: parseInt(res.get('Content-Length')) || undefined
+    };
+    if (res.statusCode >= 500) {
+      logger.error('request', fields);
+    } else {
+      logger.info('request', fields);
+    }
+  });
+
+  next();
+};
+
+module.exports = {
+  createLogger,
+  getLoggerStats,
+  requestLogger,
+  Logger
+};
@@ -1,10 +1,21 @@
-const axios = require('axios');
-const { getDatabase } = require('../database_mongo');
+const { getDatabase, isPlaceholderLogo, applyLogoStatsDelta, rebuildLogoStats } = require('../database_mongo');
+const { createLimiter } = require('./concurrency');
+const CircuitBreaker = require('./circuitBreaker');
+const { getLimiter, rateLimitedError } = require('./rateLimiter');
+const { getHttpClient } = require('./httpClients');
+const responseCache = require('./responseCache');
+const appCache = require('./appCache');
+const { createLogger } = require('./logger');
+
+// Per-lookup lines are debug; cache/database hits are also sampled (LOG_SAMPLE_LOGO_CACHE)
+const log = createLogger('logo');
+const cacheLog = log.child('cache', { sample: 0.01 });
 
 class LogoService {
   constructor() {
-    this.cache = new Map();
     this.cacheTimeout = 24 * 60 * 60 * 1000; // 24 hours cache
+    this.cache = appCache.namespace('logos', { ttl: this.cacheTimeout });
+    this.databaseLogoMaxAge = 7 * 24 * 60 * 60 * 1000; // stored logos are refreshed weekly
     
     // Logo sources with different APIs
     this.logoSources = {
@@ -30,6 +41,53 @@ class LogoService {
       }
     };
 
+    // Max concurrent requests per upstream logo source (bulk resolution)
+    this.sourceConcurrency = {
+      sportsLogos: parseInt(process.env.LOGO_SPORTSDB_CONCURRENCY) || 4,
+      wikipedia: parseInt(process.env.LOGO_WIKIPEDIA_CONCURRENCY) || 2,
+      logoDev: parseInt(process.env.LOGO_LOGODEV_CONCURRENCY) || 4,
+      uiAvatars: parseInt(process.env.LOGO_UIAVATARS_CONCURRENCY) || 4
+    };
+    this.teamConcurrency = parseInt(process.env.LOGO_TEAM_CONCURRENCY) || 8;
+    this.cleanupBatchSize = 1000; // _ids per deleteMany in cleanupOldLogos
+    this.sourceLimiters = {};
+    for (const [source, concurrency] of Object.entries(this.sourceConcurrency)) {
+      this.sourceLimiters[source] = createLimiter(concurrency);
+    }
+    this.sourceTimings = {};
+
+    // Pooled keep-alive client per source, sized to the source's concurrency
+    this.httpClients = {};
+    for (const [source, concurrency] of Object.entries(this.sourceConcurrency)) {
+      this.httpClients[source] = getHttpClient(`logo:${source}`, {
+        timeout: 5000,
+        maxSockets: concurrency,
+        maxContentLength: 1024 * 1024
+      });
+    }
+
+    // Circuit breaker per upstream source: skip sources that keep erroring or timing out
+    this.breakers = {};
+    for (const source of Object.keys(this.sourceConcurrency)) {
+      this.breakers[source] = new CircuitBreaker(source, {
+        failureThreshold: parseInt(process.env.LOGO_BREAKER_THRESHOLD) || 5,
+        resetTimeout: (parseInt(process.env.LOGO_BREAKER_RESET_SECONDS) || 120) * 1000
+      });
+    }
+
+    // Request-rate limits for keyed/public APIs (SportsDB bucket is shared with the match parser)
+    this.rateLimiters = {
+      sportsLogos: getLimiter('sportsdb', { rate: 30, period: 60 * 1000 }),
+      wikipedia: getLimiter('wikipedia', { rate: 100, period: 60 * 1000, burst: 10 })
+    };
+    this.rateLimitWait = 5 * 1000; // max time a lookup waits for a token
+
+    // Negative cache: "source X has no logo for team Y", persisted in logo_negative_cache
+    this.negativeCacheSources = ['sportsLogos', 'wikipedia', 'logoDev'];
+    this.negativeCacheTtl = (parseInt(process.env.LOGO_NEGATIVE_CACHE_HOURS) || 7 * 24) * 60 * 60 * 1000;
+    this.negativeCache = new Map(); // `${source}|${sport}|${teamName}` -> expiresAt (ms)
+    this.negativeCacheLoad = null;
+
     this.teamNameMappings = {
       // MLB team mappings
       'New York Yankees': ['yankees', 'ny yankees', 'new york yankees'],
@@ -161,28 +219,29 @@ class LogoService {
     try {
       // Check cache first
       const cacheKey = `${teamName}_${sport}`;
-      if (this.isCacheValid(cacheKey)) {
-        return this.getCachedData(cacheKey);
+      const cached = this.cache.get(cacheKey);
+      if (cached !== undefined) {
+        return cached;
       }
 
       // First try direct logo URLs for known teams
       if (this.directLogos[teamName]) {
         const directUrl = this.directLogos[teamName];
-        console.log(`✅ Using direct logo for ${teamName}: ${directUrl}`);
+        cacheLog.debug('Using direct logo', { team: teamName, url: directUrl });
         await this.saveLogoToDatabase(teamName, sport, directUrl);
-        this.setCacheData(cacheKey, directUrl);
+        this.cache.set(cacheKey, directUrl);
         return directUrl;
       }
 
-      // Try multiple API sources for unknown teams
-      let logoUrl = await this.getLogoFromSportsDB(teamName, sport);
+      // Try multiple API sources for unknown teams (dead or known-miss sources are skipped)
+      let logoUrl = await this.runSource('sportsLogos', teamName, sport, () => this.getLogoFromSportsDB(teamName, sport));
       
       if (!logoUrl) {
-        logoUrl = await this.getLogoFromWikipedia(teamName, sport);
+        logoUrl = await this.runSource('wikipedia', teamName, sport, () => this.getLogoFromWikipedia(teamName, sport));
       }
       
       if (!logoUrl) {
-        logoUrl = await this.getLogoFromLogoDev(teamName, sport);
+        logoUrl = await this.runSource('logoDev', teamName, sport, () => this.getLogoFromLogoDev(teamName, sport));
       }
       
       // If still no logo found, try advanced placeholder generation
@@ -192,7 +251,7 @@ class LogoService {
 
       // Save to database and cache
       await this.saveLogoToDatabase(teamName, sport, logoUrl);
-      this.setCacheData(cacheKey, logoUrl);
+      this.cache.set(cacheKey, logoUrl);
       
       return logoUrl;
 
@@ -202,102 +261,245 @@ class LogoService {
     }
   }
 
-  // Get logo from TheSportsDB API
-  async getLogoFromSportsDB(teamName, sport) {
+  // Run a lookup against one upstream source: honours the circuit breaker and the
+  // negative cache, runs under the source's concurrency limit and records timings.
+  // Returns the logo URL or null; upstream errors never propagate.
+  async runSource(source, teamName, sport, lookup) {
+    const breaker = this.breakers[source];
+    const useNegativeCache = this.negativeCacheSources.includes(source);
+    
+    if (useNegativeCache && await this.isNegativeCached(source, teamName, sport)) {
+      return null;
+    }
+    if (breaker && !breaker.canRequest()) {
+      return null;
+    }
+    
+    const limit = this.sourceLimiters[source];
+    const run = async () => {
+      const startedAt = Date.now();
+      try {
+        const result = await lookup();
+        if (breaker) breaker.recordSuccess();
+        if (!result && useNegativeCache) {
+          await this.addNegativeCache(source, teamName, sport);
+        }
+        return result || null;
+      } catch (error) {
+        if (error.code === 'RATE_LIMITED') {
+          // Our own budget ran out: not a source failure and not a miss
+          if (breaker) breaker.releaseTrial();
+          log.debug('Logo source skipped: rate limit reached', { source, team: teamName });
+          return null;
+        }
+        if (this.isMissError(error)) {
+          // Source answered, it just has nothing for this team
+          if (breaker) breaker.recordSuccess();
+          if (useNegativeCache) {
+            await this.addNegativeCache(source, teamName, sport);
+          }
+        } else if (breaker) {
+          breaker.recordFailure();
+        }
+        log.warn('Logo source failed', { source, team: teamName, error: error.message });
+        return null;
+      } finally {
+        this.recordSourceTiming(source, Date.now() - startedAt);
+      }
+    };
+    
+    return limit ? await limit(run) : await run();
+  }
+
+  // 4xx answers (except 429) mean "no entry", not "source is down"
+  isMissError(error) {
+    const status = error.response && error.response.status;
+    return Boolean(status && status >= 400 && status < 500 && status !== 429);
+  }
+
+  // Load unexpired negative cache entries from the database once
+  async loadNegativeCache() {
+    if (!this.negativeCacheLoad) {
+      this.negativeCacheLoad = (async () => {
+        try {
+          const db = getDatabase();
+          const entries = await db.collection('logo_negative_cache')
+            .find({ expires_at: { $gt: new Date() } })
+            .toArray();
+          
+          for (const entry of entries) {
+            this.negativeCache.set(`${entry.source}|${entry.sport}|${entry.team_name}`, entry.expires_at.getTime());
+          }
+        } catch (error) {
+          console.error(`❌ Error loading logo negative cache:`, error);
+          this.negativeCacheLoad = null;
+        }
+      })();
+    }
+    
+    await this.negativeCacheLoad;
+  }
+
+  async isNegativeCached(source, teamName, sport) {
+    await this.loadNegativeCache();
+    
+    const key = `${source}|${sport}|${teamName}`;
+    const expiresAt = this.negativeCache.get(key);
+    if (!expiresAt) return false;
+    
+    if (expiresAt <= Date.now()) {
+      this.negativeCache.delete(key);
+      return false;
+    }
+    return true;
+  }
+
+  async addNegativeCache(source, teamName, sport) {
+    const expiresAt = new Date(Date.now() + this.negativeCacheTtl);
+    this.negativeCache.set(`${source}|${sport}|${teamName}`, expiresAt.getTime());
+    
     try {
-      const searchName = this.getSearchableName(teamName);
-      const sportMapping = this.getSportsDBSportName(sport);
-      
-      const response = await axios.get(
-        `${this.logoSources.sportsLogos.url}/searchteams.php?t=${encodeURIComponent(searchName)}`,
-        { timeout: 5000 }
+      const db = getDatabase();
+      await db.collection('logo_negative_cache').updateOne(
+        { source, team_name: teamName, sport },
+        { $set: { source, team_name: teamName, sport, expires_at: expiresAt } },
+        { upsert: true }
       );
+    } catch (error) {
+      console.error(`❌ Error saving logo negative cache entry:`, error);
+    }
+  }
 
-      if (response.data && response.data.teams && response.data.teams.length > 0) {
-        const team = response.data.teams[0];
-        
-        // Try different logo fields
-        const logoUrl = team.strTeamBadge || team.strTeamLogo || team.strTeamBanner;
-        
-        if (logoUrl && this.isValidImageUrl(logoUrl)) {
-          console.log(`✅ Found logo for ${teamName} from SportsDB: ${logoUrl}`);
-          return logoUrl;
-        }
+  // Circuit breaker states and timings per source
+  getSourceHealth() {
+    const breakers = {};
+    for (const [source, breaker] of Object.entries(this.breakers)) {
+      breakers[source] = breaker.getState();
+    }
+    
+    return {
+      breakers,
+      timings: this.getSourceTimings(),
+      negative_cache_size: this.negativeCache.size
+    };
+  }
+
+  recordSourceTiming(source, durationMs) {
+    const timing = this.sourceTimings[source] || (this.sourceTimings[source] = { calls: 0, total_ms: 0, max_ms: 0 });
+    timing.calls++;
+    timing.total_ms += durationMs;
+    timing.max_ms = Math.max(timing.max_ms, durationMs);
+  }
+
+  // Per-source call counts and average/max durations
+  getSourceTimings() {
+    const result = {};
+    for (const [source, timing] of Object.entries(this.sourceTimings)) {
+      result[source] = {
+        ...timing,
+        avg_ms: timing.calls > 0 ? Math.round(timing.total_ms / timing.calls) : 0
+      };
+    }
+    return result;
+  }
+
+  // Wait for a rate limit token; throws RATE_LIMITED if none arrives in time
+  async acquireRateToken(source) {
+    const limiter = this.rateLimiters[source];
+    if (!limiter) return;
+    
+    if (!(await limiter.acquire({ timeout: this.rateLimitWait }))) {
+      throw rateLimitedError(source);
+    }
+  }
+
+  // Get logo from TheSportsDB API (errors propagate to runSource)
+  async getLogoFromSportsDB(teamName, sport) {
+    const searchName = this.getSearchableName(teamName);
+    const sportMapping = this.getSportsDBSportName(sport);
+    
+    await this.acquireRateToken('sportsLogos');
+    const response = await this.httpClients.sportsLogos.get(
+      `${this.logoSources.sportsLogos.url}/searchteams.php?t=${encodeURIComponent(searchName)}`,
+      { timeout: 5000 }
+    );
+
+    if (response.data && response.data.teams && response.data.teams.length > 0) {
+      const team = response.data.teams[0];
+      
+      // Try different logo fields
+      const logoUrl = team.strTeamBadge || team.strTeamLogo || team.strTeamBanner;
+      
+      if (logoUrl && this.isValidImageUrl(logoUrl)) {
+        log.debug('Found logo', { source: 'sportsLogos', team: teamName, url: logoUrl });
+        return logoUrl;
       }
-    } catch (error) {
-      console.log(`⚠️ SportsDB failed for ${teamName}:`, error.message);
     }
     
     return null;
   }
 
-  // Get logo from Wikipedia API
+  // Get logo from Wikipedia API (errors propagate to runSource)
   async getLogoFromWikipedia(teamName, sport) {
-    try {
-      const searchName = this.getWikipediaSearchName(teamName, sport);
+    const searchName = this.getWikipediaSearchName(teamName, sport);
+    
+    // Search for the page
+    await this.acquireRateToken('wikipedia');
+    const searchResponse = await this.httpClients.wikipedia.get(this.logoSources.wikipedia.url, {
+      params: {
+        action: 'query',
+        format: 'json',
+        list: 'search',
+        srsearch: searchName,
+        srlimit: 1
+      },
+      timeout: 5000
+    });
+
+    if (searchResponse.data.query.search.length > 0) {
+      const pageTitle = searchResponse.data.query.search[0].title;
       
-      // Search for the page
-      const searchResponse = await axios.get(this.logoSources.wikipedia.url, {
+      // Get page images
+      await this.acquireRateToken('wikipedia');
+      const imageResponse = await this.httpClients.wikipedia.get(this.logoSources.wikipedia.url, {
         params: {
           action: 'query',
           format: 'json',
-          list: 'search',
-          srsearch: searchName,
-          srlimit: 1
+          titles: pageTitle,
+          prop: 'pageimages',
+          pithumbsize: 300
         },
         timeout: 5000
       });
 
-      if (searchResponse.data.query.search.length > 0) {
-        const pageTitle = searchResponse.data.query.search[0].title;
-        
-        // Get page images
-        const imageResponse = await axios.get(this.logoSources.wikipedia.url, {
-          params: {
-            action: 'query',
-            format: 'json',
-            titles: pageTitle,
-            prop: 'pageimages',
-            pithumbsize: 300
-          },
-          timeout: 5000
-        });
-
-        const pages = imageResponse.data.query.pages;
-        const page = Object.values(pages)[0];
-        
-        if (page && page.thumbnail && page.thumbnail.source) {
-          const logoUrl = page.thumbnail.source;
-          console.log(`✅ Found logo for ${teamName} from Wikipedia: ${logoUrl}`);
-          return logoUrl;
-        }
+      const pages = imageResponse.data.query.pages;
+      const page = Object.values(pages)[0];
+      
+      if (page && page.thumbnail && page.thumbnail.source) {
+        const logoUrl = page.thumbnail.source;
+        log.debug('Found logo', { source: 'wikipedia', team: teamName, url: logoUrl });
+        return logoUrl;
       }
-    } catch (error) {
-      console.log(`⚠️ Wikipedia failed for ${teamName}:`, error.message);
     }
     
     return null;
   }
 
-  // Get logo from Logo.dev (searches for corporate logos)
+  // Get logo from Logo.dev (searches for corporate logos; errors propagate to runSource)
   async getLogoFromLogoDev(teamName, sport) {
-    try {
-      // Logo.dev works better with simplified names
-      const simpleName = teamName.toLowerCase()
-        .replace(/\s+/g, '')
-        .replace(/[^a-z0-9]/g, '');
-      
-      const logoUrl = `https://logo.dev/${simpleName}?token=pk_demo&format=png&size=200`;
-      
-      // Test if the logo exists
-      const testResponse = await axios.head(logoUrl, { timeout: 3000 });
-      
-      if (testResponse.status === 200) {
-        console.log(`✅ Found logo for ${teamName} from Logo.dev: ${logoUrl}`);
-        return logoUrl;
-      }
-    } catch (error) {
-      console.log(`⚠️ Logo.dev failed for ${teamName}:`, error.message);
+    // Logo.dev works better with simplified names
+    const simpleName = teamName.toLowerCase()
+      .replace(/\s+/g, '')
+      .replace(/[^a-z0-9]/g, '');
+    
+    const logoUrl = `https://logo.dev/${simpleName}?token=pk_demo&format=png&size=200`;
+    
+    // Test if the logo exists
+    const testResponse = await this.httpClients.logoDev.head(logoUrl, { timeout: 3000 });
+    
+    if (testResponse.status === 200) {
+      log.debug('Found logo', { source: 'logoDev', team: teamName, url: logoUrl });
+      return logoUrl;
     }
     
     return null;
@@ -352,7 +554,7 @@ class LogoService {
     // Create a more sophisticated placeholder using a shield-like design
     const logoUrl = `https://via.placeholder.com/256x256/${config.bgColor}/${config.textColor}?text=${encodeURIComponent(initials)}`;
     
-    console.log(`🎨 Generated modern logo for ${teamName}: ${logoUrl}`);
+    log.debug('Generated logo', { team: teamName, url: logoUrl });
     return logoUrl;
   }
 
@@ -386,33 +588,40 @@ class LogoService {
 
   // Advanced team logo generation with external service fallback
   async generateAdvancedLogo(teamName, sport) {
-    try {
-      // Try to use UI Avatars API for better looking logos
-      const initials = this.getTeamInitials(teamName);
-      const sportColors = {
-        football: '28a745',
-        baseball: '3b82f6', 
-        hockey: '8b5cf6',
-        esports: 'ef4444'
-      };
-      
-      const bgColor = sportColors[sport] || 'ef4444';
-      const logoUrl = `https://ui-avatars.com/api/?name=${encodeURIComponent(initials)}&size=200&background=${bgColor}&color=fff&format=png&rounded=true&bold=true`;
-      
-      // Test if the service is available
-      const testResponse = await axios.head(logoUrl, { timeout: 3000 });
-      
-      if (testResponse.status === 200) {
-        console.log(`🎨 Generated advanced logo for ${teamName}: ${logoUrl}`);
-        return logoUrl;
-      }
-    } catch (error) {
-      console.log(`⚠️ Advanced logo generation failed for ${teamName}, using fallback`);
+    const logoUrl = await this.runSource('uiAvatars', teamName, sport, () => this.getLogoFromUiAvatars(teamName, sport));
+    
+    if (logoUrl) {
+      return logoUrl;
     }
     
+    log.warn('Advanced logo generation failed, using fallback', { team: teamName });
     return this.generateModernLogo(teamName, sport);
   }
 
+  // Build a UI Avatars logo URL and check the service is available
+  async getLogoFromUiAvatars(teamName, sport) {
+    const initials = this.getTeamInitials(teamName);
+    const sportColors = {
+      football: '28a745',
+      baseball: '3b82f6', 
+      hockey: '8b5cf6',
+      esports: 'ef4444'
+    };
+    
+    const bgColor = sportColors[sport] || 'ef4444';
+    const logoUrl = `https://ui-avatars.com/api/?name=${encodeURIComponent(initials)}&size=200&background=${bgColor}&color=fff&format=png&rounded=true&bold=true`;
+    
+    // Test if the service is available
+    const testResponse = await this.httpClients.uiAvatars.head(logoUrl, { timeout: 3000 });
+    
+    if (testResponse.status === 200) {
+      log.debug('Generated advanced logo', { team: teamName, url: logoUrl });
+      return logoUrl;
+    }
+    
+    return null;
+  }
+
   // Get team initials for placeholder
   getTeamInitials(teamName) {
     return teamName
@@ -465,45 +674,58 @@ class LogoService {
            urlLower.includes('badge');
   }
 
-  // Cache management
-  isCacheValid(key) {
-    const cached = this.cache.get(key);
-    if (!cached) return false;
-    return Date.now() - cached.timestamp < this.cacheTimeout;
-  }
-
-  getCachedData(key) {
-    const cached = this.cache.get(key);
-    return cached ? cached.data : null;
-  }
-
-  setCacheData(key, data) {
-    this.cache.set(key, {
-      data: data,
-      timestamp: Date.now()
-    });
-  }
-
   // Save logo to database
   async saveLogoToDatabase(teamName, sport, logoUrl) {
     try {
       const db = getDatabase();
+      const isPlaceholder = isPlaceholderLogo(logoUrl);
       
-      await db.collection('team_logos').updateOne(
-        { team_name: teamName, sport: sport },
-        {
-          $set: {
-            team_name: teamName,
-            sport: sport,
-            logo_url: logoUrl,
-            updated_at: new Date(),
-            source: 'auto-fetched'
-          }
-        },
-        { upsert: true }
-      );
+      const logos = db.collection('team_logos');
+      const filter = { team_name: teamName, sport: sport };
+      const update = {
+        $set: {
+          team_name: teamName,
+          sport: sport,
+          logo_url: logoUrl,
+          is_placeholder: isPlaceholder,
+          updated_at: new Date(),
+          source: 'auto-fetched'
+        }
+      };
+      const options = { returnDocument: 'before', projection: { logo_url: 1, is_placeholder: 1 } };
       
-      console.log(`💾 Saved logo for ${teamName} (${sport}) to database`);
+      let previous;
+      let inserted = false;
+      try {
+        previous = await logos.findOneAndUpdate(filter, update, { ...options, upsert: true });
+        inserted = !previous;
+      } catch (error) {
+        if (error.code !== 11000) throw error;
+        // Another refresh inserted this team first: update its row, the insert is theirs to count
+        previous = await logos.findOneAndUpdate(filter, update, options);
+      }
+      
+      // Keep the materialized logo stats in step with this upsert
+      if (inserted) {
+        await applyLogoStatsDelta(sport, {
+          count: 1,
+          real: isPlaceholder ? 0 : 1,
+          placeholder: isPlaceholder ? 1 : 0
+        });
+      } else if (previous) {
+        const wasPlaceholder = previous.is_placeholder !== undefined
+          ? previous.is_placeholder
+          : isPlaceholderLogo(previous.logo_url);
+        if (wasPlaceholder !== isPlaceholder) {
+          await applyLogoStatsDelta(sport, {
+            real: isPlaceholder ? -1 : 1,
+            placeholder: isPlaceholder ? 1 : -1
+          });
+        }
+      }
+      
+      responseCache.invalidate('logos:');
+      log.debug('Saved logo to database', { team: teamName, sport });
     } catch (error) {
       console.error(`❌ Error saving logo to database:`, error);
     }
@@ -521,10 +743,10 @@ class LogoService {
       
       if (existingLogo && existingLogo.logo_url) {
         // Check if logo is not too old (refresh weekly)
-        const weekAgo = new Date(Date.now() - 7 * 24 * 60 * 60 * 1000);
+        const weekAgo = new Date(Date.now() - this.databaseLogoMaxAge);
         
         if (existingLogo.updated_at > weekAgo) {
-          console.log(`💾 Using cached logo for ${teamName} from database`);
+          cacheLog.debug('Using logo from database', { team: teamName });
           return existingLogo.logo_url;
         }
       }
@@ -535,80 +757,131 @@ class LogoService {
     return null;
   }
 
-  // Bulk update logos for all teams
-  async updateAllTeamLogos() {
-    try {
-      const db = getDatabase();
-      
-      // Get all unique teams from matches
-      const matches = await db.collection('matches').find({}).toArray();
-      const uniqueTeams = new Set();
-      
-      // Extract teams from matches
-      for (const match of matches) {
-        if (match.team1 && match.sport) {
-          uniqueTeams.add(`${match.team1}|${match.sport}`);
-        }
-        if (match.team2 && match.sport) {
-          uniqueTeams.add(`${match.team2}|${match.sport}`);
+  // Get distinct {team_name, sport} pairs from matches without loading whole documents
+  async getDistinctTeams() {
+    const db = getDatabase();
+    
+    const teams = await db.collection('matches').aggregate([
+      { $project: { _id: 0, sport: 1, teams: ['$team1', '$team2'] } },
+      { $unwind: '$teams' },
+      { $match: { teams: { $type: 'string', $ne: '' }, sport: { $type: 'string' } } },
+      { $group: { _id: { team_name: '$teams', sport: '$sport' } } }
+    ]).toArray();
+    
+    return teams.map(team => team._id);
+  }
+
+  // Extract unique {team_name, sport} pairs from match objects
+  getTeamsFromMatches(matches) {
+    const teams = new Map();
+    
+    for (const match of matches) {
+      for (const teamName of [match.team1, match.team2]) {
+        if (teamName && match.sport) {
+          teams.set(`${teamName}|${match.sport}`, { team_name: teamName, sport: match.sport });
         }
       }
+    }
+    
+    return Array.from(teams.values());
+  }
+
+  // Resolve logos for many teams: one $in pre-check against team_logos, then
+  // fetch only the misses with bounded concurrency (per team and per source)
+  async resolveTeamLogos(teams, options = {}) {
+    const { maxAge = null, onProgress = null, concurrency = this.teamConcurrency } = options;
+    const startedAt = Date.now();
+    const report = { total: teams.length, cached: 0, resolved: 0, failed: 0 };
+    
+    if (teams.length === 0) {
+      return { ...report, duration_ms: 0, source_timings: this.getSourceTimings() };
+    }
+    
+    const db = getDatabase();
+    const teamNames = [...new Set(teams.map(team => team.team_name))];
+    
+    // Single pre-check query for every team we already have a logo for
+    const existing = await db.collection('team_logos')
+      .find(
+        { team_name: { $in: teamNames } },
+        { projection: { _id: 0, team_name: 1, sport: 1, logo_url: 1, updated_at: 1 } }
+      )
+      .toArray();
+    
+    const freshAfter = maxAge ? new Date(Date.now() - maxAge) : null;
+    const known = new Set(
+      existing
+        .filter(logo => logo.logo_url && (!freshAfter || logo.updated_at > freshAfter))
+        .map(logo => `${logo.team_name}|${logo.sport}`)
+    );
+    
+    const misses = teams.filter(team => !known.has(`${team.team_name}|${team.sport}`));
+    report.cached = teams.length - misses.length;
+    
+    console.log(`🔄 Resolving logos: ${teams.length} teams, ${report.cached} already in database, ${misses.length} to fetch`);
+    
+    const limit = createLimiter(concurrency);
+    let done = 0;
+    
+    await Promise.all(misses.map(team => limit(async () => {
+      try {
+        await this.getTeamLogo(team.team_name, team.sport);
+        report.resolved++;
+      } catch (error) {
+        report.failed++;
+        console.error(`❌ Error resolving logo for ${team.team_name}:`, error.message);
+      }
       
-      console.log(`🔄 Updating logos for ${uniqueTeams.size} unique teams...`);
-      
-      for (const teamKey of uniqueTeams) {
-        const [teamName, sport] = teamKey.split('|');
-        if (teamName && sport) {
-          await this.getTeamLogo(teamName, sport);
-          // Small delay to avoid rate limiting
-          await new Promise(resolve => setTimeout(resolve, 500));
-        }
+      done++;
+      if (onProgress) {
+        onProgress({ done, total: misses.length, team });
+      }
+      if (done % 10 === 0 || done === misses.length) {
+        console.log(`🎨 Logo progress: ${done}/${misses.length}`);
       }
+    })));
+    
+    return {
+      ...report,
+      duration_ms: Date.now() - startedAt,
+      source_timings: this.getSourceTimings()
+    };
+  }
+
+  // Bulk update logos for all teams (refreshes missing or week-old logos)
+  async updateAllTeamLogos(options = {}) {
+    try {
+      const teams = await this.getDistinctTeams();
+      
+      console.log(`🔄 Updating logos for ${teams.length} unique teams...`);
+      
+      const report = await this.resolveTeamLogos(teams, {
+        maxAge: 7 * 24 * 60 * 60 * 1000,
+        ...options
+      });
       
-      console.log(`✅ Completed logo update for all teams`);
+      console.log(`✅ Completed logo update for all teams in ${report.duration_ms}ms`);
+      return report;
     } catch (error) {
       console.error(`❌ Error updating all team logos:`, error);
+      return null;
     }
   }
 
   // Auto-update logos for new teams (called when new matches are parsed)
-  async updateLogosForNewTeams(newMatches) {
+  async updateLogosForNewTeams(newMatches, options = {}) {
     try {
-      const db = getDatabase();
-      const newTeams = new Set();
+      const teams = this.getTeamsFromMatches(newMatches);
       
-      // Extract unique teams from new matches
-      for (const match of newMatches) {
-        if (match.team1 && match.sport) {
-          newTeams.add(`${match.team1}|${match.sport}`);
-        }
-        if (match.team2 && match.sport) {
-          newTeams.add(`${match.team2}|${match.sport}`);
-        }
-      }
+      console.log(`🔍 Checking logos for ${teams.length} teams from new matches...`);
       
-      console.log(`🔍 Checking logos for ${newTeams.size} teams from new matches...`);
-      
-      for (const teamKey of newTeams) {
-        const [teamName, sport] = teamKey.split('|');
-        
-        // Check if we already have a logo for this team
-        const existingLogo = await db.collection('team_logos').findOne({
-          team_name: teamName,
-          sport: sport
-        });
-        
-        if (!existingLogo) {
-          console.log(`🆕 New team detected: ${teamName} (${sport}), fetching logo...`);
-          await this.getTeamLogo(teamName, sport);
-          // Small delay to avoid overwhelming services
-          await new Promise(resolve => setTimeout(resolve, 300));
-        }
-      }
+      const report = await this.resolveTeamLogos(teams, options);
       
       console.log(`✅ Logo check completed for new teams`);
+      return report;
     } catch (error) {
       console.error(`❌ Error updating logos for new teams:`, error);
+      return null;
     }
   }
 
@@ -617,68 +890,95 @@ class LogoService {
     try {
       const db = getDatabase();
       
-      // Get all teams currently in matches
-      const currentTeams = await db.collection('matches').aggregate([
-        {
-          $group: {
-            _id: null,
-            teams: {
-              $addToSet: {
-                $map: {
-                  input: [
-                    { name: '$team1', sport: '$sport' },
-                    { name: '$team2', sport: '$sport' }
-                  ],
-                  as: 'team',
-                  in: { 
-                    team_name: '$$team.name', 
-                    sport: '$$team.sport' 
-                  }
-                }
-              }
-            }
-          }
-        }
-      ]).toArray();
+      // Hashed set of teams currently in matches
+      const currentTeams = await this.getDistinctTeams();
+      if (currentTeams.length === 0) {
+        console.log(`⚠️ No teams in matches, skipping logo cleanup`);
+        return { deleted: 0 };
+      }
+      const liveKeys = new Set(currentTeams.map(team => `${team.sport}|${team.team_name}`));
+      
+      // One pass over team_logos, reading only what the stats need
+      const toDelete = [];
+      const cursor = db.collection('team_logos').find({}, {
+        projection: { _id: 1, team_name: 1, sport: 1, logo_url: 1, is_placeholder: 1 }
+      });
       
-      if (currentTeams.length > 0) {
-        const flatCurrentTeams = currentTeams[0].teams.flat();
+      for await (const logo of cursor) {
+        if (liveKeys.has(`${logo.sport}|${logo.team_name}`)) continue;
         
-        // Get all logos in database
-        const allLogos = await db.collection('team_logos').find({}).toArray();
+        toDelete.push({
+          _id: logo._id,
+          sport: logo.sport,
+          placeholder: logo.is_placeholder !== undefined
+            ? logo.is_placeholder
+            : isPlaceholderLogo(logo.logo_url)
+        });
+      }
+      
+      if (toDelete.length === 0) {
+        console.log(`✅ No old logos to clean up`);
+        return { deleted: 0 };
+      }
+      
+      console.log(`🧹 Cleaning up ${toDelete.length} old team logos...`);
+      
+      let deleted = 0;
+      let statsDrifted = false;
+      for (let i = 0; i < toDelete.length; i += this.cleanupBatchSize) {
+        const batch = toDelete.slice(i, i + this.cleanupBatchSize);
+        const result = await db.collection('team_logos').deleteMany({
+          _id: { $in: batch.map(logo => logo._id) }
+        });
+        deleted += result.deletedCount;
         
-        // Find logos that don't match any current teams
-        const logosToDelete = allLogos.filter(logo => 
-          !flatCurrentTeams.some(team => 
-            team.team_name === logo.team_name && team.sport === logo.sport
-          )
-        );
+        // Some rows were already gone (another worker or a manual cleanup):
+        // we can't tell which, so the stats are recomputed instead
+        if (result.deletedCount !== batch.length) {
+          statsDrifted = true;
+          continue;
+        }
         
-        if (logosToDelete.length > 0) {
-          console.log(`🧹 Cleaning up ${logosToDelete.length} old team logos...`);
-          
-          for (const logo of logosToDelete) {
-            await db.collection('team_logos').deleteOne({
-              _id: logo._id
-            });
-          }
-          
-          console.log(`✅ Cleaned up old logos`);
-        } else {
-          console.log(`✅ No old logos to clean up`);
+        const deltas = {};
+        for (const logo of batch) {
+          const delta = deltas[logo.sport] || (deltas[logo.sport] = { count: 0, real: 0, placeholder: 0 });
+          delta.count--;
+          if (logo.placeholder) delta.placeholder--; else delta.real--;
         }
+        for (const [sport, delta] of Object.entries(deltas)) {
+          await applyLogoStatsDelta(sport, delta);
+        }
+      }
+      
+      if (statsDrifted) {
+        await rebuildLogoStats();
       }
+      
+      responseCache.invalidate('logos:');
+      console.log(`✅ Cleaned up ${deleted} old logos`);
+      return { deleted };
     } catch (error) {
       console.error(`❌ Error cleaning up old logos:`, error);
+      return { deleted: 0 };
     }
   }
 
+
   // Get logo with database check first
   async getTeamLogoWithDatabase(teamName, sport) {
-    // Try database first
+    // In-process cache first (hydrated from team_logos at startup)
+    const cacheKey = `${teamName}_${sport}`;
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
+    }
+
+    // Then the database
     let logoUrl = await this.getLogoFromDatabase(teamName, sport);
     
-    if (!logoUrl) {
+    if (logoUrl) {
+      this.cache.set(cacheKey, logoUrl);
+    } else {
       // Fetch new logo
       logoUrl = await this.getTeamLogo(teamName, sport);
     }
@@ -686,6 +986,26 @@ class LogoService {
     return logoUrl;
   }
 
+  // Load stored logos that are still fresh into the cache, so lookups after a
+  // restart don't go to the database (or upstream) one team at a time
+  async hydrateCache() {
+    const db = getDatabase();
+    const now = Date.now();
+    const cursor = db.collection('team_logos').find(
+      { updated_at: { $gt: new Date(now - this.databaseLogoMaxAge) }, logo_url: { $ne: null } },
+      { projection: { _id: 0, team_name: 1, sport: 1, logo_url: 1, updated_at: 1 } }
+    );
+
+    let loaded = 0;
+    for await (const logo of cursor) {
+      // Expire no later than the weekly database refresh would
+      const ttl = Math.min(this.cacheTimeout, new Date(logo.updated_at).getTime() + this.databaseLogoMaxAge - now);
+      this.cache.set(`${logo.team_name}_${logo.sport}`, logo.logo_url, ttl);
+      loaded++;
+    }
+    return loaded;
+  }
+
   // Clear cache
   clearCache() {
     this.cache.clear();
@@ -693,4 +1013,14 @@ class LogoService {
   }
 }
 
-module.exports = LogoService;
\ No newline at end of file
+// One logo service per process, so its cache, breakers and limiters are shared
+let sharedLogoService = null;
+const getLogoService = () => {
+  if (!sharedLogoService) {
+    sharedLogoService = new LogoService();
+  }
+  return sharedLogoService;
+};
+
+module.exports = LogoService;
+module.exports.getLogoService = getLogoService;
@@ -0,0 +1,218 @@
+// Bounded LRU cache with a per-entry TTL.
+// A Map keeps insertion order, so re-inserting on get() makes the first key the least recently used.
+// Optional memory bound: entries carry an estimated size and the least recently used
+// ones are evicted until both the entry and byte limits hold. namespace() gives
+// services their own key space, default TTL and hit/miss counters on a shared cache.
+
+// Rough in-memory size of a value (UTF-16 strings, JSON for objects)
+const estimateSize = (value) => {
+  if (value === null || value === undefined) return 8;
+  if (typeof value === 'string') return value.length * 2;
+  if (typeof value !== 'object') return 8;
+  try {
+    return JSON.stringify(value).length * 2;
+  } catch (error) {
+    return 1024;
+  }
+};
+
+class LRUCache {
+  constructor({ max = 1000, ttl = 60 * 1000, maxBytes = Infinity, sizeOf = estimateSize, pruneInterval = 0 } = {}) {
+    this.max = Math.max(1, max);
+    this.ttl = ttl;
+    this.maxBytes = maxBytes;
+    this.sizeOf = sizeOf;
+    this.bytes = 0;
+    this.entries = new Map(); // key -> { value, expiresAt, size, namespace }
+    this.namespaces = new Map(); // name -> CacheNamespace
+    this.stats = { hits: 0, misses: 0, evictions: 0, expired: 0, invalidations: 0 };
+
+    // Periodically drop expired entries that nobody reads again
+    if (pruneInterval > 0) {
+      this.pruneTimer = setInterval(() => this.prune(), pruneInterval);
+      this.pruneTimer.unref();
+    }
+  }
+
+  get(key) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      this.stats.misses++;
+      return undefined;
+    }
+
+    if (entry.expiresAt <= Date.now()) {
+      this.remove(key, entry);
+      this.stats.expired++;
+      this.stats.misses++;
+      return undefined;
+    }
+
+    // Move to most recently used
+    this.entries.delete(key);
+    this.entries.set(key, entry);
+    this.stats.hits++;
+    return entry.value;
+  }
+
+  set(key, value, ttl = this.ttl, namespace = null) {
+    const size = this.maxBytes === Infinity ? 0 : this.sizeOf(value);
+    const existing = this.entries.get(key);
+    if (existing) {
+      this.remove(key, existing);
+    }
+
+    // Never let one value take over the whole cache
+    if (size > this.maxBytes) return;
+
+    this.entries.set(key, { value, expiresAt: Date.now() + ttl, size, namespace });
+    this.bytes += size;
+    if (namespace) {
+      namespace.entries++;
+      namespace.bytes += size;
+    }
+
+    while (this.entries.size > this.max || this.bytes > this.maxBytes) {
+      const oldestKey = this.entries.keys().next().value;
+      this.remove(oldestKey, this.entries.get(oldestKey));
+      this.stats.evictions++;
+    }
+  }
+
+  delete(key) {
+    const entry = this.entries.get(key);
+    if (entry) {
+      this.remove(key, entry);
+      this.stats.invalidations++;
+      return true;
+    }
+    return false;
+  }
+
+  // Drop an entry and release its size accounting
+  remove(key, entry) {
+    this.entries.delete(key);
+    this.bytes -= entry.size;
+    if (entry.namespace) {
+      entry.namespace.entries--;
+      entry.namespace.bytes -= entry.size;
+    }
+  }
+
+  // Remove every expired entry; returns how many were dropped
+  prune() {
+    const now = Date.now();
+    let removed = 0;
+    for (const [key, entry] of this.entries) {
+      if (entry.expiresAt <= now) {
+        this.remove(key, entry);
+        removed++;
+      }
+    }
+    this.stats.expired += removed;
+    return removed;
+  }
+
+  clear() {
+    this.entries.clear();
+    this.bytes = 0;
+    for (const namespace of this.namespaces.values()) {
+      namespace.entries = 0;
+      namespace.bytes = 0;
+    }
+  }
+
+  get size() {
+    return this.entries.size;
+  }
+
+  // Key space `name` on this cache, with its own default TTL and counters
+  namespace(name, { ttl = this.ttl } = {}) {
+    if (!this.namespaces.has(name)) {
+      this.namespaces.set(name, new CacheNamespace(this, name, ttl));
+    }
+    return this.namespaces.get(name);
+  }
+
+  getStats() {
+    const lookups = this.stats.hits + this.stats.misses;
+    const stats = {
+      size: this.entries.size,
+      max: this.max,
+      ttl_seconds: this.ttl / 1000,
+      ...this.stats,
+      hit_rate: lookups > 0 ? Math.round((this.stats.hits / lookups) * 1000) / 1000 : 0
+    };
+
+    if (this.maxBytes !== Infinity) {
+      stats.bytes = this.bytes;
+      stats.max_bytes = this.maxBytes;
+    }
+    if (this.namespaces.size > 0) {
+      stats.namespaces = {};
+      for (const [name, namespace] of this.namespaces) {
+        stats.namespaces[name] = namespace.getStats();
+      }
+    }
+    return stats;
+  }
+}
+
+class CacheNamespace {
+  constructor(cache, name, ttl) {
+    this.cache = cache;
+    this.name = name;
+    this.prefix = `${name}\u0000`;
+    this.ttl = ttl;
+    this.entries = 0;
+    this.bytes = 0;
+    this.hits = 0;
+    this.misses = 0;
+  }
+
+  get(key) {
+    const value = this.cache.get(this.prefix + key);
+    if (value === undefined) {
+      this.misses++;
+    } else {
+      this.hits++;
+    }
+    return value;
+  }
+
+  set(key, value, ttl = this.ttl) {
+    this.cache.set(this.prefix + key, value, ttl, this);
+  }
+
+  delete(key) {
+    return this.cache.delete(this.prefix + key);
+  }
+
+  // Drop only this namespace's entries
+  clear() {
+    for (const [key, entry] of this.cache.entries) {
+      if (entry.namespace === this) {
+        this.cache.remove(key, entry);
+      }
+    }
+  }
+
+  get size() {
+    return this.entries;
+  }
+
+  getStats() {
+    const lookups = this.hits + this.misses;
+    return {
+      size: this.entries,
+      bytes: this.bytes,
+      ttl_seconds: this.ttl / 1000,
+      hits: this.hits,
+      misses: this.misses,
+      hit_rate: lookups > 0 ? Math.round((this.hits / lookups) * 1000) / 1000 : 0
+    };
+  }
+}
+
+module.exports = LRUCache;
+module.exports.estimateSize = estimateSize;
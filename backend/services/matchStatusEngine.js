@@ -0,0 +1,256 @@
+const EventEmitter = require('events');
+const { getDatabase } = require('../database_mongo');
+
+// Typical match durations per sport, shared by the parser and the status engine
+const SPORT_DURATIONS = {
+  football: 2 * 60 * 60 * 1000,
+  hockey: 3 * 60 * 60 * 1000,
+  baseball: 4 * 60 * 60 * 1000,
+  esports: 3 * 60 * 60 * 1000
+};
+const DEFAULT_DURATION = 3 * 60 * 60 * 1000;
+
+const STATUS_ORDER = { scheduled: 0, live: 1, finished: 2 };
+
+const getMatchDuration = (sport) => SPORT_DURATIONS[sport] || DEFAULT_DURATION;
+
+// Status of a match at `now` from its start time and the sport's duration
+const getMatchStatus = (matchTime, sport, now = Date.now()) => {
+  const startAt = new Date(matchTime).getTime();
+  if (Number.isNaN(startAt) || now < startAt) {
+    return 'scheduled';
+  }
+  return now - startAt >= getMatchDuration(sport) ? 'finished' : 'live';
+};
+
+// Hashed timer wheel that flips tracked matches scheduled -> live -> finished
+// on time. Transitions that fire in the same tick are written with one
+// updateMany per status, and a 'status' event is emitted for each of them.
+class MatchStatusEngine extends EventEmitter {
+  constructor({ tickMs = 1000, slots = 3600 } = {}) {
+    super();
+    this.tickMs = tickMs;
+    this.wheel = Array.from({ length: slots }, () => []);
+    this.cursor = 0;
+    this.lastTick = Date.now();
+    this.timer = null;
+    this.tracked = new Map(); // match id -> { sport, startAt, endAt, status, generation }
+    this.pending = new Map(); // match id -> status waiting to be written
+    this.flushing = false;
+    this.writesEnabled = true; // only the scheduler leader writes statuses
+    this.stats = { transitions: 0, writes: 0, documents_updated: 0, write_errors: 0, rebuilds: 0 };
+  }
+
+  // Load unfinished matches from Mongo and start ticking
+  async start() {
+    if (this.timer) return;
+
+    this.lastTick = Date.now();
+    await this.rebuild();
+    this.timer = setInterval(() => this.tick(), this.tickMs);
+    this.timer.unref();
+    console.log(`⏱️ Match status engine started (${this.tracked.size} matches tracked)`);
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+  }
+
+  // Rebuild wheel state from the matches collection, correcting stale statuses
+  async rebuild() {
+    try {
+      const db = getDatabase();
+      const matches = await db.collection('matches')
+        .find(
+          { status: { $ne: 'finished' }, id: { $exists: true } },
+          { projection: { _id: 0, id: 1, sport: 1, match_time: 1, status: 1 } }
+        )
+        .toArray();
+
+      this.tracked.clear();
+      this.wheel.forEach(slot => { slot.length = 0; });
+      this.trackMany(matches);
+      this.stats.rebuilds++;
+
+      await this.flush();
+      return this.tracked.size;
+    } catch (error) {
+      console.error('❌ Error rebuilding match status engine:', error);
+      return 0;
+    }
+  }
+
+  trackMany(matches) {
+    for (const match of matches) {
+      this.track(match);
+    }
+  }
+
+  // Start (or restart) tracking a match; `match.status` is what is stored in Mongo
+  track(match) {
+    if (!match || !match.id) return;
+
+    const startAt = new Date(match.match_time).getTime();
+    if (Number.isNaN(startAt)) return;
+
+    const now = Date.now();
+    const previous = this.tracked.get(match.id);
+    const entry = {
+      sport: match.sport,
+      startAt,
+      endAt: startAt + getMatchDuration(match.sport),
+      status: getMatchStatus(match.match_time, match.sport, now),
+      generation: previous ? previous.generation + 1 : 0
+    };
+
+    // Catch up statuses that changed while nobody was watching
+    if (match.status !== entry.status) {
+      this.pending.set(match.id, entry.status);
+    }
+
+    if (entry.status === 'finished') {
+      this.tracked.delete(match.id);
+      return;
+    }
+
+    this.tracked.set(match.id, entry);
+    if (entry.status === 'scheduled') {
+      this.schedule(match.id, entry.startAt, 'live', entry.generation);
+    }
+    this.schedule(match.id, entry.endAt, 'finished', entry.generation);
+  }
+
+  // Slots are counted from the last tick (the time `cursor` stands for), not from
+  // now: counting from now can land on a slot that comes up before `dueAt`,
+  // which would then wait a full revolution of the wheel
+  schedule(id, dueAt, status, generation) {
+    const ticks = Math.max(1, Math.ceil((dueAt - this.lastTick) / this.tickMs));
+    const slot = (this.cursor + ticks) % this.wheel.length;
+    this.wheel[slot].push({ id, dueAt, status, generation });
+  }
+
+  // Advance the wheel by the ticks elapsed since the last run
+  tick() {
+    const now = Date.now();
+    const elapsed = Math.floor((now - this.lastTick) / this.tickMs);
+    if (elapsed <= 0) return;
+    this.lastTick += elapsed * this.tickMs;
+
+    const steps = Math.min(elapsed, this.wheel.length);
+    for (let i = 0; i < steps; i++) {
+      this.cursor = (this.cursor + 1) % this.wheel.length;
+      this.processSlot(this.cursor, now);
+    }
+
+    if (this.pending.size > 0) {
+      this.flush();
+    }
+  }
+
+  processSlot(index, now) {
+    const slot = this.wheel[index];
+    if (slot.length === 0) return;
+
+    // Entries due in a later revolution stay in the slot
+    const remaining = [];
+    for (const item of slot) {
+      if (item.dueAt > now) {
+        remaining.push(item);
+      } else {
+        this.fire(item);
+      }
+    }
+    this.wheel[index] = remaining;
+  }
+
+  fire({ id, status, generation }) {
+    const entry = this.tracked.get(id);
+    if (!entry || entry.generation !== generation) return; // re-tracked or finished
+    if (STATUS_ORDER[status] <= STATUS_ORDER[entry.status]) return;
+
+    const previous = entry.status;
+    entry.status = status;
+    this.pending.set(id, status);
+    this.stats.transitions++;
+
+    if (status === 'finished') {
+      this.tracked.delete(id);
+    }
+
+    this.emit('status', { id, sport: entry.sport, status, previous });
+  }
+
+  // Followers keep tracking in memory (for snapshots and events) but don't write
+  setWritesEnabled(enabled) {
+    this.writesEnabled = enabled;
+    if (!enabled) {
+      this.pending.clear();
+    }
+  }
+
+  // Write pending transitions, one updateMany per target status
+  async flush() {
+    if (!this.writesEnabled) {
+      this.pending.clear();
+      return;
+    }
+    if (this.flushing || this.pending.size === 0) return;
+    this.flushing = true;
+
+    const batch = this.pending;
+    this.pending = new Map();
+
+    const byStatus = {};
+    for (const [id, status] of batch) {
+      (byStatus[status] = byStatus[status] || []).push(id);
+    }
+
+    try {
+      const db = getDatabase();
+      const now = new Date();
+
+      for (const [status, ids] of Object.entries(byStatus)) {
+        try {
+          const result = await db.collection('matches').updateMany(
+            { id: { $in: ids }, status: { $ne: status } },
+            { $set: { status, status_updated_at: now } }
+          );
+          this.stats.writes++;
+          this.stats.documents_updated += result.modifiedCount;
+        } catch (error) {
+          this.stats.write_errors++;
+          console.error(`❌ Error writing ${ids.length} match statuses (${status}):`, error.message);
+          // Retry on the next tick unless a newer transition superseded it
+          ids.forEach(id => {
+            if (!this.pending.has(id)) this.pending.set(id, status);
+          });
+        }
+      }
+    } finally {
+      this.flushing = false;
+    }
+  }
+
+  getStats() {
+    return {
+      tracked: this.tracked.size,
+      pending_writes: this.pending.size,
+      tick_ms: this.tickMs,
+      running: Boolean(this.timer),
+      writes_enabled: this.writesEnabled,
+      ...this.stats
+    };
+  }
+}
+
+const matchStatusEngine = new MatchStatusEngine();
+
+module.exports = matchStatusEngine;
+module.exports.MatchStatusEngine = MatchStatusEngine;
+module.exports.SPORT_DURATIONS = SPORT_DURATIONS;
+module.exports.getMatchDuration = getMatchDuration;
+module.exports.getMatchStatus = getMatchStatus;
+module.exports.STATUS_ORDER = STATUS_ORDER;
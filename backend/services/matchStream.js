@@ -0,0 +1,237 @@
+const crypto = require('crypto');
+const matchStatusEngine = require('./matchStatusEngine');
+
+// Match fields pushed as deltas when they change
+const DELTA_FIELDS = ['status', 'odds_team1', 'odds_team2', 'odds_draw', 'logo_team1', 'logo_team2'];
+
+// Server-Sent Events fan-out for today's matches (/api/matches/stream).
+// One hub per process: it watches the status engine and the parser snapshot,
+// turns changes into small per-match events and writes each event once to
+// every connected client. Recent events are kept in a ring buffer so a client
+// reconnecting with Last-Event-ID only receives what it missed. Event ids are
+// `<epoch>-<seq>`, so ids from another process or a restart fall back to a snapshot.
+class MatchStreamHub {
+  constructor({ bufferSize = 500, heartbeatMs = 15 * 1000, pollMs = 5 * 1000, sports = null } = {}) {
+    this.bufferSize = bufferSize;
+    this.heartbeatMs = heartbeatMs;
+    this.pollMs = pollMs;
+    this.sports = sports; // null = all sports
+    this.clients = new Set();
+    this.buffer = []; // [{ id, event, data }] oldest first
+    this.epoch = crypto.randomBytes(3).toString('hex');
+    this.lastId = 0;
+    this.known = null; // match id -> { sport, ...DELTA_FIELDS }
+    this.snapshotKey = null;
+    this.snapshotSource = null;
+    this.heartbeatTimer = null;
+    this.pollTimer = null;
+    this.pollPromise = null; // shared by concurrent poll() callers
+    this.stats = { connections: 0, resumed: 0, events: 0, writes: 0, dropped_slow: 0 };
+
+    matchStatusEngine.on('status', ({ id, sport, status, previous }) => {
+      if (!this.known || !this.known.has(id)) return;
+      this.known.get(id).status = status;
+      this.publish('update', { id, sport, changes: { status }, previous: { status: previous } });
+    });
+  }
+
+  // `source` resolves to the parser snapshot ({ matches, generatedAt, revision })
+  setSnapshotSource(source) {
+    this.snapshotSource = source;
+  }
+
+  includes(match) {
+    return !this.sports || this.sports.includes(match.sport);
+  }
+
+  // Diff the current snapshot against what clients have seen and publish the changes
+  poll() {
+    if (!this.snapshotSource) return Promise.resolve(null);
+    if (!this.pollPromise) {
+      this.pollPromise = this.diffSnapshot().finally(() => {
+        this.pollPromise = null;
+      });
+    }
+    return this.pollPromise;
+  }
+
+  async diffSnapshot() {
+    try {
+      const snapshot = await this.snapshotSource();
+      const key = `${snapshot.generatedAt ? snapshot.generatedAt.getTime() : null}:${snapshot.revision}`;
+      if (this.known && key === this.snapshotKey) return snapshot;
+
+      const matches = snapshot.matches.filter(match => this.includes(match));
+      const next = new Map(matches.map(match => [match.id, this.pickFields(match)]));
+
+      if (this.known) {
+        for (const match of matches) {
+          const before = this.known.get(match.id);
+          if (!before) {
+            this.publish('match', match);
+            continue;
+          }
+
+          const changes = {};
+          const previous = {};
+          for (const field of DELTA_FIELDS) {
+            if (before[field] !== match[field]) {
+              changes[field] = match[field];
+              previous[field] = before[field];
+            }
+          }
+          if (Object.keys(changes).length > 0) {
+            this.publish('update', { id: match.id, sport: match.sport, changes, previous });
+          }
+        }
+
+        for (const [id, before] of this.known) {
+          if (!next.has(id)) {
+            this.publish('remove', { id, sport: before.sport });
+          }
+        }
+      }
+
+      this.known = next;
+      this.snapshotKey = key;
+      return snapshot;
+    } catch (error) {
+      console.error('❌ Match stream poll error:', error);
+      return null;
+    }
+  }
+
+  pickFields(match) {
+    const fields = { sport: match.sport };
+    for (const field of DELTA_FIELDS) {
+      fields[field] = match[field];
+    }
+    return fields;
+  }
+
+  publish(event, data) {
+    const entry = { id: ++this.lastId, event, data };
+    this.buffer.push(entry);
+    if (this.buffer.length > this.bufferSize) {
+      this.buffer.shift();
+    }
+    this.stats.events++;
+
+    const frame = this.formatEvent(entry);
+    for (const client of this.clients) {
+      this.write(client, frame);
+    }
+  }
+
+  formatEvent({ id, event, data }) {
+    return `id: ${this.epoch}-${id}\nevent: ${event}\ndata: ${JSON.stringify(data)}\n\n`;
+  }
+
+  write(client, frame) {
+    // A client that can't keep up is dropped; EventSource reconnects and resumes.
+    // destroy() rather than end(): end() would queue behind the buffered data
+    // and keep the socket (and its buffer) alive
+    if (client.res.writableLength > 1024 * 1024) {
+      this.drop(client);
+      this.stats.dropped_slow++;
+      client.res.destroy();
+      return;
+    }
+    client.res.write(frame);
+    this.stats.writes++;
+  }
+
+  // Sequence number of an event id from this process, or null
+  parseEventId(value) {
+    if (typeof value !== 'string') return null;
+    const [epoch, seq] = value.split('-');
+    const id = parseInt(seq);
+    return epoch === this.epoch && !Number.isNaN(id) ? id : null;
+  }
+
+  // Attach an SSE response: replay missed events, or send a full snapshot
+  async subscribe(req, res) {
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream; charset=utf-8',
+      'Cache-Control': 'no-cache, no-transform',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    });
+    res.write('retry: 5000\n\n');
+
+    const client = { res };
+    const lastEventId = this.parseEventId(req.get('Last-Event-ID') || req.query.last_event_id);
+
+    const snapshot = await this.poll();
+    if (res.destroyed || res.writableEnded) return;
+
+    const oldest = this.buffer.length > 0 ? this.buffer[0].id : this.lastId + 1;
+    if (lastEventId !== null && lastEventId >= oldest - 1 && lastEventId <= this.lastId) {
+      this.stats.resumed++;
+      for (const entry of this.buffer) {
+        if (entry.id > lastEventId) {
+          res.write(this.formatEvent(entry));
+        }
+      }
+    } else {
+      const matches = snapshot ? snapshot.matches.filter(match => this.includes(match)) : [];
+      res.write(this.formatEvent({
+        id: this.lastId,
+        event: 'snapshot',
+        data: {
+          matches,
+          generated_at: snapshot && snapshot.generatedAt ? snapshot.generatedAt.toISOString() : null
+        }
+      }));
+    }
+
+    this.clients.add(client);
+    this.stats.connections++;
+    this.startTimers();
+
+    res.on('close', () => this.drop(client));
+  }
+
+  drop(client) {
+    this.clients.delete(client);
+    if (this.clients.size === 0) {
+      this.stopTimers();
+    }
+  }
+
+  // Heartbeats and snapshot polling only run while someone is listening
+  startTimers() {
+    if (!this.heartbeatTimer) {
+      this.heartbeatTimer = setInterval(() => {
+        for (const client of this.clients) {
+          this.write(client, `: ping ${Date.now()}\n\n`);
+        }
+      }, this.heartbeatMs);
+      this.heartbeatTimer.unref();
+    }
+    if (!this.pollTimer) {
+      this.pollTimer = setInterval(() => this.poll(), this.pollMs);
+      this.pollTimer.unref();
+    }
+  }
+
+  stopTimers() {
+    clearInterval(this.heartbeatTimer);
+    clearInterval(this.pollTimer);
+    this.heartbeatTimer = null;
+    this.pollTimer = null;
+  }
+
+  getStats() {
+    return {
+      clients: this.clients.size,
+      last_event_id: this.lastId,
+      buffered_events: this.buffer.length,
+      ...this.stats
+    };
+  }
+}
+
+// Same sports as /api/matches/today
+module.exports = new MatchStreamHub({ sports: ['baseball', 'hockey'] });
+module.exports.MatchStreamHub = MatchStreamHub;
@@ -0,0 +1,295 @@
+const { monitorEventLoopDelay } = require('perf_hooks');
+const appCache = require('./appCache');
+const { getUserCacheStats } = require('./userCache');
+
+// Minimal Prometheus registry (text exposition format 0.0.4).
+// Counters, gauges and histograms keyed by label values; collectors run at
+// scrape time for values that are cheaper to read than to track.
+
+const DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10];
+
+const escapeLabel = (value) => String(value)
+  .replace(/\\/g, '\\\\')
+  .replace(/\n/g, '\\n')
+  .replace(/"/g, '\\"');
+
+const formatLabels = (names, values, extra = '') => {
+  const pairs = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+  if (extra) pairs.push(extra);
+  return pairs.length > 0 ? `{${pairs.join(',')}}` : '';
+};
+
+class Metric {
+  constructor(type, name, help, labelNames = []) {
+    this.type = type;
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.series = new Map(); // joined label values -> { labels, value }
+  }
+
+  getSeries(labels) {
+    const values = this.labelNames.map(name => (labels[name] === undefined ? '' : labels[name]));
+    const key = values.join('\u0000');
+    let series = this.series.get(key);
+    if (!series) {
+      series = this.createSeries(values);
+      this.series.set(key, series);
+    }
+    return series;
+  }
+
+  createSeries(values) {
+    return { values, value: 0 };
+  }
+
+  reset() {
+    this.series.clear();
+  }
+
+  render() {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`];
+    for (const series of this.series.values()) {
+      lines.push(`${this.name}${formatLabels(this.labelNames, series.values)} ${series.value}`);
+    }
+    return lines.join('\n');
+  }
+}
+
+class Counter extends Metric {
+  constructor(name, help, labelNames) {
+    super('counter', name, help, labelNames);
+  }
+
+  inc(labels = {}, amount = 1) {
+    this.getSeries(labels).value += amount;
+  }
+}
+
+class Gauge extends Metric {
+  constructor(name, help, labelNames) {
+    super('gauge', name, help, labelNames);
+  }
+
+  set(labels = {}, value) {
+    this.getSeries(labels).value = value;
+  }
+}
+
+class Histogram extends Metric {
+  constructor(name, help, labelNames, buckets = DEFAULT_BUCKETS) {
+    super('histogram', name, help, labelNames);
+    this.buckets = buckets;
+  }
+
+  createSeries(values) {
+    return { values, counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+  }
+
+  observe(labels = {}, seconds) {
+    const series = this.getSeries(labels);
+    for (let i = 0; i < this.buckets.length; i++) {
+      if (seconds <= this.buckets[i]) series.counts[i]++;
+    }
+    series.sum += seconds;
+    series.count++;
+  }
+
+  // Returns a function that observes the seconds elapsed since startTimer()
+  startTimer(labels = {}) {
+    const start = process.hrtime.bigint();
+    return (extraLabels = {}) => {
+      this.observe({ ...labels, ...extraLabels }, Number(process.hrtime.bigint() - start) / 1e9);
+    };
+  }
+
+  render() {
+    const lines = [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`];
+    for (const series of this.series.values()) {
+      this.buckets.forEach((bucket, i) => {
+        lines.push(`${this.name}_bucket${formatLabels(this.labelNames, series.values, `le="${bucket}"`)} ${series.counts[i]}`);
+      });
+      lines.push(`${this.name}_bucket${formatLabels(this.labelNames, series.values, 'le="+Inf"')} ${series.count}`);
+      lines.push(`${this.name}_sum${formatLabels(this.labelNames, series.values)} ${series.sum}`);
+      lines.push(`${this.name}_count${formatLabels(this.labelNames, series.values)} ${series.count}`);
+    }
+    return lines.join('\n');
+  }
+}
+
+class Registry {
+  constructor() {
+    this.metrics = new Map();
+    this.collectors = [];
+  }
+
+  register(metric) {
+    if (!this.metrics.has(metric.name)) {
+      this.metrics.set(metric.name, metric);
+    }
+    return this.metrics.get(metric.name);
+  }
+
+  counter(name, help, labelNames) {
+    return this.register(new Counter(name, help, labelNames));
+  }
+
+  gauge(name, help, labelNames) {
+    return this.register(new Gauge(name, help, labelNames));
+  }
+
+  histogram(name, help, labelNames, buckets) {
+    return this.register(new Histogram(name, help, labelNames, buckets));
+  }
+
+  // Run `collect()` before every scrape
+  addCollector(collect) {
+    this.collectors.push(collect);
+  }
+
+  render() {
+    for (const collect of this.collectors) {
+      try {
+        collect();
+      } catch (error) {
+        console.error('❌ Metrics collector error:', error.message);
+      }
+    }
+    return `${Array.from(this.metrics.values()).map(metric => metric.render()).join('\n')}\n`;
+  }
+}
+
+const registry = new Registry();
+
+// HTTP routes
+const httpRequests = registry.counter('http_requests_total', 'HTTP requests handled', ['method', 'route', 'status']);
+const httpDuration = registry.histogram('http_request_duration_seconds', 'HTTP request latency', ['method', 'route']);
+
+// Upstream APIs (one label per pooled HTTP client, e.g. parser:odds, logo:wikipedia)
+const upstreamRequests = registry.counter('upstream_requests_total', 'Upstream API calls by outcome', ['upstream', 'outcome']);
+const upstreamDuration = registry.histogram('upstream_request_duration_seconds', 'Upstream API call latency', ['upstream']);
+
+// In-memory caches
+const cacheLookups = registry.counter('cache_lookups_total', 'Cache lookups by result', ['cache', 'result']);
+const cacheEntries = registry.gauge('cache_entries', 'Entries held in a cache', ['cache']);
+const cacheBytes = registry.gauge('cache_bytes', 'Estimated memory held by a cache', ['cache']);
+
+// MongoDB commands
+const mongoDuration = registry.histogram('mongodb_command_duration_seconds', 'MongoDB command latency', ['command', 'collection']);
+const mongoFailures = registry.counter('mongodb_command_failures_total', 'Failed MongoDB commands', ['command', 'collection']);
+
+// Express middleware: count and time requests by route template
+const httpMetricsMiddleware = (req, res, next) => {
+  const start = process.hrtime.bigint();
+
+  res.on('finish', () => {
+    // Route templates (/matches/sport/:sport) keep label cardinality bounded
+    const route = req.route ? `${req.baseUrl}${req.route.path}` : 'unmatched';
+    const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+    httpRequests.inc({ method: req.method, route, status: res.statusCode });
+    httpDuration.observe({ method: req.method, route }, seconds);
+  });
+
+  next();
+};
+
+// Outcome label for a failed axios call
+const upstreamOutcome = (error) => {
+  if (error.code === 'ECONNABORTED' || error.code === 'ETIMEDOUT') return 'timeout';
+  if (error.response) return `http_${error.response.status}`;
+  return 'error';
+};
+
+// Record every call made through an axios client
+const instrumentAxios = (name, client) => {
+  client.interceptors.request.use((config) => {
+    config.metricsStart = process.hrtime.bigint();
+    return config;
+  });
+
+  const record = (config, outcome) => {
+    upstreamRequests.inc({ upstream: name, outcome });
+    if (config && config.metricsStart) {
+      upstreamDuration.observe({ upstream: name }, Number(process.hrtime.bigint() - config.metricsStart) / 1e9);
+    }
+  };
+
+  client.interceptors.response.use(
+    (response) => {
+      record(response.config, 'success');
+      return response;
+    },
+    (error) => {
+      record(error.config, upstreamOutcome(error));
+      return Promise.reject(error);
+    }
+  );
+};
+
+// Cache counters are read from the caches' own statistics at scrape time
+registry.addCollector(() => {
+  const caches = { ...appCache.getStats().namespaces, auth_users: getUserCacheStats() };
+  for (const [name, stats] of Object.entries(caches)) {
+    cacheLookups.getSeries({ cache: name, result: 'hit' }).value = stats.hits;
+    cacheLookups.getSeries({ cache: name, result: 'miss' }).value = stats.misses;
+    cacheEntries.set({ cache: name }, stats.size);
+    if (stats.bytes !== undefined) {
+      cacheBytes.set({ cache: name }, stats.bytes);
+    }
+  }
+});
+
+// Time MongoDB commands from the driver's command monitoring events
+// (the client must be created with monitorCommands: true)
+const instrumentMongoClient = (client) => {
+  const started = new Map(); // requestId -> collection name
+
+  client.on('commandStarted', (event) => {
+    const target = event.command && event.command[event.commandName];
+    started.set(event.requestId, typeof target === 'string' ? target : '');
+  });
+
+  const finish = (event, failed) => {
+    const collection = started.get(event.requestId) || '';
+    started.delete(event.requestId);
+    const labels = { command: event.commandName, collection };
+    mongoDuration.observe(labels, event.duration / 1000);
+    if (failed) mongoFailures.inc(labels);
+  };
+
+  client.on('commandSucceeded', (event) => finish(event, false));
+  client.on('commandFailed', (event) => finish(event, true));
+};
+
+// Event-loop delay, sampled continuously and reset after each scrape.
+// The histogram includes the sampling interval itself, so it is subtracted.
+const LOOP_RESOLUTION_MS = 20;
+const loopDelay = monitorEventLoopDelay({ resolution: LOOP_RESOLUTION_MS });
+const loopLagSeconds = (ns) => Math.max(0, ns / 1e6 - LOOP_RESOLUTION_MS) / 1000;
+loopDelay.enable();
+const loopLag = registry.gauge('nodejs_eventloop_lag_seconds', 'Event-loop delay since the previous scrape', ['quantile']);
+const memory = registry.gauge('nodejs_memory_bytes', 'Process memory usage', ['type']);
+const uptime = registry.gauge('process_uptime_seconds', 'Process uptime');
+
+registry.addCollector(() => {
+  if (loopDelay.count > 0) {
+    loopLag.set({ quantile: '0.5' }, loopLagSeconds(loopDelay.percentile(50)));
+    loopLag.set({ quantile: '0.99' }, loopLagSeconds(loopDelay.percentile(99)));
+    loopLag.set({ quantile: 'max' }, loopLagSeconds(loopDelay.max));
+  }
+  loopDelay.reset();
+
+  const usage = process.memoryUsage();
+  memory.set({ type: 'rss' }, usage.rss);
+  memory.set({ type: 'heap_used' }, usage.heapUsed);
+  memory.set({ type: 'heap_total' }, usage.heapTotal);
+  memory.set({ type: 'external' }, usage.external);
+  uptime.set({}, process.uptime());
+});
+
+module.exports = {
+  registry,
+  httpMetricsMiddleware,
+  instrumentAxios,
+  instrumentMongoClient
+};
@@ -0,0 +1,147 @@
+const os = require('os');
+const path = require('path');
+const { Worker } = require('worker_threads');
+
+// Bounded worker_threads pool for bcrypt hashing and verification.
+// Tasks queue up to `queueLimit`; beyond that calls fail fast with code
+// HASHER_BUSY so routes can answer 429 instead of piling up work.
+class PasswordHasher {
+  constructor({ size, queueLimit, cost } = {}) {
+    this.size = Math.max(1, size || Math.min(4, Math.max(1, os.cpus().length - 1)));
+    this.queueLimit = queueLimit || 100;
+    this.cost = cost || 12;
+    this.workers = []; // { worker, task }
+    this.queue = [];
+    this.tasks = new Map(); // id -> task
+    this.nextId = 1;
+    this.stats = {
+      hashes: 0,
+      verifications: 0,
+      rejected: 0,
+      errors: 0,
+      worker_restarts: 0,
+      total_wait_ms: 0,
+      max_wait_ms: 0,
+      total_work_ms: 0,
+      max_work_ms: 0
+    };
+  }
+
+  hash(password) {
+    return this.run('hash', { password, cost: this.cost });
+  }
+
+  // Works for any cost factor, since bcrypt stores it in the hash
+  verify(password, hash) {
+    return this.run('compare', { password, hash });
+  }
+
+  run(op, payload) {
+    if (this.queue.length >= this.queueLimit) {
+      this.stats.rejected++;
+      const error = new Error('Password hasher queue is full');
+      error.code = 'HASHER_BUSY';
+      return Promise.reject(error);
+    }
+
+    return new Promise((resolve, reject) => {
+      this.queue.push({ id: this.nextId++, op, payload, resolve, reject, enqueuedAt: Date.now() });
+      this.dispatch();
+    });
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      let slot = this.workers.find(item => !item.task);
+      if (!slot && this.workers.length < this.size) {
+        slot = this.spawnWorker();
+      }
+      if (!slot) return;
+
+      const task = this.queue.shift();
+      const waited = Date.now() - task.enqueuedAt;
+      this.stats.total_wait_ms += waited;
+      this.stats.max_wait_ms = Math.max(this.stats.max_wait_ms, waited);
+
+      slot.task = task;
+      slot.worker.ref(); // busy workers keep the process alive
+      this.tasks.set(task.id, task);
+      slot.worker.postMessage({ id: task.id, op: task.op, ...task.payload });
+    }
+  }
+
+  spawnWorker() {
+    const worker = new Worker(path.join(__dirname, 'passwordWorker.js'));
+    const slot = { worker, task: null };
+
+    worker.on('message', ({ id, result, error, durationMs }) => {
+      const task = this.tasks.get(id);
+      this.tasks.delete(id);
+      slot.task = null;
+      worker.unref();
+
+      this.stats.total_work_ms += durationMs;
+      this.stats.max_work_ms = Math.max(this.stats.max_work_ms, durationMs);
+
+      if (task) {
+        if (error) {
+          this.stats.errors++;
+          task.reject(new Error(error));
+        } else {
+          if (task.op === 'hash') this.stats.hashes++; else this.stats.verifications++;
+          task.resolve(result);
+        }
+      }
+      this.dispatch();
+    });
+
+    // A crashed worker fails its task and is replaced on the next dispatch
+    const fail = (error) => {
+      const index = this.workers.indexOf(slot);
+      if (index === -1) return;
+      this.workers.splice(index, 1);
+      this.stats.worker_restarts++;
+
+      if (slot.task) {
+        this.tasks.delete(slot.task.id);
+        this.stats.errors++;
+        slot.task.reject(error || new Error('Password worker exited'));
+        slot.task = null;
+      }
+      this.dispatch();
+    };
+    worker.on('error', fail);
+    worker.on('exit', code => {
+      if (code !== 0) fail(new Error(`Password worker exited with code ${code}`));
+      else fail();
+    });
+
+    // Idle workers don't keep the process alive (unref after adding listeners, which re-ref the port)
+    worker.unref();
+
+    this.workers.push(slot);
+    return slot;
+  }
+
+  getStats() {
+    const completed = this.stats.hashes + this.stats.verifications + this.stats.errors;
+    const started = completed + this.workers.filter(item => item.task).length;
+    return {
+      workers: this.workers.length,
+      max_workers: this.size,
+      busy_workers: this.workers.filter(item => item.task).length,
+      queue_depth: this.queue.length,
+      queue_limit: this.queueLimit,
+      cost: this.cost,
+      ...this.stats,
+      avg_wait_ms: started > 0 ? Math.round(this.stats.total_wait_ms / started) : 0,
+      avg_work_ms: completed > 0 ? Math.round(this.stats.total_work_ms / completed) : 0
+    };
+  }
+}
+
+module.exports = new PasswordHasher({
+  size: parseInt(process.env.BCRYPT_WORKERS),
+  queueLimit: parseInt(process.env.BCRYPT_QUEUE_LIMIT),
+  cost: parseInt(process.env.BCRYPT_COST)
+});
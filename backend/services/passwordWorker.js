@@ -0,0 +1,15 @@
+const { parentPort } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+// Runs bcrypt off the main event loop for services/passwordHasher.js
+parentPort.on('message', async ({ id, op, password, hash, cost }) => {
+  const startedAt = Date.now();
+  try {
+    const result = op === 'hash'
+      ? await bcrypt.hash(password, cost)
+      : await bcrypt.compare(password, hash);
+    parentPort.postMessage({ id, result, durationMs: Date.now() - startedAt });
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message, durationMs: Date.now() - startedAt });
+  }
+});
@@ -0,0 +1,162 @@
+// Token-bucket rate limiter shared by every upstream API client.
+// `rate` tokens are added per `period` ms, up to `burst` tokens.
+// Two modes: tryAcquire() takes a token only if one is available right now;
+// acquire({ timeout }) queues until a token is available or the deadline passes.
+class TokenBucket {
+  constructor(name, { rate, period = 60 * 1000, burst } = {}) {
+    this.name = name;
+    this.rate = rate || 1;
+    this.period = period;
+    this.capacity = Math.max(1, burst || Math.min(this.rate, 5));
+    this.tokens = this.capacity;
+    this.lastRefill = Date.now();
+    this.queue = []; // { resolve, deadline, enqueuedAt, timer }
+    this.timer = null;
+    this.stats = {
+      granted: 0,
+      rejected: 0,
+      timed_out: 0,
+      waited: 0,
+      total_wait_ms: 0,
+      max_wait_ms: 0
+    };
+  }
+
+  // Milliseconds needed to produce one token
+  get interval() {
+    return this.period / this.rate;
+  }
+
+  refill() {
+    const now = Date.now();
+    const elapsed = now - this.lastRefill;
+    if (elapsed <= 0) return;
+
+    this.tokens = Math.min(this.capacity, this.tokens + elapsed / this.interval);
+    this.lastRefill = now;
+  }
+
+  // Tokens available right now (without taking one)
+  available() {
+    this.refill();
+    return Math.floor(this.tokens);
+  }
+
+  // Take a token if one is available now
+  tryAcquire() {
+    if (this.takeToken()) return true;
+
+    this.stats.rejected++;
+    return false;
+  }
+
+  // Wait for a token for up to `timeout` ms; resolves true when granted, false otherwise.
+  // Fails fast when the token cannot possibly arrive before the deadline.
+  acquire({ timeout = 10 * 1000 } = {}) {
+    if (this.takeToken()) {
+      return Promise.resolve(true);
+    }
+
+    const waitNeeded = (this.queue.length + 1 - this.tokens) * this.interval;
+    if (waitNeeded > timeout) {
+      this.stats.timed_out++;
+      return Promise.resolve(false);
+    }
+
+    return new Promise(resolve => {
+      const now = Date.now();
+      const entry = { resolve, deadline: now + timeout, enqueuedAt: now };
+      entry.timer = setTimeout(() => {
+        const index = this.queue.indexOf(entry);
+        if (index !== -1) {
+          this.queue.splice(index, 1);
+          this.stats.timed_out++;
+          resolve(false);
+        }
+      }, timeout);
+      this.queue.push(entry);
+      this.schedule();
+    });
+  }
+
+  takeToken() {
+    this.refill();
+    if (this.queue.length === 0 && this.tokens >= 1) {
+      this.tokens -= 1;
+      this.stats.granted++;
+      return true;
+    }
+    return false;
+  }
+
+  // Hand out tokens to queued waiters in FIFO order
+  schedule() {
+    if (this.timer || this.queue.length === 0) return;
+
+    this.refill();
+    while (this.queue.length > 0 && this.tokens >= 1) {
+      const entry = this.queue.shift();
+      clearTimeout(entry.timer);
+      this.tokens -= 1;
+
+      const waited = Date.now() - entry.enqueuedAt;
+      this.stats.granted++;
+      this.stats.waited++;
+      this.stats.total_wait_ms += waited;
+      this.stats.max_wait_ms = Math.max(this.stats.max_wait_ms, waited);
+      entry.resolve(true);
+    }
+
+    if (this.queue.length > 0) {
+      const delay = Math.ceil((1 - this.tokens) * this.interval);
+      this.timer = setTimeout(() => {
+        this.timer = null;
+        this.schedule();
+      }, delay);
+    }
+  }
+
+  getStats() {
+    return {
+      rate: this.rate,
+      period_ms: this.period,
+      burst: this.capacity,
+      tokens: Math.floor(this.available()),
+      queue_depth: this.queue.length,
+      ...this.stats,
+      avg_wait_ms: this.stats.waited > 0 ? Math.round(this.stats.total_wait_ms / this.stats.waited) : 0
+    };
+  }
+}
+
+// Process-wide registry so every service shares the same bucket per upstream
+const limiters = new Map();
+
+const getLimiter = (name, config) => {
+  if (!limiters.has(name)) {
+    limiters.set(name, new TokenBucket(name, config));
+  }
+  return limiters.get(name);
+};
+
+const getLimiterStats = () => {
+  const stats = {};
+  for (const [name, limiter] of limiters) {
+    stats[name] = limiter.getStats();
+  }
+  return stats;
+};
+
+// Error thrown by callers that could not get a token before their deadline
+const rateLimitedError = (name) => {
+  const error = new Error(`Rate limit reached for ${name}`);
+  error.code = 'RATE_LIMITED';
+  return error;
+};
+
+module.exports = {
+  TokenBucket,
+  getLimiter,
+  getLimiterStats,
+  rateLimitedError
+};
@@ -1,67 +1,127 @@
-const axios = require('axios');
+const crypto = require('crypto');
 const UserAgent = require('user-agents');
-const { getDatabase, getSportAnalysis } = require('../database_mongo');
+const { getDatabase, getSportAnalysis, bumpCacheVersion } = require('../database_mongo');
 const { getTeamLogo } = require('../data/teamLogos');
-const LogoService = require('./logoService');
+const { getLogoService } = require('./logoService');
+const referenceData = require('./referenceData');
+const { getLimiter } = require('./rateLimiter');
+const { getHttpClient } = require('./httpClients');
+const matchStatusEngine = require('./matchStatusEngine');
+const schedulerLeader = require('./leaderElection');
+const appCache = require('./appCache');
+const { createLogger } = require('./logger');
+
+// Called for every match time; sampled (LOG_SAMPLE_PARSER_TIME)
+const timeLog = createLogger('parser.time', { sample: 0.01 });
+
+// The Odds API feeds we enrich matches from, mapped to our sport names
+const ODDS_SPORTS = {
+  soccer_epl: 'football',
+  icehockey_nhl: 'hockey',
+  baseball_mlb: 'baseball'
+};
+
+// Words that don't help tell teams apart ("FC Barcelona" vs "Barcelona")
+const TEAM_NAME_NOISE = new Set(['fc', 'cf', 'afc', 'sc', 'ac', 'fk', 'hc', 'the', 'club']);
 
 class RealMatchParser {
   constructor() {
     this.userAgent = new UserAgent();
-    this.cache = new Map();
     this.cacheTimeout = 30 * 60 * 1000; // 30 minutes
-    this.logoService = new LogoService();
+    this.cache = appCache.namespace('parser', { ttl: this.cacheTimeout });
+    this.logoService = getLogoService();
+    
+    // Single-flight: one in-flight fetch per cache key, shared by concurrent callers
+    this.inFlight = new Map();
+    this.coalescedCalls = 0;
+    
+    // Last good snapshot of today's matches, served without waiting on upstream APIs
+    this.snapshot = null; // { date, matches, generatedAt, revision }
+    this.snapshotLoadedDate = null;
+    this.snapshotMaxAge = this.cacheTimeout;
+    this.refreshRetryInterval = 60 * 1000; // min gap between background refresh attempts
+    this.lastRefreshAttempt = 0;
+    
+    // Cluster-wide "matches saved" signal (cache_versions.matches): other
+    // processes reload the snapshot from Mongo instead of refetching upstream
+    this.matchesVersion = null;
+    this.versionCheckInterval = 5 * 1000;
+    this.lastVersionCheck = 0;
+    
+    // Saved matches expire this long after they finish (TTL index or nightly cleanup)
+    this.matchRetention = (parseInt(process.env.MATCH_RETENTION_DAYS) || 2) * 24 * 60 * 60 * 1000;
+    
+    // Keep snapshot statuses in step with the status engine
+    matchStatusEngine.on('status', ({ id, status }) => this.applyStatusChange(id, status));
     
     // API Configuration
     this.apis = {
       odds: {
         url: 'https://api.the-odds-api.com',
         key: process.env.ODDS_API_KEY || 'demo',
-        rateLimit: 500
+        rateLimit: 500, // 500 requests per month
+        ratePeriod: 30 * 24 * 60 * 60 * 1000,
+        burst: 3 // one pass over the three odds feeds
       },
       football: {
         url: 'https://api.football-data.org/v4',
         key: process.env.FOOTBALL_DATA_KEY || '',
-        rateLimit: 10
+        rateLimit: 10, // 10 requests per minute
+        ratePeriod: 60 * 1000,
+        burst: 2
       },
       footballAPI: {
         url: 'https://v3.football.api-sports.io',
         key: process.env.API_FOOTBALL_KEY || '',
-        rateLimit: 100 // 100 requests per day on free tier
+        rateLimit: 100, // 100 requests per day on free tier
+        ratePeriod: 24 * 60 * 60 * 1000,
+        burst: 1
       },
       footballFree: {
         url: 'https://www.freefootballapi.com/api',
         key: null, // Free API, no key needed
-        rateLimit: 60
+        rateLimit: 60,
+        ratePeriod: 60 * 1000
       },
       baseball: {
         url: 'https://statsapi.mlb.com/api/v1',
         key: null, // Free API, no key needed
-        rateLimit: 50
+        rateLimit: 50, // 50 requests per minute
+        ratePeriod: 60 * 1000
       },
       hockey: {
         url: 'https://statsapi.web.nhl.com/api/v1',
         key: null, // Free official NHL API
-        rateLimit: 30
+        rateLimit: 30, // 30 requests per minute
+        ratePeriod: 60 * 1000,
+        burst: 3
       },
       hockeyBall: {
         url: 'https://nhl.balldontlie.io/v1',
         key: process.env.BALLDONTLIE_API_KEY || '',
-        rateLimit: 5 // 5 requests per minute on free tier
+        rateLimit: 5, // 5 requests per minute on free tier
+        ratePeriod: 60 * 1000,
+        burst: 1
       },
       hockeyBackup: {
         url: 'https://www.thesportsdb.com/api/v1/json',
         key: process.env.SPORTSDB_KEY || '1',
-        rateLimit: 30
+        rateLimit: 30,
+        ratePeriod: 60 * 1000,
+        limiter: 'sportsdb' // shared with LogoService
       },
       esports: {
         url: 'https://api.pandascore.co',
         key: process.env.PANDASCORE_KEY || '',
-        rateLimit: 10
+        rateLimit: 10, // 10 requests per minute on free tier
+        ratePeriod: 60 * 1000,
+        burst: 2
       },
       esportsFree: {
         url: 'https://esportstracker.azurewebsites.net/api',
         key: null, // Free tracker API
-        rateLimit: 30
+        rateLimit: 30,
+        ratePeriod: 60 * 1000
       }
     };
 
@@ -85,54 +145,37 @@ class RealMatchParser {
       }
     };
 
-    this.lastApiCalls = {
-      odds: 0,
-      football: 0,
-      footballAPI: 0,
-      baseball: 0,
-      hockey: 0,
-      hockeyBall: 0,
-      esports: 0
-    };
+    // Shared token buckets configured from the rateLimit values above
+    this.limiters = {};
+    for (const [apiName, api] of Object.entries(this.apis)) {
+      this.limiters[apiName] = getLimiter(api.limiter || apiName, {
+        rate: api.rateLimit,
+        period: api.ratePeriod,
+        burst: api.burst
+      });
+    }
+    this.rateLimitWait = 10 * 1000; // max time a request waits for a token
   }
 
-  // Rate limiting check
+  // "Try now" check: is a token available right now (does not take it)
   canMakeApiCall(apiName) {
-    const now = Date.now();
-    const lastCall = this.lastApiCalls[apiName];
-    
-    if (apiName === 'football') {
-      // 10 calls per minute limit
-      return now - lastCall > 6000; // 6 seconds between calls
-    } else if (apiName === 'footballAPI') {
-      // 100 calls per day - be conservative (1 call per hour max)
-      return now - lastCall > 3600000; // 1 hour between calls
-    } else if (apiName === 'odds') {
-      // 500 calls per month - be very conservative
-      return now - lastCall > 300000; // 5 minutes between calls
-    } else if (apiName === 'baseball') {
-      // 50 calls per minute
-      return now - lastCall > 1200; // 1.2 seconds between calls
-    } else if (apiName === 'hockey') {
-      // 30 calls per minute
-      return now - lastCall > 2000; // 2 seconds between calls
-    } else if (apiName === 'hockeyBall') {
-      // 5 calls per minute on BALLDONTLIE free tier
-      return now - lastCall > 12000; // 12 seconds between calls
-    } else if (apiName === 'esports') {
-      // 10 calls per minute on free tier
-      return now - lastCall > 6000; // 6 seconds between calls
-    }
-    
-    return true;
+    const limiter = this.limiters[apiName];
+    return limiter ? limiter.available() >= 1 : true;
   }
 
-  // Update last API call time
-  updateApiCallTime(apiName) {
-    this.lastApiCalls[apiName] = Date.now();
+  // Wait for a token, up to a deadline; false means the budget is exhausted
+  async waitForApiToken(apiName, timeout = this.rateLimitWait) {
+    const limiter = this.limiters[apiName];
+    if (!limiter) return true;
+    
+    const granted = await limiter.acquire({ timeout });
+    if (!granted) {
+      console.log(`⏳ Rate limit reached for ${apiName} API`);
+    }
+    return granted;
   }
 
-  // Get axios instance with proper headers
+  // Get the pooled HTTP client for an upstream API
   getAxiosInstance(apiName = 'default') {
     const headers = {
       'User-Agent': this.userAgent.toString(),
@@ -151,10 +194,11 @@ class RealMatchParser {
       headers['Authorization'] = `Bearer ${this.apis.esports.key}`;
     }
 
-    return axios.create({
+    // One pooled keep-alive client per upstream; headers (and User-Agent) are fixed at creation
+    return getHttpClient(`parser:${apiName}`, {
       headers,
       timeout: 15000,
-      maxRedirects: 3,
+      maxSockets: 6
     });
   }
 
@@ -175,42 +219,153 @@ class RealMatchParser {
     return tomorrow.toISOString().split('T')[0];
   }
 
-  // Cache management
-  isCacheValid(key) {
-    const cached = this.cache.get(key);
-    if (!cached) return false;
-    return Date.now() - cached.timestamp < this.cacheTimeout;
+  // Run fetcher once per key; concurrent callers get the same promise
+  singleFlight(key, fetcher) {
+    const pending = this.inFlight.get(key);
+    if (pending) {
+      this.coalescedCalls++;
+      return pending;
+    }
+
+    const promise = Promise.resolve()
+      .then(fetcher)
+      .finally(() => this.inFlight.delete(key));
+
+    this.inFlight.set(key, promise);
+    return promise;
+  }
+
+  // Coalescing statistics
+  getCoalescingStats() {
+    return {
+      coalesced_calls: this.coalescedCalls,
+      in_flight: Array.from(this.inFlight.keys())
+    };
   }
 
-  getCachedData(key) {
-    const cached = this.cache.get(key);
-    return cached ? cached.data : null;
+  // Store the last good set of today's matches
+  setSnapshot(matches, generatedAt = Date.now()) {
+    this.snapshot = {
+      date: this.getTodayString().iso,
+      matches,
+      generatedAt,
+      revision: 0 // bumped on status changes
+    };
   }
 
-  setCacheData(key, data) {
-    this.cache.set(key, {
-      data: data,
-      timestamp: Date.now()
+  // Reload the snapshot when another process (or parser instance) saved matches
+  async checkMatchesVersion(date) {
+    if (Date.now() - this.lastVersionCheck < this.versionCheckInterval) return;
+    this.lastVersionCheck = Date.now();
+
+    try {
+      const db = getDatabase();
+      const doc = await db.collection('cache_versions').findOne({ _id: 'matches' });
+      if (!doc || doc.version === this.matchesVersion) return;
+
+      const changed = this.matchesVersion !== null;
+      this.matchesVersion = doc.version;
+      if (changed) {
+        console.log(`🔄 Matches changed elsewhere (v${doc.version}), reloading snapshot`);
+        await this.loadSnapshotFromDatabase(date, { force: true, generatedAt: new Date(doc.updated_at).getTime() });
+      }
+    } catch (error) {
+      console.error('❌ Error checking matches version:', error);
+    }
+  }
+
+  // Apply a status transition from the engine to the snapshot
+  applyStatusChange(id, status) {
+    if (!this.snapshot) return;
+
+    const match = this.snapshot.matches.find(item => item.id === id);
+    if (match && match.status !== status) {
+      match.status = status;
+      this.snapshot.revision++;
+    }
+  }
+
+  // Load the snapshot from the matches collection (after a restart or a date change)
+  async loadSnapshotFromDatabase(date, { force = false, generatedAt = null } = {}) {
+    return this.singleFlight(`snapshot_db_${date}`, async () => {
+      try {
+        const db = getDatabase();
+        const matches = await db.collection('matches')
+          .find({ match_date: date }, { projection: { _id: 0, content_hash: 0 } })
+          .sort({ sport: 1, match_time: 1 })
+          .toArray();
+
+        if (matches.length > 0 && (force || !this.snapshot || this.snapshot.date !== date)) {
+          // Status writes don't bump the matches version, so stored statuses can be
+          // behind: this process's engine takes the matches over (queuing catch-up
+          // writes on the leader) and the snapshot gets their current statuses
+          matchStatusEngine.trackMany(matches);
+          for (const match of matches) {
+            const status = this.getMatchStatus(match.match_time, match.sport);
+            if (matchStatusEngine.STATUS_ORDER[status] > (matchStatusEngine.STATUS_ORDER[match.status] || 0)) {
+              match.status = status;
+            }
+          }
+
+          const snapshotTime = generatedAt || Math.max(...matches.map(m => new Date(m.updated_at || 0).getTime()));
+          this.setSnapshot(matches, snapshotTime);
+          console.log(`💾 Loaded snapshot of ${matches.length} matches from database`);
+        }
+        this.snapshotLoadedDate = date;
+      } catch (error) {
+        console.error('❌ Error loading matches snapshot from database:', error);
+      }
     });
   }
 
+  // Start a refresh in the background unless one is running or was just attempted
+  triggerBackgroundRefresh() {
+    // Only the scheduler leader talks to upstream APIs; followers wait for its signal
+    if (!schedulerLeader.isLeader()) return;
+    
+    const cacheKey = `real_matches_${this.getTodayString().iso}`;
+    if (this.inFlight.has(cacheKey)) return;
+    if (Date.now() - this.lastRefreshAttempt < this.refreshRetryInterval) return;
+
+    this.lastRefreshAttempt = Date.now();
+    console.log('🔄 Snapshot is stale, refreshing matches in background');
+    this.getTodayMatches().catch(error => {
+      console.error('❌ Background match refresh failed:', error);
+    });
+  }
+
+  // Serve today's matches from the last good snapshot (stale-while-revalidate)
+  async getTodayMatchesSnapshot() {
+    const today = this.getTodayString().iso;
+
+    if ((!this.snapshot || this.snapshot.date !== today) && this.snapshotLoadedDate !== today) {
+      await this.loadSnapshotFromDatabase(today);
+    }
+    await this.checkMatchesVersion(today);
+
+    const snapshot = this.snapshot && this.snapshot.date === today ? this.snapshot : null;
+    const ageMs = snapshot ? Date.now() - snapshot.generatedAt : null;
+    const stale = !snapshot || ageMs >= this.snapshotMaxAge;
+
+    if (stale) {
+      this.triggerBackgroundRefresh();
+    }
+
+    return {
+      matches: snapshot ? snapshot.matches : [],
+      generatedAt: snapshot ? new Date(snapshot.generatedAt) : null,
+      revision: snapshot ? snapshot.revision : 0,
+      ageMs,
+      stale
+    };
+  }
+
   // Get random analysis by sport with betting recommendation
   async getRandomAnalysisBySport(sport) {
     try {
-      const db = getDatabase();
-      const analyses = await db.collection('match_analyses')
-        .find({ sport: sport })
-        .toArray();
-      
-      let baseAnalysis;
-      if (analyses.length > 0) {
-        const randomIndex = Math.floor(Math.random() * analyses.length);
-        baseAnalysis = analyses[randomIndex].analysis_text;
-      } else {
-        baseAnalysis = this.getGenericAnalysis(sport);
-      }
-      
-      return baseAnalysis;
+      // Served from the process-wide reference data cache
+      const analysis = await referenceData.getRandomAnalysis(sport);
+      return analysis || this.getGenericAnalysis(sport);
     } catch (error) {
       console.error('Error getting sport-specific analysis:', error);
       return this.getGenericAnalysis(sport);
@@ -344,7 +499,7 @@ class RealMatchParser {
       
       // Check if the date is valid
       if (isNaN(utcDate.getTime())) {
-        console.warn(`Invalid date: ${utcTimeString}`);
+        timeLog.warn('Invalid date', { value: utcTimeString });
         return this.generateRealisticTime();
       }
       
@@ -356,7 +511,7 @@ class RealMatchParser {
       // Format as ISO string but replace the timezone
       const moscowISOString = moscowTime.toISOString().replace('Z', '+03:00');
       
-      console.log(`⏰ Converted ${utcTimeString} to Moscow time: ${moscowISOString}`);
+      timeLog.debug('Converted to Moscow time', { utc: utcTimeString, moscow: moscowISOString });
       return moscowISOString;
       
     } catch (error) {
@@ -381,7 +536,7 @@ class RealMatchParser {
     const utcTime = moscowTime.getTime() - moscowOffset;
     const moscowISOString = new Date(utcTime).toISOString().replace('Z', '+03:00');
     
-    console.log(`🎯 Generated realistic Moscow time: ${moscowISOString}`);
+    timeLog.debug('Generated realistic Moscow time', { moscow: moscowISOString });
     return moscowISOString;
   }
 
@@ -448,20 +603,21 @@ class RealMatchParser {
   async parseFootballMatches() {
     const cacheKey = 'football_matches_today';
     
-    if (this.isCacheValid(cacheKey)) {
-      return this.getCachedData(cacheKey);
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
     }
 
     try {
       let matches = [];
       
-      // Try Football-Data API first if we have key
-      if (this.canMakeApiCall('football') && this.apis.football.key) {
+      // Try Football-Data API first if we have key (waits for a rate limit token)
+      if (this.apis.football.key) {
         matches = await this.parseFromFootballDataAPI();
         
         if (matches.length >= 2) {
           console.log(`✅ Got ${matches.length} football matches from Football-Data API`);
-          this.setCacheData(cacheKey, matches);
+          this.cache.set(cacheKey, matches);
           return matches;
         }
       }
@@ -473,7 +629,7 @@ class RealMatchParser {
         
         if (matches.length >= 2) {
           console.log(`✅ Got ${matches.length} football matches from API-Football`);
-          this.setCacheData(cacheKey, matches);
+          this.cache.set(cacheKey, matches);
           return matches;
         }
       }
@@ -486,7 +642,7 @@ class RealMatchParser {
 
       // NO FALLBACK TO MOCK DATA
       console.log(`📊 Found ${matches.length} real football matches (no fallback to mock data)`);
-      this.setCacheData(cacheKey, matches);
+      this.cache.set(cacheKey, matches);
       return matches;
 
     } catch (error) {
@@ -500,14 +656,16 @@ class RealMatchParser {
     const today = this.getTodayString();
     const axios = this.getAxiosInstance('football');
     
-    this.updateApiCallTime('football');
-    
     try {
       // Get matches for today and tomorrow
       const dates = [today.iso, this.getTomorrowString()];
       let allMatches = [];
       
       for (const date of dates) {
+        if (!(await this.waitForApiToken('football'))) {
+          break;
+        }
+        
         const response = await axios.get(
           `${this.apis.football.url}/matches?dateFrom=${date}&dateTo=${date}`
         );
@@ -515,9 +673,6 @@ class RealMatchParser {
         if (response.data && response.data.matches) {
           allMatches = allMatches.concat(response.data.matches);
         }
-        
-        // Rate limiting delay
-        await new Promise(resolve => setTimeout(resolve, 2000));
       }
       
       // Process matches with fixed times and auto-logos
@@ -562,7 +717,9 @@ class RealMatchParser {
     const axios = this.getAxiosInstance('footballAPI');
     const today = this.getTodayString();
     
-    this.updateApiCallTime('footballAPI');
+    if (!(await this.waitForApiToken('footballAPI'))) {
+      return [];
+    }
     
     try {
       // Get fixtures for today from API-Football
@@ -714,40 +871,13 @@ class RealMatchParser {
     }
 
     try {
-      const axios = this.getAxiosInstance();
-      const sportsWithOdds = [];
-
-      // Get odds for different sports
-      for (const sport of ['soccer_epl', 'icehockey_nhl', 'baseball_mlb']) {
-        try {
-          this.updateApiCallTime('odds');
-          
-          const response = await axios.get(
-            `${this.apis.odds.url}/v4/sports/${sport}/odds`,
-            {
-              params: {
-                apiKey: this.apis.odds.key,
-                regions: 'us,uk,eu',
-                markets: 'h2h', // head to head
-                oddsFormat: 'decimal'
-              }
-            }
-          );
-
-          if (response.data && response.data.length > 0) {
-            sportsWithOdds.push(...response.data);
-          }
-
-          // Rate limiting delay
-          await new Promise(resolve => setTimeout(resolve, 2000));
-        } catch (error) {
-          console.error(`Error fetching odds for ${sport}:`, error.message);
-          continue;
-        }
-      }
+      // Fetch all sport feeds in parallel; the limiter still paces the requests
+      const feeds = await Promise.all(
+        Object.keys(ODDS_SPORTS).map(sportKey => this.fetchOddsFeed(sportKey))
+      );
 
       // Match odds with our matches
-      return this.matchOddsWithMatches(matches, sportsWithOdds);
+      return this.matchOddsWithMatches(matches, feeds.flat());
 
     } catch (error) {
       console.error('Error parsing odds:', error);
@@ -755,15 +885,80 @@ class RealMatchParser {
     }
   }
 
-  // Match API odds with our matches
-  matchOddsWithMatches(matches, oddsData) {
-    return matches.map(match => {
-      // Try to find matching odds
-      const matchingOdds = oddsData.find(odds => 
-        odds.home_team.toLowerCase().includes(match.team1.toLowerCase().split(' ')[0]) ||
-        odds.away_team.toLowerCase().includes(match.team2.toLowerCase().split(' ')[0])
+  // Fetch one sport's odds events; returns [] on error or when out of quota
+  async fetchOddsFeed(sportKey) {
+    try {
+      if (!(await this.waitForApiToken('odds'))) {
+        return [];
+      }
+      
+      const axios = this.getAxiosInstance('odds');
+      const response = await axios.get(
+        `${this.apis.odds.url}/v4/sports/${sportKey}/odds`,
+        {
+          params: {
+            apiKey: this.apis.odds.key,
+            regions: 'us,uk,eu',
+            markets: 'h2h', // head to head
+            oddsFormat: 'decimal'
+          }
+        }
       );
 
+      return Array.isArray(response.data) ? response.data : [];
+    } catch (error) {
+      console.error(`Error fetching odds for ${sportKey}:`, error.message);
+      return [];
+    }
+  }
+
+  // Normalize a team name for joins: lowercase, no accents/punctuation, no club prefixes
+  normalizeTeamName(name) {
+    return String(name || '')
+      .normalize('NFD')
+      .replace(/[\u0300-\u036f]/g, '')
+      .toLowerCase()
+      .replace(/\./g, '') // "F.C." -> "fc"
+      .replace(/[^a-z0-9а-яё]+/g, ' ')
+      .split(' ')
+      .filter(word => word && !TEAM_NAME_NOISE.has(word))
+      .join(' ');
+  }
+
+  oddsKey(sport, home, away, date = '') {
+    return `${sport}|${this.normalizeTeamName(home)}|${this.normalizeTeamName(away)}|${date}`;
+  }
+
+  // Index odds events by (sport, home, away, date) and by (sport, home, away) as a
+  // fallback for matches whose local date differs from the UTC commence date
+  buildOddsIndex(oddsData) {
+    const index = new Map();
+
+    for (const event of oddsData) {
+      const sport = ODDS_SPORTS[event.sport_key];
+      if (!sport || !event.home_team || !event.away_team) continue;
+
+      const date = (event.commence_time || '').slice(0, 10);
+      index.set(this.oddsKey(sport, event.home_team, event.away_team, date), event);
+
+      const anyDateKey = this.oddsKey(sport, event.home_team, event.away_team);
+      if (!index.has(anyDateKey)) {
+        index.set(anyDateKey, event);
+      }
+    }
+
+    return index;
+  }
+
+  matchOddsWithMatches(matches, oddsData) {
+    const index = this.buildOddsIndex(oddsData);
+    let matched = 0;
+
+    const result = matches.map(match => {
+      const date = String(match.match_time || '').slice(0, 10);
+      const matchingOdds = index.get(this.oddsKey(match.sport, match.team1, match.team2, date)) ||
+        index.get(this.oddsKey(match.sport, match.team1, match.team2));
+
       if (matchingOdds && matchingOdds.bookmakers && matchingOdds.bookmakers.length > 0) {
         const bookmaker = matchingOdds.bookmakers[0]; // Use first bookmaker
         const market = bookmaker.markets.find(m => m.key === 'h2h');
@@ -773,6 +968,7 @@ class RealMatchParser {
           const awayOdds = market.outcomes.find(o => o.name === matchingOdds.away_team);
           const drawOdds = market.outcomes.find(o => o.name === 'Draw');
           
+          matched++;
           return {
             ...match,
             odds_team1: homeOdds ? parseFloat(homeOdds.price) : this.generateMockOdds(),
@@ -792,14 +988,11 @@ class RealMatchParser {
         odds_source: 'generated'
       };
     });
-  }
 
-  // Generate realistic mock odds
-  generateMockOdds() {
-    return parseFloat((1.4 + Math.random() * 2.5).toFixed(2));
+    console.log(`💰 Matched real odds for ${matched}/${matches.length} matches (${oddsData.length} odds events)`);
+    return result;
   }
 
-  // Add mock odds to matches
   addMockOdds(matches) {
     return matches.map(match => ({
       ...match,
@@ -814,20 +1007,19 @@ class RealMatchParser {
   async parseBaseballMatches() {
     const cacheKey = 'baseball_matches_today';
     
-    if (this.isCacheValid(cacheKey)) {
-      return this.getCachedData(cacheKey);
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
     }
 
     try {
-      if (!this.canMakeApiCall('baseball')) {
-        console.log('Rate limit reached for MLB API');
+      // Wait for a token instead of dropping real data
+      if (!(await this.waitForApiToken('baseball'))) {
         return []; // Return empty instead of mock data
       }
 
       const today = this.getTodayString();
-      const axios = this.getAxiosInstance();
-      
-      this.updateApiCallTime('baseball');
+      const axios = this.getAxiosInstance('baseball');
       
       const response = await axios.get(
         `${this.apis.baseball.url}/schedule?sportId=1&date=${today.iso}`
@@ -874,7 +1066,7 @@ class RealMatchParser {
         console.log('⚠️ No real MLB games today, returning empty array (no mock data)');
       }
 
-      this.setCacheData(cacheKey, matches);
+      this.cache.set(cacheKey, matches);
       return matches;
 
     } catch (error) {
@@ -929,25 +1121,24 @@ class RealMatchParser {
   async parseHockeyMatches() {
     const cacheKey = 'hockey_matches_today';
     
-    if (this.isCacheValid(cacheKey)) {
-      return this.getCachedData(cacheKey);
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
     }
 
     try {
       let matches = [];
       
-      // Try NHL API first
-      if (this.canMakeApiCall('hockey')) {
-        try {
-          matches = await this.parseFromNHLAPI();
-          if (matches.length >= 2) {
-            console.log(`✅ Got ${matches.length} hockey matches from NHL API`);
-            this.setCacheData(cacheKey, matches);
-            return matches;
-          }
-        } catch (error) {
-          console.log('⚠️ NHL API failed, trying BALLDONTLIE NHL API...');
+      // Try NHL API first (waits for a rate limit token)
+      try {
+        matches = await this.parseFromNHLAPI();
+        if (matches.length >= 2) {
+          console.log(`✅ Got ${matches.length} hockey matches from NHL API`);
+          this.cache.set(cacheKey, matches);
+          return matches;
         }
+      } catch (error) {
+        console.log('⚠️ NHL API failed, trying BALLDONTLIE NHL API...');
       }
       
       // Try BALLDONTLIE NHL API as backup
@@ -957,7 +1148,7 @@ class RealMatchParser {
           matches = matches.concat(ballMatches);
           if (matches.length >= 2) {
             console.log(`✅ Got ${matches.length} hockey matches from BALLDONTLIE NHL API`);
-            this.setCacheData(cacheKey, matches);
+            this.cache.set(cacheKey, matches);
             return matches;
           }
         } catch (error) {
@@ -977,7 +1168,7 @@ class RealMatchParser {
 
       // NO FALLBACK TO MOCK DATA
       console.log(`📊 Found ${matches.length} real hockey matches (no fallback to mock data)`);
-      this.setCacheData(cacheKey, matches);
+      this.cache.set(cacheKey, matches);
       return matches;
 
     } catch (error) {
@@ -1018,9 +1209,11 @@ class RealMatchParser {
   // Parse from NHL official API
   async parseFromNHLAPI() {
     const today = this.getTodayString();
-    const axios = this.getAxiosInstance();
+    const axios = this.getAxiosInstance('hockey');
     
-    this.updateApiCallTime('hockey');
+    if (!(await this.waitForApiToken('hockey'))) {
+      return [];
+    }
     
     try {
       const response = await axios.get(
@@ -1113,20 +1306,21 @@ class RealMatchParser {
   async parseEsportsMatches() {
     const cacheKey = 'esports_matches_today';
     
-    if (this.isCacheValid(cacheKey)) {
-      return this.getCachedData(cacheKey);
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
+      return cached;
     }
 
     try {
       let matches = [];
 
-      // Try PandaScore API first
-      if (this.canMakeApiCall('esports') && this.apis.esports.key) {
+      // Try PandaScore API first (waits for a rate limit token)
+      if (this.apis.esports.key) {
         try {
           matches = await this.parseFromPandaScore();
           if (matches.length >= 2) {
             console.log(`✅ Got ${matches.length} esports matches from PandaScore API`);
-            this.setCacheData(cacheKey, matches);
+            this.cache.set(cacheKey, matches);
             return matches;
           }
         } catch (error) {
@@ -1146,7 +1340,7 @@ class RealMatchParser {
 
       // NO FALLBACK TO MOCK DATA
       console.log(`📊 Found ${matches.length} real esports matches (no fallback to mock data)`);
-      this.setCacheData(cacheKey, matches);
+      this.cache.set(cacheKey, matches);
       return matches;
 
     } catch (error) {
@@ -1159,7 +1353,9 @@ class RealMatchParser {
   async parseFromPandaScore() {
     const axios = this.getAxiosInstance('esports');
     
-    this.updateApiCallTime('esports');
+    if (!(await this.waitForApiToken('esports'))) {
+      return [];
+    }
     
     try {
       // Get upcoming matches (real times, not adjusted)
@@ -1225,9 +1421,11 @@ class RealMatchParser {
 
   // Parse from free esports tracker
   async parseFromEsportsTracker() {
-    const axios = this.getAxiosInstance();
+    const axios = this.getAxiosInstance('esportsFree');
     
-    this.updateApiCallTime('esportsFree');
+    if (!(await this.waitForApiToken('esportsFree'))) {
+      return [];
+    }
     
     try {
       const response = await axios.get(
@@ -1395,11 +1593,18 @@ class RealMatchParser {
   async getTodayMatches() {
     const cacheKey = `real_matches_${this.getTodayString().iso}`;
     
-    if (this.isCacheValid(cacheKey)) {
+    const cached = this.cache.get(cacheKey);
+    if (cached !== undefined) {
       console.log('🔄 Returning cached real matches');
-      return this.getCachedData(cacheKey);
+      return cached;
     }
 
+    // Concurrent cache misses share a single upstream fan-out
+    return this.singleFlight(cacheKey, () => this.fetchTodayMatches(cacheKey));
+  }
+
+  // Fetch today's matches from all upstream APIs (called through singleFlight)
+  async fetchTodayMatches(cacheKey) {
     try {
       console.log('🔍 Fetching ONLY real matches from APIs (no mock data)...');
       
@@ -1451,7 +1656,7 @@ class RealMatchParser {
         }
         
         // Determine match status based on real time
-        match.status = this.getMatchStatus(match.match_time);
+        match.status = this.getMatchStatus(match.match_time, match.sport);
         match.realism_score = this.calculateRealismScore(match);
       }
       
@@ -1473,7 +1678,8 @@ class RealMatchParser {
       console.log(`   🎮 Киберспорт: ${limitedEsports.length} (${this.getSourceType(limitedEsports)})`);
       console.log(`   📊 Процент реальности: ${realismPercentage}% (ТОЛЬКО РЕАЛЬНЫЕ ДАННЫЕ)`);
       
-      this.setCacheData(cacheKey, allMatches);
+      this.cache.set(cacheKey, allMatches);
+      this.setSnapshot(allMatches);
       return allMatches;
 
     } catch (error) {
@@ -1505,27 +1711,11 @@ class RealMatchParser {
   }
 
   // Get match status based on real time
-  getMatchStatus(matchTime) {
-    const now = new Date();
-    const matchDate = new Date(matchTime);
-    
-    if (now < matchDate) {
-      return 'scheduled';
-    } else {
-      // Check if enough time has passed for match to be finished
-      const timeDiff = now - matchDate;
-      const hoursElapsed = timeDiff / (1000 * 60 * 60);
-      
-      // Different sports have different typical durations
-      if (hoursElapsed > 4) { // Most matches should be finished after 4 hours
-        return 'finished';
-      } else if (hoursElapsed > 0) {
-        return 'live';
-      }
-    }
-    
-    return 'scheduled';
+  getMatchStatus(matchTime, sport) {
+    // Same per-sport durations as the match status engine
+    return matchStatusEngine.getMatchStatus(matchTime, sport);
   }
+
   calculateRealismScore(match) {
     const source = match.source;
     
@@ -1691,47 +1881,102 @@ class RealMatchParser {
     return fallbackMatches;
   }
 
-  // Save matches to database (using MongoDB) with status support
+  // Build the persisted form of a match
+  buildMatchDocument(match) {
+    return {
+      id: match.id || this.generateMatchId(match),
+      sport: match.sport,
+      team1: match.team1,
+      team2: match.team2,
+      match_time: match.match_time, // Keep original REAL time
+      odds_team1: match.odds_team1,
+      odds_team2: match.odds_team2,
+      odds_draw: match.odds_draw,
+      analysis: match.analysis,
+      source: match.source,
+      match_date: match.match_date,
+      prediction: match.prediction,
+      competition: match.competition,
+      game: match.game, // For esports
+      venue: match.venue,
+      gameId: match.gameId, // MLB game ID
+      match_id: match.match_id, // PandaScore match ID
+      logo_team1: match.logo_team1,
+      logo_team2: match.logo_team2,
+      realism_score: match.realism_score,
+      status: match.status || 'scheduled',
+      expires_at: this.getMatchExpiry(match),
+      real_api_source: true // Flag to indicate this is from real API
+    };
+  }
+
+  // When a saved match may be removed: end of the match plus the retention window
+  getMatchExpiry(match) {
+    const startAt = new Date(match.match_time).getTime();
+    if (Number.isNaN(startAt)) return null;
+    
+    return new Date(startAt + matchStatusEngine.getMatchDuration(match.sport) + this.matchRetention);
+  }
+
+  // Save matches to database in one unordered bulkWrite (upsert on the natural key)
   async saveMatchesToDatabase(matches) {
+    const summary = { inserted: 0, updated: 0, unchanged: 0 };
+    if (!matches || matches.length === 0) {
+      return summary;
+    }
+
     try {
       const db = getDatabase();
       
-      for (const match of matches) {
-        await db.collection('matches').updateOne(
-          { 
-            team1: match.team1,
-            team2: match.team2,
-            match_time: match.match_time // Use exact match time for uniqueness
-          },
-          { 
-            $set: {
-              id: match.id || this.generateMatchId(match),
-              sport: match.sport,
+      const operations = matches.map(match => {
+        const doc = this.buildMatchDocument(match);
+        const contentHash = crypto.createHash('sha1').update(JSON.stringify(doc)).digest('hex');
+        
+        // Pipeline update: values are wrapped in $literal, and updated_at only moves
+        // when the content hash changes, so identical matches count as unchanged
+        const fields = {};
+        for (const [key, value] of Object.entries(doc)) {
+          fields[key] = { $literal: value === undefined ? null : value };
+        }
+        
+        return {
+          updateOne: {
+            filter: {
               team1: match.team1,
               team2: match.team2,
-              match_time: match.match_time, // Keep original REAL time
-              odds_team1: match.odds_team1,
-              odds_team2: match.odds_team2,
-              odds_draw: match.odds_draw,
-              analysis: match.analysis,
-              source: match.source,
-              match_date: match.match_date,
-              prediction: match.prediction,
-              competition: match.competition,
-              game: match.game, // For esports
-              venue: match.venue,
-              logo_team1: match.logo_team1,
-              logo_team2: match.logo_team2,
-              realism_score: match.realism_score,
-              status: match.status || 'scheduled',
-              real_api_source: true, // Flag to indicate this is from real API
-              updated_at: new Date()
-            }
-          },
-          { upsert: true }
-        );
-      }
-      console.log(`✅ Saved ${matches.length} real matches to database`);
+              match_time: match.match_time // Use exact match time for uniqueness
+            },
+            update: [{
+              $set: {
+                ...fields,
+                content_hash: contentHash,
+                updated_at: {
+                  $cond: [{ $eq: ['$content_hash', contentHash] }, '$updated_at', '$$NOW']
+                }
+              }
+            }],
+            upsert: true
+          }
+        };
+      });
+      
+      const result = await db.collection('matches').bulkWrite(operations, { ordered: false });
+      
+      // Hand the saved matches to the status engine so they flip live/finished on time
+      matchStatusEngine.trackMany(matches.map(match => this.buildMatchDocument(match)));
+      
+      // Signal other processes; our own snapshot is already current
+      this.matchesVersion = await bumpCacheVersion('matches').catch(error => {
+        console.error('❌ Error bumping matches version:', error.message);
+        return this.matchesVersion;
+      });
+      
+      summary.inserted = result.upsertedCount;
+      summary.updated = result.modifiedCount;
+      summary.unchanged = result.matchedCount - result.modifiedCount;
+      
+      console.log(`✅ Saved ${matches.length} real matches to database (inserted: ${summary.inserted}, updated: ${summary.updated}, unchanged: ${summary.unchanged})`);
+      return summary;
     } catch (error) {
       console.error('❌ Error saving real matches to database:', error);
       throw error;
@@ -1749,8 +1994,15 @@ class RealMatchParser {
     }
   }
   
-  // Force refresh matches
+  // Force refresh matches (joins a refresh that is already in flight)
   async forceRefreshMatches() {
+    const cacheKey = `real_matches_${this.getTodayString().iso}`;
+    if (this.inFlight.has(cacheKey)) {
+      this.coalescedCalls++;
+      console.log('🔄 Refresh already in progress, joining it');
+      return await this.inFlight.get(cacheKey);
+    }
+    
     // Clear cache to force refresh
     this.cache.clear();
     console.log('🧹 Match parser cache cleared');
@@ -1765,4 +2017,14 @@ class RealMatchParser {
   }
 }
 
-module.exports = RealMatchParser;
\ No newline at end of file
+// One parser per process, shared by routes and the scheduler (one cache, one snapshot)
+let sharedParser = null;
+const getMatchParser = () => {
+  if (!sharedParser) {
+    sharedParser = new RealMatchParser();
+  }
+  return sharedParser;
+};
+
+module.exports = RealMatchParser;
+module.exports.getMatchParser = getMatchParser;
\ No newline at end of file
@@ -0,0 +1,130 @@
+const { getDatabase, bumpCacheVersion } = require('../database_mongo');
+
+// Process-wide cache for small, rarely changing reference datasets
+// (match_analyses texts and the stats document). Writers call invalidate(),
+// which bumps a version stamp in cache_versions so other processes reload too.
+class ReferenceDataCache {
+  constructor() {
+    this.datasets = ['analyses', 'stats'];
+    this.analysesBySport = null; // Map sport -> [analysis_text]
+    this.stats = null;
+    this.loadedVersions = { analyses: null, stats: null };
+    this.pending = new Map();
+    this.versionCheckInterval = 30 * 1000; // how often to look for changes from other processes
+    this.lastVersionCheck = 0;
+  }
+
+  // Drop datasets whose version stamp changed since they were loaded
+  async checkVersions() {
+    if (Date.now() - this.lastVersionCheck < this.versionCheckInterval) return;
+    this.lastVersionCheck = Date.now();
+
+    try {
+      const db = getDatabase();
+      const versions = await db.collection('cache_versions')
+        .find({ _id: { $in: this.datasets } })
+        .toArray();
+
+      for (const { _id: name, version } of versions) {
+        if (this.loadedVersions[name] !== null && this.loadedVersions[name] !== version) {
+          console.log(`🔄 Reference data "${name}" changed (v${version}), reloading`);
+          this.drop(name);
+        }
+      }
+    } catch (error) {
+      console.error('❌ Error checking reference data versions:', error);
+    }
+  }
+
+  // Read the current version stamp of a dataset
+  async readVersion(db, name) {
+    const doc = await db.collection('cache_versions').findOne({ _id: name });
+    return doc ? doc.version : 0;
+  }
+
+  // Load a dataset once; concurrent callers share the same promise
+  load(name, loader) {
+    if (this.pending.has(name)) return this.pending.get(name);
+
+    const promise = loader().finally(() => this.pending.delete(name));
+    this.pending.set(name, promise);
+    return promise;
+  }
+
+  async loadAnalyses() {
+    return this.load('analyses', async () => {
+      const db = getDatabase();
+      const version = await this.readVersion(db, 'analyses');
+      const analyses = await db.collection('match_analyses')
+        .find({}, { projection: { _id: 0, sport: 1, analysis_text: 1 } })
+        .toArray();
+
+      const bySport = new Map();
+      for (const { sport, analysis_text } of analyses) {
+        if (!bySport.has(sport)) bySport.set(sport, []);
+        bySport.get(sport).push(analysis_text);
+      }
+
+      this.analysesBySport = bySport;
+      this.loadedVersions.analyses = version;
+      console.log(`📚 Loaded ${analyses.length} match analyses into reference cache`);
+      return bySport;
+    });
+  }
+
+  async loadStats() {
+    return this.load('stats', async () => {
+      const db = getDatabase();
+      const version = await this.readVersion(db, 'stats');
+      this.stats = await db.collection('stats').findOne({});
+      this.loadedVersions.stats = version;
+      return this.stats;
+    });
+  }
+
+  // Random analysis text for a sport, or null if none exist
+  async getRandomAnalysis(sport) {
+    await this.checkVersions();
+    const bySport = this.analysesBySport || await this.loadAnalyses();
+    const analyses = bySport.get(sport);
+
+    if (!analyses || analyses.length === 0) return null;
+    return analyses[Math.floor(Math.random() * analyses.length)];
+  }
+
+  // First analysis of any sport, or null if the collection is empty
+  async getAnyAnalysis() {
+    await this.checkVersions();
+    const bySport = this.analysesBySport || await this.loadAnalyses();
+
+    for (const analyses of bySport.values()) {
+      if (analyses.length > 0) return analyses[0];
+    }
+    return null;
+  }
+
+  // Stats document (null if it does not exist yet)
+  async getStats() {
+    await this.checkVersions();
+    if (this.stats) return this.stats;
+    return await this.loadStats();
+  }
+
+  drop(name) {
+    if (name === 'analyses') this.analysesBySport = null;
+    if (name === 'stats') this.stats = null;
+    this.loadedVersions[name] = null;
+  }
+
+  // Called after a dataset is written: drop it here and signal other processes
+  async invalidate(name) {
+    this.drop(name);
+    try {
+      await bumpCacheVersion(name);
+    } catch (error) {
+      console.error(`❌ Error bumping cache version for ${name}:`, error);
+    }
+  }
+}
+
+module.exports = new ReferenceDataCache();
@@ -0,0 +1,125 @@
+const crypto = require('crypto');
+const zlib = require('zlib');
+
+// Serialized, precompressed JSON responses for hot read endpoints.
+// Each entry is built once per data version and served with a strong ETag,
+// so repeat requests cost a header comparison (304) or a buffer write.
+// Keys can include client input (sport, page size), so the number of entries is
+// bounded and the least recently used ones are evicted.
+
+const MIN_COMPRESS_BYTES = 1024; // smaller bodies are sent as-is
+
+class ResponseCache {
+  constructor({ max = 200 } = {}) {
+    this.max = max;
+    this.entries = new Map(); // key -> { version, builtAt, response }, least recently used first
+    this.stats = { builds: 0, hits: 0, not_modified: 0, evictions: 0, sent: { br: 0, gzip: 0, identity: 0 } };
+  }
+
+  // Serialize a payload and prepare its compressed variants
+  buildResponse(payload) {
+    const body = Buffer.from(JSON.stringify(payload));
+    const hash = crypto.createHash('sha1').update(body).digest('base64url');
+    const response = {
+      etag: `"${hash}"`,
+      identity: body,
+      gzip: null,
+      br: null
+    };
+
+    if (body.length >= MIN_COMPRESS_BYTES) {
+      response.gzip = zlib.gzipSync(body, { level: 6 });
+      response.br = zlib.brotliCompressSync(body, {
+        params: {
+          [zlib.constants.BROTLI_PARAM_MODE]: zlib.constants.BROTLI_MODE_TEXT,
+          [zlib.constants.BROTLI_PARAM_QUALITY]: 6,
+          [zlib.constants.BROTLI_PARAM_SIZE_HINT]: body.length
+        }
+      });
+    }
+
+    this.stats.builds++;
+    return response;
+  }
+
+  // Return the cached response for `key`, rebuilding it when `version` changed
+  // or the entry is older than `maxAge` ms (for data written by other processes)
+  get(key, version, buildPayload, { maxAge = null } = {}) {
+    const entry = this.entries.get(key);
+    const expired = entry && maxAge !== null && Date.now() - entry.builtAt > maxAge;
+
+    if (entry && entry.version === version && !expired) {
+      this.entries.delete(key);
+      this.entries.set(key, entry);
+      this.stats.hits++;
+      return Promise.resolve(entry.response);
+    }
+
+    return Promise.resolve(buildPayload()).then(payload => {
+      const response = this.buildResponse(payload);
+      this.entries.delete(key);
+      this.entries.set(key, { version, builtAt: Date.now(), response });
+      while (this.entries.size > this.max) {
+        this.entries.delete(this.entries.keys().next().value);
+        this.stats.evictions++;
+      }
+      return response;
+    });
+  }
+
+  // Drop entries whose key starts with `prefix`
+  invalidate(prefix) {
+    for (const key of this.entries.keys()) {
+      if (key.startsWith(prefix)) {
+        this.entries.delete(key);
+      }
+    }
+  }
+
+  // Send a cached response: 304 on matching If-None-Match, otherwise the best encoding
+  send(req, res, response, { cacheControl = 'no-cache' } = {}) {
+    res.set('ETag', response.etag);
+    res.set('Cache-Control', cacheControl);
+    res.vary('Accept-Encoding');
+
+    if (this.matchesETag(req.get('If-None-Match'), response.etag)) {
+      this.stats.not_modified++;
+      return res.status(304).end();
+    }
+
+    let encoding = 'identity';
+    if (response.gzip) {
+      encoding = req.acceptsEncodings('br', 'gzip', 'identity') || 'identity';
+    }
+
+    const body = response[encoding] || response.identity;
+    if (encoding !== 'identity') {
+      res.set('Content-Encoding', encoding);
+    }
+    this.stats.sent[encoding]++;
+
+    res.set('Content-Type', 'application/json; charset=utf-8');
+    res.set('Content-Length', String(body.length));
+    return res.status(200).end(body);
+  }
+
+  matchesETag(header, etag) {
+    if (!header) return false;
+    if (header.trim() === '*') return true;
+
+    return header.split(',').some(candidate => {
+      const value = candidate.trim().replace(/^W\//, '');
+      return value === etag;
+    });
+  }
+
+  getStats() {
+    return {
+      entries: this.entries.size,
+      max: this.max,
+      ...this.stats
+    };
+  }
+}
+
+module.exports = new ResponseCache({ max: parseInt(process.env.RESPONSE_CACHE_MAX_ENTRIES) || 200 });
@@ -1,20 +1,46 @@
 const cron = require('node-cron');
-const RealMatchParser = require('./realMatchParser');
-const LogoService = require('./logoService');
+const { getMatchParser } = require('./realMatchParser');
+const { getLogoService } = require('./logoService');
 const { getDatabase } = require('../database_mongo');
+const referenceData = require('./referenceData');
+const matchStatusEngine = require('./matchStatusEngine');
+const schedulerLeader = require('./leaderElection');
 
 class Scheduler {
   constructor() {
-    this.matchParser = new RealMatchParser();
-    this.logoService = new LogoService();
+    this.matchParser = getMatchParser();
+    this.logoService = getLogoService();
+    this.snapshotCheckInterval = 5 * 60 * 1000; // проверка свежести снимка матчей лидером
     this.setupSchedules();
+    
+    // Статусы в базу пишет только лидер; остальные процессы считают их в памяти
+    matchStatusEngine.setWritesEnabled(schedulerLeader.isLeader());
+    schedulerLeader.on('elected', () => {
+      matchStatusEngine.setWritesEnabled(true);
+      matchStatusEngine.rebuild();
+    });
+    schedulerLeader.on('revoked', () => matchStatusEngine.setWritesEnabled(false));
+    
+    // Статусы матчей переключаются движком по таймеру, а не по расписанию
+    matchStatusEngine.start().catch(error => {
+      console.error('❌ Ошибка запуска движка статусов матчей:', error);
+    });
+  }
+
+  // Задачи по расписанию выполняет только процесс-лидер
+  async runAsLeader(name, job) {
+    if (!schedulerLeader.isLeader()) {
+      console.log(`⏭️ ${name}: пропускаем, этот процесс не лидер`);
+      return;
+    }
+    await job();
   }
 
   setupSchedules() {
     // Утреннее обновление матчей в 09:00 МСК
     cron.schedule('0 9 * * *', async () => {
       console.log('🌅 Утреннее обновление матчей в 09:00 МСК');
-      await this.updateMatches('morning');
+      await this.runAsLeader('Утреннее обновление', () => this.updateMatches('morning'));
     }, {
       scheduled: true,
       timezone: "Europe/Moscow"
@@ -23,7 +49,7 @@ class Scheduler {
     // Вечернее обновление матчей в 19:00 МСК
     cron.schedule('0 19 * * *', async () => {
       console.log('🌆 Вечернее обновление матчей в 19:00 МСК');
-      await this.updateMatches('evening');
+      await this.runAsLeader('Вечернее обновление', () => this.updateMatches('evening'));
     }, {
       scheduled: true,
       timezone: "Europe/Moscow"
@@ -32,12 +58,22 @@ class Scheduler {
     // Очистка только старых матчей в 02:00 МСК (не трогаем сегодняшние)
     cron.schedule('0 2 * * *', async () => {
       console.log('🧹 Очистка старых матчей в 02:00 МСК');
-      await this.cleanupOldMatches();
+      await this.runAsLeader('Очистка старых матчей', () => this.cleanupOldMatches());
     }, {
       scheduled: true,
       timezone: "Europe/Moscow"
     });
 
+    // Лидер обновляет устаревший снимок матчей; остальные процессы получают
+    // его через сигнал cache_versions.matches, не обращаясь к внешним API
+    const snapshotTimer = setInterval(() => {
+      if (!schedulerLeader.isLeader()) return;
+      this.matchParser.getTodayMatchesSnapshot().catch(error => {
+        console.error('❌ Ошибка проверки снимка матчей:', error);
+      });
+    }, this.snapshotCheckInterval);
+    snapshotTimer.unref();
+
     console.log('✅ Scheduler запущен:');
     console.log('   🌅 Утреннее обновление: 09:00 МСК');
     console.log('   🌆 Вечернее обновление: 19:00 МСК');
@@ -70,8 +106,8 @@ class Scheduler {
       await this.updateMatchStatuses();
 
       // Сохраняем только новые реальные матчи
-      await this.matchParser.saveMatchesToDatabase(newMatches);
-      console.log('💾 Новые реальные матчи сохранены в базе данных');
+      const saveResult = await this.matchParser.saveMatchesToDatabase(newMatches);
+      console.log(`💾 Новые реальные матчи сохранены в базе данных (новых: ${saveResult.inserted}, обновлено: ${saveResult.updated}, без изменений: ${saveResult.unchanged})`);
 
       // Обновляем логотипы команд автоматически
       await this.logoService.updateAllTeamLogos();
@@ -87,62 +123,20 @@ class Scheduler {
     }
   }
 
-  // Обновление статусов матчей (проверка завершенности)
+  // Обновление статусов матчей: пересобираем движок статусов из базы
+  // (исправляет устаревшие статусы одним updateMany на статус)
   async updateMatchStatuses() {
     try {
-      const db = getDatabase();
-      const today = this.getTodayString();
-      const now = new Date();
-      
-      // Получаем все матчи на сегодня
-      const todayMatches = await db.collection('matches')
-        .find({ match_date: today })
-        .toArray();
-
-      for (const match of todayMatches) {
-        const matchTime = new Date(match.match_time);
-        let newStatus = 'scheduled';
-        
-        // Определяем статус матча на основе времени
-        if (now > matchTime) {
-          // Матч должен был начаться
-          const timeDiff = now - matchTime;
-          
-          // Если прошло больше времени чем обычная продолжительность матча
-          if (match.sport === 'football' && timeDiff > 2 * 60 * 60 * 1000) { // 2 часа для футбола
-            newStatus = 'finished';
-          } else if (match.sport === 'hockey' && timeDiff > 3 * 60 * 60 * 1000) { // 3 часа для хоккея
-            newStatus = 'finished';
-          } else if (match.sport === 'baseball' && timeDiff > 4 * 60 * 60 * 1000) { // 4 часа для бейсбола
-            newStatus = 'finished';
-          } else if (match.sport === 'esports' && timeDiff > 3 * 60 * 60 * 1000) { // 3 часа для киберспорта
-            newStatus = 'finished';
-          } else {
-            newStatus = 'live';
-          }
-        }
-
-        // Обновляем статус если он изменился
-        if (match.status !== newStatus) {
-          await db.collection('matches').updateOne(
-            { _id: match._id },
-            { 
-              $set: { 
-                status: newStatus,
-                status_updated_at: new Date()
-              }
-            }
-          );
-        }
-      }
-
-      console.log('✅ Статусы матчей обновлены');
+      const tracked = await matchStatusEngine.rebuild();
+      console.log(`✅ Статусы матчей обновлены (отслеживается матчей: ${tracked})`);
     } catch (error) {
       console.error('❌ Ошибка при обновлении статусов матчей:', error);
     }
   }
 
-  // Очистка только старых матчей (не трогаем сегодняшние)
+  // Очистка только старых матчей (не трогаем сегодняшние).
+  // При MATCH_TTL_INDEX=true матчи удаляет TTL-индекс по expires_at, здесь
+  // остаются только старые документы без expires_at.
   async cleanupOldMatches() {
     try {
       const db = getDatabase();
@@ -150,11 +144,14 @@ class Scheduler {
       today.setDate(today.getDate() - 2); // Удаляем матчи старше 2 дней
       const cutoffDate = today.toISOString().split('T')[0];
       
-      const result = await db.collection('matches').deleteMany({ 
-        match_date: { $lt: cutoffDate } 
+      const result = await db.collection('matches').deleteMany({
+        $or: [
+          { expires_at: { $lt: new Date() } },
+          { expires_at: null, match_date: { $lt: cutoffDate } }
+        ]
       });
       
-      console.log(`✅ Удалено ${result.deletedCount} старых матчей (старше 2 дней)`);
+      console.log(`✅ Удалено ${result.deletedCount} старых матчей (истёк срок хранения)`);
     } catch (error) {
       console.error('❌ Ошибка при очистке старых матчей:', error);
     }
@@ -191,6 +188,9 @@ class Scheduler {
         { upsert: true }
       );
 
+      // Сбрасываем кеш справочных данных во всех процессах
+      await referenceData.invalidate('stats');
+
       console.log('📈 Статистика обновлена с изменениями:', statsChange);
     } catch (error) {
       console.error('❌ Ошибка при обновлении статистики:', error);
@@ -0,0 +1,295 @@
+const { getDatabase } = require('../database_mongo');
+const { getHttpClient } = require('./httpClients');
+const { getLimiter } = require('./rateLimiter');
+const schedulerLeader = require('./leaderElection');
+
+const TELEGRAM_BOT_TOKEN = process.env.TELEGRAM_BOT_TOKEN;
+const TELEGRAM_API_URL = `https://api.telegram.org/bot${TELEGRAM_BOT_TOKEN}`;
+
+const MAX_ATTEMPTS = 5;
+const PER_CHAT_INTERVAL = 1000; // Telegram: about one message per second per chat
+const CLAIM_TIMEOUT = 60 * 1000; // a 'sending' message is reclaimed after this
+const RETENTION = 7 * 24 * 60 * 60 * 1000; // sent/failed messages are kept this long
+
+// Persistent outbound Telegram queue (telegram_outbox collection).
+// Anyone can enqueue; the scheduler leader runs the dispatcher, which claims
+// due messages in batches and sends them within Telegram's global and per-chat
+// limits, honouring retry_after on 429.
+class TelegramOutbox {
+  constructor() {
+    this.client = getHttpClient('telegram', { baseURL: TELEGRAM_API_URL, timeout: 10000 });
+    this.globalLimiter = getLimiter('telegram', {
+      rate: parseInt(process.env.TELEGRAM_MAX_PER_SECOND) || 25,
+      period: 1000,
+      burst: parseInt(process.env.TELEGRAM_MAX_PER_SECOND) || 25
+    });
+    this.batchSize = 25;
+    this.pollInterval = 1000;
+    this.lastSentByChat = new Map(); // chat_id -> ms, oldest send first
+    this.pausedUntil = 0; // set by a 429 with retry_after
+    this.timer = null;
+    this.running = false;
+    this.wakeRequested = false;
+    this.stats = { sent: 0, failed: 0, retried: 0, rate_limited: 0, batches: 0, status_write_errors: 0 };
+  }
+
+  async enqueue(chatId, text, { parseMode = 'HTML', broadcastId = null } = {}) {
+    const db = getDatabase();
+    const now = new Date();
+    const result = await db.collection('telegram_outbox').insertOne({
+      chat_id: chatId,
+      text,
+      parse_mode: parseMode,
+      broadcast_id: broadcastId,
+      status: 'pending',
+      attempts: 0,
+      next_attempt_at: now,
+      created_at: now
+    });
+
+    this.wake();
+    return result.insertedId;
+  }
+
+  // Queue one message per linked Telegram user
+  async enqueueBroadcast(text, { parseMode = 'HTML' } = {}) {
+    const db = getDatabase();
+    const chatIds = await db.collection('users').distinct('telegram_user_id', {
+      telegram_user_id: { $ne: null }
+    });
+    if (chatIds.length === 0) return { broadcastId: null, queued: 0 };
+
+    const broadcastId = `broadcast_${Date.now()}`;
+    const now = new Date();
+    let queued = 0;
+
+    for (let i = 0; i < chatIds.length; i += 1000) {
+      const docs = chatIds.slice(i, i + 1000).map(chatId => ({
+        chat_id: chatId,
+        text,
+        parse_mode: parseMode,
+        broadcast_id: broadcastId,
+        status: 'pending',
+        attempts: 0,
+        next_attempt_at: now,
+        created_at: now
+      }));
+      const result = await db.collection('telegram_outbox').insertMany(docs, { ordered: false });
+      queued += result.insertedCount;
+    }
+
+    console.log(`📣 Queued Telegram broadcast ${broadcastId} to ${queued} chats`);
+    this.wake();
+    return { broadcastId, queued };
+  }
+
+  start() {
+    if (this.timer) return;
+    this.timer = setInterval(() => this.dispatch(), this.pollInterval);
+    this.timer.unref();
+    schedulerLeader.on('elected', () => this.wake());
+  }
+
+  stop() {
+    if (this.timer) {
+      clearInterval(this.timer);
+      this.timer = null;
+    }
+  }
+
+  // Dispatch right away instead of waiting for the next poll
+  wake() {
+    if (!this.timer) return;
+    setImmediate(() => this.dispatch());
+  }
+
+  // Send due messages until the queue is drained or we're throttled
+  async dispatch() {
+    if (!schedulerLeader.isLeader()) return;
+    if (this.running) {
+      this.wakeRequested = true;
+      return;
+    }
+    this.running = true;
+
+    try {
+      while (Date.now() >= this.pausedUntil) {
+        this.wakeRequested = false;
+        const batch = await this.claimBatch();
+        if (batch.length === 0) {
+          // Something was enqueued while we were claiming: look again
+          if (this.wakeRequested) continue;
+          break;
+        }
+
+        this.stats.batches++;
+        await Promise.all(batch.map(message => this.sendClaimed(message)));
+      }
+    } catch (error) {
+      console.error('❌ Telegram outbox dispatch error:', error);
+    } finally {
+      this.running = false;
+    }
+  }
+
+  // Claim up to batchSize due messages, at most one per chat that is ready to send
+  async claimBatch() {
+    const db = getDatabase();
+    const outbox = db.collection('telegram_outbox');
+    const now = Date.now();
+    const batch = [];
+    const chatsInBatch = new Set();
+    const skipped = [];
+
+    this.pruneLastSent(now);
+
+    while (batch.length < this.batchSize) {
+      const claimNow = new Date();
+      const message = await outbox.findOneAndUpdate(
+        {
+          _id: { $nin: skipped },
+          chat_id: { $nin: [...chatsInBatch] },
+          $or: [
+            { status: 'pending', next_attempt_at: { $lte: claimNow } },
+            { status: 'sending', claimed_until: { $lt: claimNow } }
+          ]
+        },
+        { $set: { status: 'sending', claimed_until: new Date(now + CLAIM_TIMEOUT) } },
+        { sort: { next_attempt_at: 1 }, returnDocument: 'after' }
+      );
+      if (!message) break;
+
+      // Per-chat spacing: push the message back instead of sending too soon
+      const lastSent = this.lastSentByChat.get(message.chat_id) || 0;
+      if (now - lastSent < PER_CHAT_INTERVAL) {
+        await outbox.updateOne(
+          { _id: message._id },
+          { $set: { status: 'pending', next_attempt_at: new Date(lastSent + PER_CHAT_INTERVAL) } }
+        );
+        skipped.push(message._id);
+        continue;
+      }
+
+      chatsInBatch.add(message.chat_id);
+      batch.push(message);
+    }
+
+    return batch;
+  }
+
+  // Only chats messaged within PER_CHAT_INTERVAL matter for spacing; forget the
+  // rest so a broadcast doesn't leave every linked user in memory
+  pruneLastSent(now) {
+    for (const [chatId, sentAt] of this.lastSentByChat) {
+      if (now - sentAt < PER_CHAT_INTERVAL) break;
+      this.lastSentByChat.delete(chatId);
+    }
+  }
+
+  async sendClaimed(message) {
+    const db = getDatabase();
+    const outbox = db.collection('telegram_outbox');
+
+    // Global bucket; if it's saturated, hand the message back untouched
+    const granted = await this.globalLimiter.acquire({ timeout: 30 * 1000 });
+    if (!granted) {
+      await outbox.updateOne(
+        { _id: message._id },
+        { $set: { status: 'pending' }, $unset: { claimed_until: '' } }
+      );
+      return;
+    }
+
+    try {
+      await this.client.post('/sendMessage', {
+        chat_id: message.chat_id,
+        text: message.text,
+        parse_mode: message.parse_mode || 'HTML'
+      });
+    } catch (error) {
+      await this.handleSendError(outbox, message, error);
+      return;
+    }
+
+    // Re-insert so the map stays ordered by send time for pruneLastSent()
+    this.lastSentByChat.delete(message.chat_id);
+    this.lastSentByChat.set(message.chat_id, Date.now());
+    this.stats.sent++;
+
+    // Telegram has the message: a failed status write must not reschedule it,
+    // the claim is left to expire instead
+    try {
+      await outbox.updateOne(
+        { _id: message._id },
+        {
+          $set: { status: 'sent', sent_at: new Date(), expires_at: new Date(Date.now() + RETENTION) },
+          $inc: { attempts: 1 },
+          $unset: { claimed_until: '' }
+        }
+      );
+    } catch (error) {
+      this.stats.status_write_errors++;
+      console.error(`❌ Error marking Telegram message ${message._id} as sent:`, error.message);
+    }
+  }
+
+  async handleSendError(outbox, message, error) {
+    const status = error.response?.status;
+    const description = error.response?.data?.description || error.message;
+    const attempts = (message.attempts || 0) + 1;
+
+    let nextAttemptAt = null;
+    if (status === 429) {
+      // Flood control: wait as long as Telegram asks, for everyone
+      const retryAfter = (error.response.data?.parameters?.retry_after || 1) * 1000;
+      this.pausedUntil = Math.max(this.pausedUntil, Date.now() + retryAfter);
+      nextAttemptAt = new Date(Date.now() + retryAfter);
+      this.stats.rate_limited++;
+    } else if (status && status >= 400 && status < 500) {
+      // Chat not found, bot blocked, bad markup: retrying won't help
+      nextAttemptAt = null;
+    } else if (attempts < MAX_ATTEMPTS) {
+      nextAttemptAt = new Date(Date.now() + Math.min(2 ** attempts * 1000, 5 * 60 * 1000));
+    }
+
+    if (nextAttemptAt) {
+      this.stats.retried++;
+      await outbox.updateOne(
+        { _id: message._id },
+        {
+          $set: { status: 'pending', next_attempt_at: nextAttemptAt, last_error: description },
+          $inc: { attempts: status === 429 ? 0 : 1 },
+          $unset: { claimed_until: '' }
+        }
+      );
+      return;
+    }
+
+    this.stats.failed++;
+    console.error(`❌ Telegram message to ${message.chat_id} failed: ${description}`);
+    await outbox.updateOne(
+      { _id: message._id },
+      {
+        $set: { status: 'failed', last_error: description, expires_at: new Date(Date.now() + RETENTION) },
+        $inc: { attempts: 1 },
+        $unset: { claimed_until: '' }
+      }
+    );
+  }
+
+  async getStats() {
+    const db = getDatabase();
+    const counts = await db.collection('telegram_outbox').aggregate([
+      { $group: { _id: '$status', count: { $sum: 1 } } }
+    ]).toArray();
+
+    return {
+      dispatcher_running: Boolean(this.timer) && schedulerLeader.isLeader(),
+      paused_until: this.pausedUntil > Date.now() ? new Date(this.pausedUntil).toISOString() : null,
+      queue: Object.fromEntries(counts.map(({ _id, count }) => [_id, count])),
+      ...this.stats
+    };
+  }
+}
+
+module.exports = new TelegramOutbox();
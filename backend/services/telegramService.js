@@ -1,5 +1,6 @@
 const axios = require('axios');
 require('dotenv').config();
+const telegramOutbox = require('./telegramOutbox');
 
 const TELEGRAM_BOT_TOKEN = process.env.TELEGRAM_BOT_TOKEN;
 const TELEGRAM_API_URL = `https://api.telegram.org/bot${TELEGRAM_BOT_TOKEN}`;
@@ -15,21 +16,19 @@ const generateTelegramLoginUrl = (authToken) => {
   return telegramUrl;
 };
 
-// Send message to user via Telegram
+// Queue a message for a Telegram chat; the outbox dispatcher delivers it
+// within Telegram's rate limits and retries on failure
 const sendTelegramMessage = async (chatId, message) => {
   try {
-    const response = await axios.post(`${TELEGRAM_API_URL}/sendMessage`, {
-      chat_id: chatId,
-      text: message,
-      parse_mode: 'HTML'
-    });
+    const id = await telegramOutbox.enqueue(chatId, message);
     
     return {
       success: true,
-      data: response.data
+      queued: true,
+      id
     };
   } catch (error) {
-    console.error('Error sending Telegram message:', error);
+    console.error('Error queueing Telegram message:', error);
     return {
       success: false,
       error: error.message
@@ -37,6 +36,11 @@ const sendTelegramMessage = async (chatId, message) => {
   }
 };
 
+// Send a message to every user who linked Telegram
+const broadcastTelegramMessage = async (message) => {
+  return await telegramOutbox.enqueueBroadcast(message);
+};
+
 // Send authentication confirmation message
 const sendAuthConfirmation = async (chatId, username, authToken) => {
   const message = `
@@ -198,6 +202,7 @@ const sendWelcomeMessage = async (chatId, from) => {
 module.exports = {
   generateTelegramLoginUrl,
   sendTelegramMessage,
+  broadcastTelegramMessage,
   sendAuthConfirmation,
   getTelegramUserInfo,
   setWebhook,
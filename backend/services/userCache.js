@@ -0,0 +1,43 @@
+const LRUCache = require('./lruCache');
+
+// Authenticated user documents (password excluded), keyed by user id.
+// Each entry remembers the user's token_version, so within one process tokens
+// issued before a password change or reset never match a cached entry. Other
+// cluster workers keep their entry until it expires, so with CLUSTER_MODE the
+// auth middleware re-reads token_version on every cache hit.
+const userCache = new LRUCache({
+  max: parseInt(process.env.AUTH_USER_CACHE_SIZE) || 5000,
+  ttl: (parseInt(process.env.AUTH_USER_CACHE_TTL_SECONDS) || 60) * 1000
+});
+
+// Cached user for a token, or undefined on miss / version mismatch
+const getCachedUser = (userId, tokenVersion) => {
+  const entry = userCache.get(String(userId));
+  if (entry && entry.tokenVersion === tokenVersion) {
+    return entry.user;
+  }
+  return undefined;
+};
+
+const setCachedUser = (user) => {
+  userCache.set(String(user._id), {
+    tokenVersion: user.token_version || 0,
+    user
+  });
+};
+
+// Drop a user after any write to their document
+const invalidateUser = (userId) => {
+  if (userId) {
+    userCache.delete(String(userId));
+  }
+};
+
+const getUserCacheStats = () => userCache.getStats();
+
+module.exports = {
+  getCachedUser,
+  setCachedUser,
+  invalidateUser,
+  getUserCacheStats
+};
@@ -2,8 +2,30 @@ import requests
 import unittest
 import sys
 import json
+import time
+import asyncio
+import argparse
 from datetime import datetime
 
+# Endpoints exercised by the load mode (same set the functional tests cover)
+LOAD_ENDPOINTS = [
+    "api/health",
+    "api/stats",
+    "api/matches/today",
+    "api/logos/all",
+    "api/logos/stats",
+    "api/logos/team/New York Yankees/baseball",
+    "api/matches/schedule-info",
+]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
 class SportPredictionsAPITester:
     def __init__(self, base_url):
         self.base_url = base_url
@@ -51,6 +73,87 @@ class SportPredictionsAPITester:
             print(f"❌ Failed - Error: {str(e)}")
             return False, {}
 
+    def run_load_test(self, users=10, duration=None, total_requests=None, endpoints=None):
+        """Run N concurrent virtual users against the endpoint list and report latency percentiles"""
+        if duration is None and total_requests is None:
+            duration = 30
+
+        return asyncio.run(self._run_load(users, duration, total_requests, endpoints or LOAD_ENDPOINTS))
+
+    async def _run_load(self, users, duration, total_requests, endpoints):
+        try:
+            import aiohttp
+        except ImportError:
+            print("❌ Load mode requires aiohttp: pip install aiohttp")
+            return None
+
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        results = {endpoint: {'latencies': [], 'errors': 0, 'statuses': {}} for endpoint in endpoints}
+        issued = 0
+        deadline = time.monotonic() + duration if duration is not None else None
+
+        def next_request():
+            nonlocal issued
+            if total_requests is not None and issued >= total_requests:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            endpoint = endpoints[issued % len(endpoints)]
+            issued += 1
+            return endpoint
+
+        async def virtual_user(session):
+            while True:
+                endpoint = next_request()
+                if endpoint is None:
+                    return
+                stats = results[endpoint]
+                started = time.perf_counter()
+                try:
+                    async with session.get(f"{self.base_url}/{endpoint}") as response:
+                        await response.read()
+                        stats['statuses'][response.status] = stats['statuses'].get(response.status, 0) + 1
+                        if response.status >= 400:
+                            stats['errors'] += 1
+                except Exception:
+                    stats['errors'] += 1
+                stats['latencies'].append((time.perf_counter() - started) * 1000)
+
+        # One pooled keep-alive connector shared by every virtual user
+        connector = aiohttp.TCPConnector(limit=users, keepalive_timeout=30)
+        timeout = aiohttp.ClientTimeout(total=60)
+
+        print(f"\n🚀 Load test: {users} virtual users, "
+              f"{f'{duration}s' if duration is not None else f'{total_requests} requests'} against {self.base_url}")
+
+        started = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            await asyncio.gather(*(virtual_user(session) for _ in range(users)))
+        elapsed = time.perf_counter() - started
+
+        self.print_load_report(results, elapsed)
+        return results
+
+    def print_load_report(self, results, elapsed):
+        """Print throughput and p50/p95/p99/max latency per endpoint"""
+        total = sum(len(stats['latencies']) for stats in results.values())
+        total_errors = sum(stats['errors'] for stats in results.values())
+
+        print(f"\n📊 Load test finished in {elapsed:.1f}s: {total} requests, "
+              f"{total / elapsed if elapsed else 0:.1f} req/s, {total_errors} errors")
+        print(f"{'Endpoint':<45} {'reqs':>6} {'rps':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+
+        for endpoint, stats in results.items():
+            latencies = sorted(stats['latencies'])
+            if not latencies:
+                continue
+            print(f"{endpoint:<45} {len(latencies):>6} {len(latencies) / elapsed:>7.1f} {stats['errors']:>5} "
+                  f"{percentile(latencies, 50):>7.0f}ms {percentile(latencies, 95):>7.0f}ms "
+                  f"{percentile(latencies, 99):>7.0f}ms {latencies[-1]:>7.0f}ms")
+
     def test_health_endpoint(self):
         """Test the health endpoint"""
         success, response = self.run_test(
@@ -724,14 +827,26 @@ class SportPredictionsAPITester:
         return success
 
 def main():
+    parser = argparse.ArgumentParser(description="Sport Predictions backend tests")
+    parser.add_argument("--url", default="http://localhost:8001", help="Backend base URL")
+    parser.add_argument("--load", action="store_true", help="Run the concurrent load mode instead of functional tests")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users (load mode)")
+    parser.add_argument("--duration", type=float, default=None, help="Load duration in seconds (load mode)")
+    parser.add_argument("--requests", type=int, default=None, help="Total request count (load mode)")
+    args = parser.parse_args()
+
     # Get the backend URL from the frontend .env file
-    backend_url = "http://localhost:8001"
+    backend_url = args.url
     
     print(f"Testing API at: {backend_url}")
     
     # Setup tester
     tester = SportPredictionsAPITester(backend_url)
     
+    if args.load:
+        results = tester.run_load_test(args.users, args.duration, args.requests)
+        return 0 if results is not None else 1
+    
     # Run basic API tests
     print("\n=== Testing Basic API Endpoints ===")
     health_test = tester.test_health_endpoint()
@@ -176,40 +176,36 @@ const AuthModal = ({ isOpen, onClose, onSuccess }) => {
     }
   };
 
-  // Poll Telegram auth status
+  // Wait for Telegram auth confirmation (long-poll: the server holds each
+  // request until the bot confirms the session or the wait runs out)
   const pollTelegramAuthStatus = async (authToken) => {
-    const pollInterval = setInterval(async () => {
-      try {
-        const response = await authAPI.telegramAuthStatus(authToken);
+    const deadline = Date.now() + 5 * 60 * 1000;
+
+    try {
+      while (Date.now() < deadline) {
+        const response = await authAPI.telegramAuthStatus(authToken, 25);
         const data = response.data;
-        
+
         if (data.status === 'confirmed') {
-          clearInterval(pollInterval);
-          
           // Save token and user data
           localStorage.setItem('authToken', data.token);
           localStorage.setItem('userData', JSON.stringify(data.user));
-          
+
           setSuccess('Вход через Telegram выполнен успешно!');
           setTelegramLoading(false);
           onSuccess && onSuccess(data.user);
           setTimeout(() => onClose(), 1000);
+          return;
         }
-      } catch (error) {
-        clearInterval(pollInterval);
-        setError('Ошибка авторизации через Telegram');
-        setTelegramLoading(false);
+        if (data.status !== 'pending') break;
       }
-    }, 2000);
-
-    // Stop polling after 5 minutes
-    setTimeout(() => {
-      clearInterval(pollInterval);
-      if (telegramLoading) {
-        setTelegramLoading(false);
-        setError('Время ожидания истекло');
-      }
-    }, 5 * 60 * 1000);
+
+      setTelegramLoading(false);
+      setError('Время ожидания истекло');
+    } catch (error) {
+      setTelegramLoading(false);
+      setError(error.response?.status === 400 ? 'Время ожидания истекло' : 'Ошибка авторизации через Telegram');
+    }
   };
 
   if (!isOpen) return null;
@@ -55,12 +55,71 @@ const TodayMatches = () => {
     }
   };
 
+  // Group a flat match list by sport, like /api/matches/today
+  const groupBySport = (list) => list.reduce((acc, match) => {
+    if (!acc[match.sport]) {
+      acc[match.sport] = [];
+    }
+    acc[match.sport].push(match);
+    return acc;
+  }, {});
+
+  // Apply a change to one match inside the grouped state
+  const updateMatch = (sport, id, update) => {
+    setMatches(prev => {
+      const list = prev[sport];
+      if (!list) return prev;
+      return { ...prev, [sport]: list.map(match => (match.id === id ? update(match) : match)) };
+    });
+    setLastUpdated(new Date());
+  };
+
   useEffect(() => {
     loadMatches();
     
-    // Auto refresh every 30 minutes
-    const interval = setInterval(loadMatches, 30 * 60 * 1000);
-    return () => clearInterval(interval);
+    // Without EventSource fall back to refreshing every 30 minutes
+    if (typeof EventSource === 'undefined') {
+      const interval = setInterval(loadMatches, 30 * 60 * 1000);
+      return () => clearInterval(interval);
+    }
+
+    // Live updates: statuses, odds and logos are pushed as they change.
+    // EventSource reconnects by itself and resumes from the last event id.
+    const stream = matchesAPI.openMatchStream();
+
+    stream.addEventListener('snapshot', (event) => {
+      const data = JSON.parse(event.data);
+      setMatches(groupBySport(data.matches));
+      setLastUpdated(new Date());
+      setLoading(false);
+      setError('');
+    });
+
+    stream.addEventListener('update', (event) => {
+      const { id, sport, changes } = JSON.parse(event.data);
+      updateMatch(sport, id, match => ({ ...match, ...changes }));
+    });
+
+    stream.addEventListener('match', (event) => {
+      const match = JSON.parse(event.data);
+      setMatches(prev => ({
+        ...prev,
+        [match.sport]: [...(prev[match.sport] || []).filter(item => item.id !== match.id), match]
+          .sort((a, b) => new Date(a.match_time) - new Date(b.match_time))
+      }));
+      setLastUpdated(new Date());
+    });
+
+    stream.addEventListener('remove', (event) => {
+      const { id, sport } = JSON.parse(event.data);
+      setMatches(prev => {
+        if (!prev[sport]) return prev;
+        return { ...prev, [sport]: prev[sport].filter(match => match.id !== id) };
+      });
+      setLastUpdated(new Date());
+    });
+
+    return () => stream.close();
   }, []);
 
   // Format match time from UTC/GMT to HH:MM format for Moscow timezone
@@ -89,13 +89,24 @@ export const authAPI = {
   login: (credentials) => api.post('/api/auth/login', credentials),
   logout: () => api.post('/api/auth/logout'),
   getProfile: () => api.get('/api/auth/profile'),
-  changePassword: (passwordData) => api.put('/api/auth/change-password', passwordData),
+  changePassword: (passwordData) => api.put('/api/auth/change-password', passwordData)
+    .then((response) => {
+      // Old tokens are revoked on password change; keep the session with the new one
+      if (response.data.token) {
+        localStorage.setItem('authToken', response.data.token);
+      }
+      return response;
+    }),
   verifyEmail: (token) => api.post('/api/auth/verify-email', { token }),
   resendVerification: (email) => api.post('/api/auth/resend-verification', { email }),
   forgotPassword: (email) => api.post('/api/auth/forgot-password', { email }),
   resetPassword: (data) => api.post('/api/auth/reset-password', data),
   telegramAuthStart: (email) => api.post('/api/auth/telegram-auth-start', { email }),
-  telegramAuthStatus: (token) => api.get(`/api/auth/telegram-auth-status/${token}`),
+  // wait: seconds the server may hold the request until the session is confirmed
+  telegramAuthStatus: (token, wait = 0) => api.get(`/api/auth/telegram-auth-status/${token}`, {
+    params: wait ? { wait } : undefined,
+    timeout: wait ? (wait + 10) * 1000 : undefined,
+  }),
 };
 
 // Sports API functions
@@ -112,6 +123,8 @@ export const matchesAPI = {
   getTodayMatches: () => api.get('/api/matches/today'),
   getMatchesBySport: (sport) => api.get(`/api/matches/sport/${sport}`),
   refreshMatches: () => api.post('/api/matches/refresh'),
+  // Server-Sent Events: 'snapshot', then 'update' / 'match' / 'remove' deltas
+  openMatchStream: () => new EventSource(`${API_BASE_URL}/api/matches/stream`),
 };
 
 // Health check